@@ -0,0 +1,75 @@
+"""
+Recall/latency comparison of IVF matching against the exhaustive scan.
+
+Generates a synthetic gallery with several reference embeddings per
+student, then matches noisy probe embeddings of enrolled students with
+both backends. Recall is the fraction of probes for which the IVF path
+returns the same best row as brute force.
+
+    python -m school_surveillance.benchmarks.ann_benchmark --students 20000 --images-per-student 3
+"""
+import argparse
+import time
+
+import numpy as np
+
+from school_surveillance.src.gallery import FaceGallery
+
+
+def synthetic_gallery(students: int, images_per_student: int, dimension: int, spread: float, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(students, dimension)).astype(np.float32)
+    embeddings = np.repeat(centers, images_per_student, axis=0)
+    embeddings += spread * rng.normal(size=embeddings.shape).astype(np.float32)
+    identities = [f"{student}_{image}.jpg" for student in range(students) for image in range(images_per_student)]
+    return centers, identities, embeddings
+
+
+def time_per_batch(fn, queries: np.ndarray, batch_size: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        fn(queries[i:i + batch_size])
+    batches = -(-len(queries) // batch_size)
+    return (time.perf_counter() - start) / batches * 1000.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--images-per-student", type=int, default=3)
+    parser.add_argument("--dimension", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=8, help="Faces matched together, as in one frame.")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--spread", type=float, default=0.35, help="Noise between images of the same student.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'students':>8} {'rows':>7} {'backend':>12} {'build s':>8} {'ms/batch':>9} {'recall@1':>9}")
+    for students in args.students:
+        centers, identities, embeddings = synthetic_gallery(
+            students, args.images_per_student, args.dimension, args.spread, args.seed)
+        rng = np.random.default_rng(args.seed + 1)
+        probe_students = rng.integers(0, students, size=args.queries)
+        queries = centers[probe_students] + args.spread * rng.normal(
+            size=(args.queries, args.dimension)).astype(np.float32)
+
+        gallery = FaceGallery(identities, embeddings)
+        exact_rows, _ = gallery.nearest(queries)
+        brute_ms = time_per_batch(gallery.nearest, queries, args.batch_size)
+        print(f"{students:>8} {len(gallery):>7} {'brute':>12} {0.0:>8.2f} {brute_ms:>9.3f} {1.0:>9.3f}")
+
+        for nprobe in args.nprobe:
+            start = time.perf_counter()
+            gallery.build_ann_index(nprobe=nprobe)
+            build_seconds = time.perf_counter() - start
+            ann_rows, _ = gallery.nearest(queries)
+            ann_ms = time_per_batch(gallery.nearest, queries, args.batch_size)
+            recall = float(np.mean(ann_rows == exact_rows))
+            print(f"{students:>8} {len(gallery):>7} {f'ivf/{nprobe}':>12} {build_seconds:>8.2f} "
+                  f"{ann_ms:>9.3f} {recall:>9.3f}")
+        gallery.ann_index = None
+
+
+if __name__ == "__main__":
+    main()
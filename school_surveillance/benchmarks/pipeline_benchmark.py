@@ -0,0 +1,320 @@
+"""
+End-to-end throughput of the recognition pipeline, per stage.
+
+Frames come from video files (looped, paced at the file's frame rate) or
+from generated frames (unpaced unless --fps is given), fed through
+file-backed CameraStreams instead of webcams. Everything else is main's own
+loop: main.build_pipeline() sets up the rule engine, recognition (in this
+process, or in --workers RecognitionWorkerPool processes), the load-shedding
+CameraScheduler, the EventPublisher and the FrameStreamer, and
+Pipeline.step() is called exactly as main() calls it. Only the database
+(a temporary file), the timetable (one period all day) and the notifier (a
+no-op) are swapped. Each combination of camera count and gallery size is
+run for a fixed duration and reports processed frames per second, frames
+shed by the scheduler, the share of the time the loop was busy with frames
+rather than waiting for them (below 100% the sources, not the pipeline, set
+the frame rate), plus p50/p95/p99 latency (ms) of every stage, counted only
+over batches that ran it:
+
+    capture      age of a frame when the loop picks it up
+    detection    detector over all frames of one batch
+    embedding    one embedding forward pass over the batch's new faces
+    matching     gallery matching of those faces
+    rules        RuleEngine.process_detections for one camera frame
+    persistence  one committed ViolationWriter batch (violations and
+                 grace-period checkpoints)
+
+The gallery is a synthetic enrollment store of N students, each with a
+classroom; even cameras watch a classroom, odd ones an open hallway. With
+the real models, faces in the videos will not belong to any of them, so
+every face is Unknown and the rule stage sees no violations.
+--synthetic-models swaps the detector and embedder for cheap stand-ins that
+report a fixed number of faces per frame, mostly of enrolled students,
+which exercises matching, the rules and persistence at scale without a GPU.
+
+    python -m school_surveillance.benchmarks.pipeline_benchmark --synthetic-models --cameras 1 4 8 --students 10 1000 10000
+    python -m school_surveillance.benchmarks.pipeline_benchmark --synthetic-models --workers 2 --cameras 4
+    python -m school_surveillance.benchmarks.pipeline_benchmark --videos hallway.mp4 gate.mp4 --cameras 2
+"""
+import argparse
+import contextlib
+import functools
+import os
+import tempfile
+import time
+from datetime import time as time_of_day
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+from school_surveillance.src import database
+from school_surveillance.src.config import RECOGNITION_WORKERS
+from school_surveillance.src.data_models import Period, Schedule, Student, Zone
+from school_surveillance.src.enrollment import GalleryStore, default_store_path
+from school_surveillance.src.main import build_pipeline, parse_args
+from school_surveillance.src.metrics import record_db_write
+
+STAGES = ("capture", "detection", "embedding", "matching", "rules", "persistence")
+CLASSROOMS = 8
+SYNTHETIC_DIMENSION = 128
+ALL_DAY = [Period(1, time_of_day(0, 0), time_of_day.max)]
+
+
+class SyntheticCapture:
+    """Generated camera: static noise with a moving block, paced at ``fps`` (unpaced if 0)."""
+
+    def __init__(self, width: int, height: int, fps: float, seed: int):
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.index = 0
+        self.next_frame_at = time.monotonic()
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        time.sleep(max(0.0, self.next_frame_at - time.monotonic()))
+        self.next_frame_at += self.interval
+        frame = self.background.copy()
+        height, width = frame.shape[:2]
+        x = (self.index * 8) % max(1, width - 64)
+        frame[height // 3:height // 3 + 64, x:x + 64] = 255
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class VideoFileCapture:
+    """Plays a video file in a loop at its own frame rate, like a live camera."""
+
+    def __init__(self, path: str):
+        self.capture = cv2.VideoCapture(path)
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.interval = 1.0 / fps if fps and fps > 0 else 1.0 / 25
+        self.next_frame_at = time.monotonic()
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        time.sleep(max(0.0, self.next_frame_at - time.monotonic()))
+        self.next_frame_at += self.interval
+        ok, frame = self.capture.read()
+        if not ok:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read()
+        return ok, frame
+
+    def release(self):
+        self.capture.release()
+
+
+class SyntheticDetector:
+    """Reports ``faces`` fixed boxes per frame, so trackers keep them across frames."""
+
+    def __init__(self, faces: int):
+        self.faces = faces
+
+    def detect(self, frame):
+        from school_surveillance.src.face_recognition import FaceDetection
+
+        height, width = frame.shape[:2]
+        size = max(8, min(height, width) // 4)
+        detections = []
+        for i in range(self.faces):
+            left = (i * size) % max(1, width - size)
+            top = ((i * size) // max(1, width - size)) * size % max(1, height - size)
+            crop = frame[top:top + size, left:left + size, ::-1] / 255.0
+            detections.append(FaceDetection((top, left + size, top + size, left), crop, 1.0))
+        return detections
+
+
+class SyntheticEmbedder:
+    """Returns a noisy enrolled embedding per crop, or a random one for ``unknown_fraction`` of crops."""
+
+    input_size = (32, 32)
+
+    def __init__(self, centers: np.ndarray, unknown_fraction: float = 0.2, spread: float = 0.1, seed: int = 0):
+        self.centers = centers
+        self.unknown_fraction = unknown_fraction
+        self.spread = spread
+        self.rng = np.random.default_rng(seed)
+
+    def embed(self, crops):
+        count = len(crops)
+        embeddings = self.centers[self.rng.integers(0, len(self.centers), size=count)].copy()
+        unknown = self.rng.random(count) < self.unknown_fraction
+        embeddings[unknown] = self.rng.normal(size=(int(unknown.sum()), self.centers.shape[1]))
+        embeddings += self.spread * self.rng.normal(size=embeddings.shape)
+        return embeddings.astype(np.float32)
+
+
+def write_gallery(db_path: str, model_name: str, students: int, dimension: int, seed: int) -> np.ndarray:
+    """Writes an enrollment store of ``students`` random embeddings and returns them."""
+    centers = np.random.default_rng(seed).normal(size=(students, dimension)).astype(np.float32)
+    entries = [{"image": f"{student}.jpg", "sha256": ""} for student in range(students)]
+    GalleryStore(default_store_path(db_path)).save(model_name, entries, centers)
+    return centers
+
+
+def synthetic_recognizer(db_path: str, faces_per_frame: int, seed: int):
+    """FaceRecognizer with the synthetic stand-ins, embedding around the gallery in ``db_path``; picklable for workers."""
+    from school_surveillance.src.face_recognition import FaceRecognizer
+
+    recognizer = FaceRecognizer(model_name="synthetic", gallery_refresh_interval=float("inf"))
+    _, centers = GalleryStore(default_store_path(db_path)).load_raw()
+    recognizer.detector = SyntheticDetector(faces_per_frame)
+    recognizer.embedder = SyntheticEmbedder(centers, seed=seed)
+    return recognizer
+
+
+class QuietNotifier:
+    queue_depth = 0
+
+    def notify(self, **alert):
+        pass
+
+    def stop(self):
+        pass
+
+
+def write_layout(students: int):
+    """Every student has a classroom; the hallway is open during the one period."""
+    database.save_students([Student(str(s), str(s), "") for s in range(students)])
+    database.save_schedules([Schedule(student_id=str(s), period=1, classroom_id=f"CLASS-{s % CLASSROOMS}")
+                             for s in range(students)])
+    database.save_zones([Zone(id=f"CLASS-{i}", name=f"Classroom {i}", allowed_periods=[]) for i in range(CLASSROOMS)]
+                        + [Zone(id="HALLWAY", name="Hallway", allowed_periods=[1])])
+
+
+def camera_config(cameras: int, target_fps: float) -> Dict[str, Dict]:
+    """Even cameras watch a classroom, odd ones the hallway; sources are indices for the capture factory."""
+    return {f"bench_{c}": {"zone_id": f"CLASS-{(c // 2) % CLASSROOMS}" if c % 2 == 0 else "HALLWAY",
+                           "source": c, "target_fps": target_fps}
+            for c in range(cameras)}
+
+
+def run(config: Dict[str, Dict], db_path: str, capture_factory, recognizer_factory, workers: int,
+        duration: float, warm_up_frames: int = 50, warm_up_timeout: float = 120.0) -> Dict[str, object]:
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    def on_write(rows: int, seconds: float):
+        record_db_write(rows, seconds)
+        samples["persistence"].append(seconds)
+
+    def on_stage(stage: str, seconds: float):
+        if stage in samples:
+            samples[stage].append(seconds)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        pipeline = build_pipeline(parse_args(["--headless"]), config, capture_factory=capture_factory,
+                                  recognizer_factory=recognizer_factory, workers=workers,
+                                  student_images_db_path=db_path, timetable=ALL_DAY, notifier=QuietNotifier(),
+                                  on_write=on_write, on_stage=on_stage)
+        if pipeline is None:
+            raise RuntimeError("Could not open the benchmark cameras")
+        try:
+            # Models, gallery and worker processes load before the clock starts,
+            # and the scheduler's processing-time estimate (which the first,
+            # slow results inflate) gets enough frames to settle.
+            deadline = time.monotonic() + warm_up_timeout
+            while pipeline.frames_processed < warm_up_frames and time.monotonic() < deadline:
+                pipeline.step()
+            for values in samples.values():
+                values.clear()
+            processed = pipeline.frames_processed
+            dropped = sum(stream.frames_dropped for stream in pipeline.camera_streams.values())
+            shed = sum(pipeline.scheduler.skip_counts().values()) if pipeline.scheduler else 0
+            rows = pipeline.violation_writer.rows_written
+
+            idle = 0.0
+            started = time.monotonic()
+            while time.monotonic() - started < duration:
+                step_started = time.monotonic()
+                if not pipeline.step():
+                    idle += time.monotonic() - step_started
+            elapsed = time.monotonic() - started
+
+            processed = pipeline.frames_processed - processed
+            dropped = sum(stream.frames_dropped for stream in pipeline.camera_streams.values()) - dropped
+            shed = (sum(pipeline.scheduler.skip_counts().values()) if pipeline.scheduler else 0) - shed
+        finally:
+            pipeline.stop()
+        rows = pipeline.violation_writer.rows_written - rows
+
+    return {"fps": processed / elapsed, "busy": 1.0 - idle / elapsed, "dropped": dropped, "shed": shed,
+            "rows": rows, "samples": samples}
+
+
+def percentiles(values: List[float]) -> Optional[np.ndarray]:
+    if not values:
+        return None
+    return np.percentile(np.asarray(values) * 1000.0, [50, 95, 99])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--videos", nargs="*", default=[], help="Video files, assigned to cameras round-robin.")
+    parser.add_argument("--cameras", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--students", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per configuration.")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=float, default=0.0,
+                        help="Frame rate of generated cameras; 0 (default) for as fast as possible.")
+    parser.add_argument("--target-fps", type=float, default=0.0,
+                        help="Per-camera \"target_fps\" of the motion gate; 0 (default) for no limit.")
+    parser.add_argument("--workers", type=int, default=RECOGNITION_WORKERS,
+                        help="Recognition worker processes; 0 recognizes in-process.")
+    parser.add_argument("--synthetic-models", action="store_true",
+                        help="Replace the DeepFace detector and embedder with cheap stand-ins.")
+    parser.add_argument("--faces-per-frame", type=int, default=3, help="Faces reported by the synthetic detector.")
+    parser.add_argument("--model", default="VGG-Face")
+    parser.add_argument("--detector", default="opencv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from school_surveillance.src.face_recognition import FaceRecognizer
+
+    if args.videos:
+        capture_factory = lambda source, api: VideoFileCapture(args.videos[source % len(args.videos)])
+    else:
+        capture_factory = lambda source, api: SyntheticCapture(args.width, args.height, args.fps, args.seed + source)
+
+    header = f"{'cameras':>7} {'students':>8} {'fps':>7} {'busy':>5} {'dropped':>7} {'shed':>6} {'saved':>6}"
+    print(header + "".join(f" {stage + ' p50/p95/p99':>26}" for stage in STAGES))
+    for students in args.students:
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(database, "DATABASE_NAME", os.path.join(tmp, "benchmark.db")):
+            database.init_db()
+            write_layout(students)
+            if args.synthetic_models:
+                write_gallery(tmp, "synthetic", students, SYNTHETIC_DIMENSION, args.seed)
+                recognizer_factory = functools.partial(synthetic_recognizer, tmp, args.faces_per_frame, args.seed)
+            else:
+                recognizer_factory = functools.partial(FaceRecognizer, model_name=args.model,
+                                                       detector_backend=args.detector,
+                                                       gallery_refresh_interval=float("inf"))
+                embedder = recognizer_factory().embedder
+                dimension = embedder.embed([np.zeros((64, 64, 3), dtype=np.float32)]).shape[1]
+                write_gallery(tmp, args.model, students, dimension, args.seed)
+
+            for cameras in args.cameras:
+                result = run(camera_config(cameras, args.target_fps), tmp, capture_factory, recognizer_factory,
+                             args.workers, args.duration)
+                line = (f"{cameras:>7} {students:>8} {result['fps']:>7.1f} {result['busy']:>5.0%} "
+                        f"{result['dropped']:>7} {result['shed']:>6} {result['rows']:>6}")
+                for stage in STAGES:
+                    stats = percentiles(result["samples"][stage])
+                    line += f" {'-' if stats is None else '/'.join(f'{v:.2f}' for v in stats):>26}"
+                print(line)
+            database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+import argparse
+import ipaddress
+import json
+import queue
+import threading
+import time
+from dataclasses import astuple, dataclass, replace
+from datetime import datetime
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .batching import BatchedChannel
+from .data_models import DetectionResult
+from .database import (init_db, load_students, load_schedules, load_zones, load_active_violations,
+                       load_bunking_scores, ViolationWriter)
+from .events import EventPublisher, violation_event
+from .notifications import NotificationDispatcher
+from .rule_engine import RuleEngine, load_timetable
+from .metrics import (REGISTRY, RULES_SECONDS, DB_QUEUE_DEPTH, NOTIFICATION_QUEUE_DEPTH, EVENT_BUFFER_DEPTH,
+                      EVENTS_DROPPED, record_db_write)
+from .config import (AGGREGATOR_ADDRESS, AGGREGATOR_AUTHKEY, DEFAULT_AGGREGATOR_AUTHKEY, EVENT_BATCH_SECONDS,
+                     EVENT_BUFFER_LIMIT, SCHEDULE_RELOAD_SECONDS, METRICS_PUSH_SECONDS)
+
+Address = Tuple[str, int]
+
+# Upper bound on one encoded batch; larger messages close the connection.
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+
+# A node clock this close to the aggregator's is trusted as is; the
+# difference is mostly delivery latency, not skew.
+CLOCK_OFFSET_TOLERANCE = 1.0
+
+
+@dataclass
+class Detection:
+    """The students one camera frame saw in a zone; all a node sends to the aggregator."""
+    camera_id: str
+    zone_id: str
+    timestamp: float
+    student_ids: Tuple[str, ...]
+
+
+def parse_address(address: str) -> Address:
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Expected HOST:PORT, got {address!r}")
+    return host, int(port)
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+# Batches travel as JSON rather than pickles, so a peer that gets past the
+# authkey can at worst send bad detections, never run code in the aggregator.
+# ``sent_at`` is the node's clock when sending, which lets the aggregator
+# translate the detection timestamps to its own clock.
+def encode_batch(node: str, sequence: int, detections: List[Detection], sent_at: Optional[float] = None) -> bytes:
+    return json.dumps({"node": node, "sequence": sequence, "sent_at": time.time() if sent_at is None else sent_at,
+                       "detections": [astuple(detection) for detection in detections]}).encode()
+
+
+def decode_batch(message: bytes) -> Tuple[str, int, float, List[Detection]]:
+    """Parses an encoded batch; raises ValueError if it is malformed."""
+    try:
+        batch = json.loads(message)
+        detections = [Detection(str(camera_id), str(zone_id), float(timestamp), tuple(str(s) for s in student_ids))
+                      for camera_id, zone_id, timestamp, student_ids in batch["detections"]]
+        return str(batch["node"]), int(batch["sequence"]), float(batch["sent_at"]), detections
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed detection batch: {e}") from e
+
+
+# The acknowledgement also tells the node how many grace periods are open per
+# zone, which its CameraScheduler weighs and only the aggregator knows.
+def encode_ack(sequence: int, active_violations: Dict[str, int]) -> bytes:
+    return json.dumps({"sequence": sequence, "active_violations": active_violations}).encode()
+
+
+def decode_ack(message: bytes) -> Tuple[int, Dict[str, int]]:
+    """Parses an acknowledgement; raises ValueError if it is malformed."""
+    try:
+        ack = json.loads(message)
+        return int(ack["sequence"]), {str(zone): int(count) for zone, count in ack["active_violations"].items()}
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed acknowledgement: {e}") from e
+
+
+class DetectionForwarder(BatchedChannel):
+    """
+    Node side of the aggregator link. forward() only queues the detection;
+    a background thread sends the detections of each ``batch_window`` as one
+    message and waits for the aggregator's acknowledgement. Unacknowledged
+    batches are kept (oldest dropped beyond ``buffer_limit`` detections) and
+    resent after reconnecting, so an aggregator restart loses nothing recent.
+    active_violation_counts holds the open grace periods per zone as of the
+    last acknowledgement.
+    """
+
+    errors = (OSError, EOFError, AuthenticationError)
+
+    def __init__(self, address: Address = AGGREGATOR_ADDRESS, authkey: bytes = AGGREGATOR_AUTHKEY,
+                 node: str = "node", batch_window: float = EVENT_BATCH_SECONDS,
+                 buffer_limit: int = EVENT_BUFFER_LIMIT, reconnect_delay: float = 1.0,
+                 max_reconnect_delay: float = 30.0, ack_timeout: float = 5.0):
+        super().__init__(batch_window, buffer_limit, reconnect_delay, max_reconnect_delay)
+        self.address = address
+        self.authkey = authkey
+        self.node = node
+        self.ack_timeout = ack_timeout
+        self.peer = f"rule aggregator at {address[0]}:{address[1]}"
+        self.active_violation_counts: Dict[str, int] = {}
+        self._connection: Optional[Connection] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None
+
+    @property
+    def buffered_detections(self) -> int:
+        return self.buffered
+
+    @property
+    def detections_sent(self) -> int:
+        return self.items_sent
+
+    @property
+    def detections_dropped(self) -> int:
+        return self.items_dropped
+
+    def forward(self, camera_id: str, zone_id: str, student_ids: Sequence[str], timestamp: float):
+        """Queues the students seen by one frame; returns immediately."""
+        self._put(Detection(str(camera_id), zone_id, timestamp, tuple(student_ids)))
+
+    def _connect(self):
+        self._connection = Client(self.address, authkey=self.authkey)
+
+    def _deliver(self, sequence: int, detections: List[Detection]):
+        try:
+            self._connection.send_bytes(encode_batch(self.node, sequence, detections))
+            if not self._connection.poll(self.ack_timeout):
+                raise OSError("no acknowledgement from the aggregator")
+            acknowledged, self.active_violation_counts = decode_ack(self._connection.recv_bytes(MAX_BATCH_BYTES))
+            if acknowledged != sequence:
+                raise OSError(f"aggregator acknowledged batch {acknowledged}, expected {sequence}")
+        except ValueError as e:
+            self._disconnect()
+            raise OSError(str(e)) from e
+        except self.errors:
+            self._disconnect()
+            raise
+
+    def _disconnect(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.close()
+
+
+class RuleAggregator:
+    """
+    Central side: accepts detection batches from any number of nodes and
+    applies them to one RuleEngine, so grace periods follow a student across
+    zones watched by different nodes. A single thread runs the rule engine,
+    in arrival order; call_soon() runs other work (e.g. schedule reloads) on
+    that same thread, since the rule engine is not thread-safe.
+
+    Detection timestamps are shifted by the difference between the batch's
+    send time and its arrival, so every node's sightings are ordered on the
+    aggregator's clock even when the node clocks disagree.
+    """
+
+    def __init__(self, rule_engine, address: Address = AGGREGATOR_ADDRESS, authkey: bytes = AGGREGATOR_AUTHKEY,
+                 on_result: Optional[Callable[[DetectionResult], None]] = None):
+        self.rule_engine = rule_engine
+        self.on_result = on_result
+        self.detections_processed = 0
+        # Replaced, never mutated, by the rules thread, so the node connections can read it.
+        self.active_violation_counts: Dict[str, int] = {}
+        self._listener = Listener(address, authkey=authkey)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._connections: List[Connection] = []
+        self._stopped = threading.Event()
+
+    @property
+    def address(self) -> Address:
+        return self._listener.address
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> "RuleAggregator":
+        for target, name in ((self._accept, "aggregator-accept"), (self._process, "aggregator-rules")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._queue.put(None)
+        self._listener.close()
+        for connection in list(self._connections):
+            connection.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+
+    def call_soon(self, fn: Callable[[], None]):
+        self._queue.put(fn)
+
+    def _accept(self):
+        while not self._stopped.is_set():
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                if self._stopped.is_set():
+                    break
+                continue  # Failed handshake, e.g. a wrong authkey
+            self._connections.append(connection)
+            threading.Thread(target=self._receive, args=(connection,), name="aggregator-node", daemon=True).start()
+
+    def _receive(self, connection: Connection):
+        node = None
+        try:
+            while not self._stopped.is_set():
+                node, sequence, sent_at, detections = decode_batch(connection.recv_bytes(MAX_BATCH_BYTES))
+                offset = time.time() - sent_at
+                for detection in detections:
+                    if abs(offset) > CLOCK_OFFSET_TOLERANCE:
+                        detection = replace(detection, timestamp=detection.timestamp + offset)
+                    self._queue.put(detection)
+                connection.send_bytes(encode_ack(sequence, self.active_violation_counts))
+        except ValueError as e:
+            print(f"[❌] Dropping connection from node {node or 'unknown'}: {e}")
+        except (OSError, EOFError):
+            if node and not self._stopped.is_set():
+                print(f"Node {node} disconnected from the rule aggregator.")
+        finally:
+            connection.close()
+            if connection in self._connections:
+                self._connections.remove(connection)
+
+    def _process(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if callable(item):
+                item()
+                continue
+            timestamp = datetime.fromtimestamp(item.timestamp)
+            # Nodes deliver independently (and replay after an outage), so a batch
+            # can arrive after a newer sighting of the same student from another
+            # node; it must not undo it. Timestamps are on the aggregator's clock.
+            last_seen = self.rule_engine.last_seen_location
+            student_ids = [student_id for student_id in item.student_ids
+                           if student_id not in last_seen or last_seen[student_id][1] <= timestamp]
+            rules_started = time.perf_counter()
+            result = self.rule_engine.process_detections(item.zone_id, student_ids, timestamp)
+            RULES_SECONDS.observe(time.perf_counter() - rules_started)
+            self.active_violation_counts = self.rule_engine.active_violation_counts()
+            self.detections_processed += 1
+            if self.on_result:
+                self.on_result(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Central rule engine for multi-node deployments.")
+    parser.add_argument("--listen", default=f"{AGGREGATOR_ADDRESS[0]}:{AGGREGATOR_ADDRESS[1]}",
+                        help="HOST:PORT the recorder nodes connect to.")
+    args = parser.parse_args(argv)
+    address = parse_address(args.listen)
+    if AGGREGATOR_AUTHKEY == DEFAULT_AGGREGATOR_AUTHKEY and not is_loopback(address[0]):
+        parser.error(f"refusing to listen on {args.listen} with the default key; "
+                     "set the AGGREGATOR_AUTHKEY environment variable on the aggregator and every node")
+
+    init_db()
+    notifier = NotificationDispatcher().start()
+
+    violation_writer = ViolationWriter(on_write=record_db_write).start()
+    rule_engine = RuleEngine(load_students(), load_schedules(), load_zones(), grace_period_minutes=10,
+                             timetable=load_timetable(), notifier=notifier, violation_writer=violation_writer,
+                             state_store=violation_writer)
+    resumed = rule_engine.restore_state(load_active_violations(), load_bunking_scores())
+    print(f"Resumed {resumed} open grace period(s).")
+    events = EventPublisher().start()
+
+    def publish_result(result: DetectionResult):
+        for violation in result.confirmed:
+            events.publish('violation', violation_event(violation), key=(violation.student_id, violation.timestamp))
+
+    aggregator = RuleAggregator(rule_engine, address, on_result=publish_result).start()
+    print(f"Rule aggregator listening on {args.listen}.")
+    schedules_loaded_at = metrics_pushed_at = time.time()
+    events_dropped = 0
+    try:
+        while True:
+            time.sleep(0.5)
+            if time.time() - schedules_loaded_at >= SCHEDULE_RELOAD_SECONDS:
+                aggregator.call_soon(lambda: rule_engine.refresh_schedules(load_schedules()))
+                schedules_loaded_at = time.time()
+            if time.time() - metrics_pushed_at >= METRICS_PUSH_SECONDS:
+                NOTIFICATION_QUEUE_DEPTH.set(notifier.queue_depth)
+                DB_QUEUE_DEPTH.set(violation_writer.queue_depth)
+                EVENT_BUFFER_DEPTH.set(events.buffered_events)
+                EVENTS_DROPPED.inc(events.events_dropped - events_dropped)
+                events_dropped = events.events_dropped
+                if events.connected:
+                    events.sio.emit('metrics', REGISTRY.render({'node': 'aggregator'}))
+                metrics_pushed_at = time.time()
+    except KeyboardInterrupt:
+        print("Interrupted. Shutting down.")
+
+    aggregator.stop()
+    events.stop()
+    notifier.stop()
+    violation_writer.stop()
+
+
+if __name__ == "__main__":
+    main()
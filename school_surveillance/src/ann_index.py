@@ -0,0 +1,89 @@
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Inverted-file index over a gallery matrix, in pure NumPy. Rows are
+    clustered with k-means into ``nlist`` lists; a query only scans the rows
+    of its ``nprobe`` closest lists and returns the top-k of those by
+    squared L2 distance. On l2-normalised embeddings this ordering is the
+    same as cosine distance, so the caller can re-rank the candidates
+    exactly with its own metric.
+    """
+
+    def __init__(self, embeddings: np.ndarray, nlist: Optional[int] = None, nprobe: int = 8,
+                 iterations: int = 10, seed: int = 0, max_training_points: int = 50000):
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        count = len(self.embeddings)
+        self.nlist = max(1, min(count, nlist or int(round(math.sqrt(count)))))
+        self.nprobe = max(1, min(nprobe, self.nlist))
+        self._squared_norms = np.einsum("ij,ij->i", self.embeddings, self.embeddings)
+
+        rng = np.random.default_rng(seed)
+        self.centroids = self._train(rng, iterations, max_training_points)
+        assignments = self._nearest_centroid(self.embeddings)
+
+        # Rows grouped by list: list i holds self._rows[self._offsets[i]:self._offsets[i + 1]].
+        self._rows = np.argsort(assignments, kind="stable").astype(np.int64)
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=self.nlist))])
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def _train(self, rng: np.random.Generator, iterations: int, max_training_points: int) -> np.ndarray:
+        count = len(self.embeddings)
+        sample = self.embeddings
+        if count > max_training_points:
+            sample = self.embeddings[rng.choice(count, max_training_points, replace=False)]
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = self._nearest_centroid(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=self.nlist)
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, np.newaxis]
+            if empty.any():
+                centroids[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        return centroids
+
+    def _nearest_centroid(self, points: np.ndarray, centroids: Optional[np.ndarray] = None,
+                          chunk_size: int = 8192) -> np.ndarray:
+        centroids = self.centroids if centroids is None else centroids
+        centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+        assignments = np.empty(len(points), dtype=np.int64)
+        for start in range(0, len(points), chunk_size):
+            chunk = points[start:start + chunk_size]
+            # ||c||^2 - 2 x.c ranks centroids like ||x - c||^2 for a fixed x.
+            assignments[start:start + chunk_size] = np.argmin(centroid_norms - 2.0 * (chunk @ centroids.T), axis=1)
+        return assignments
+
+    def search(self, queries: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns ``(rows, squared_distances)``, each of shape (queries, k),
+        nearest first. Slots without a candidate hold row -1 and distance inf.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+
+        centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        centroid_scores = centroid_norms[np.newaxis, :] - 2.0 * (queries @ self.centroids.T)
+        probes = np.argsort(centroid_scores, axis=1)[:, :self.nprobe]
+
+        for q, query in enumerate(queries):
+            candidates = np.concatenate([self._rows[self._offsets[p]:self._offsets[p + 1]] for p in probes[q]])
+            if len(candidates) == 0:
+                continue
+            candidate_distances = (self._squared_norms[candidates] - 2.0 * (self.embeddings[candidates] @ query)
+                                   + float(query @ query))
+            top = min(k, len(candidates))
+            best = np.argpartition(candidate_distances, top - 1)[:top]
+            best = best[np.argsort(candidate_distances[best])]
+            rows[q, :top] = candidates[best]
+            distances[q, :top] = np.maximum(candidate_distances[best], 0.0)
+        return rows, distances
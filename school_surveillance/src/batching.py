@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+Batch = Tuple[int, List]
+
+
+class BatchedChannel:
+    """
+    Non-blocking, acknowledged channel to another process, shared by the
+    viewer's EventPublisher and the aggregator's DetectionForwarder.
+    Producers only enqueue items; a background thread (re)connects with
+    exponential backoff, collects the items of each ``batch_window`` into
+    one numbered batch, and sends the oldest batch until the peer
+    acknowledges it. While the peer is unreachable, batches are kept for
+    replay, dropping the oldest beyond ``buffer_limit`` items.
+
+    Subclasses implement connected, _connect() and _deliver(), raising one
+    of ``errors`` on failure, and may coalesce items in _coalesce().
+    """
+
+    peer = "peer"
+    errors: Tuple[type, ...] = (OSError,)
+
+    def __init__(self, batch_window: float, buffer_limit: int, reconnect_delay: float = 1.0,
+                 max_reconnect_delay: float = 30.0):
+        self.batch_window = batch_window
+        self.buffer_limit = buffer_limit
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.batches_sent = 0
+        self.items_sent = 0
+        self.items_dropped = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending: Deque[Batch] = deque()
+        self._pending_items = 0
+        self._sequence = 0
+        self._next_connect_at = 0.0
+        self._connect_delay = reconnect_delay
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def connected(self) -> bool:
+        raise NotImplementedError
+
+    @property
+    def buffered(self) -> int:
+        """Items queued or batched but not yet acknowledged by the peer."""
+        return self._queue.qsize() + self._pending_items
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        """Sends what can still be sent within ``timeout`` seconds, then disconnects."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._collect(block=False)
+        deadline = time.monotonic() + timeout
+        while self._pending and self.connected and time.monotonic() < deadline:
+            if not self._send(self._pending[0]):
+                break
+        self._disconnect()
+
+    def _put(self, item):
+        self._queue.put(item)
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _deliver(self, sequence: int, items: List):
+        """Sends one batch and waits for its acknowledgement."""
+        raise NotImplementedError
+
+    def _disconnect(self):
+        pass
+
+    def _coalesce(self, items: List) -> List:
+        return items
+
+    def _run(self):
+        # Connect even with nothing pending, so the connection is up before it is needed.
+        while not self._stopped.is_set():
+            self._collect(block=True)
+            if self._ensure_connected():
+                while self._pending and not self._stopped.is_set():
+                    if not self._send(self._pending[0]):
+                        break
+
+    def _collect(self, block: bool):
+        """Moves the items of one batch window from the queue into a pending batch."""
+        items: List = []
+        try:
+            if block:
+                items.append(self._queue.get(timeout=self.batch_window if self._pending else 0.2))
+                deadline = time.monotonic() + self.batch_window
+                while len(items) < self.buffer_limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    items.append(self._queue.get(timeout=remaining))
+            while True:
+                items.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        if not items:
+            return
+
+        items = self._coalesce(items)
+        self._sequence += 1
+        self._pending.append((self._sequence, items))
+        self._pending_items += len(items)
+        while self._pending_items > self.buffer_limit and len(self._pending) > 1:
+            _, dropped = self._pending.popleft()
+            self._pending_items -= len(dropped)
+            self.items_dropped += len(dropped)
+
+    def _ensure_connected(self) -> bool:
+        if self.connected:
+            return True
+        if time.monotonic() < self._next_connect_at:
+            return False
+        try:
+            self._connect()
+            print(f"Connected to {self.peer}.")
+            self._connect_delay = self.reconnect_delay
+            return True
+        except self.errors as e:
+            print(f"Could not reach {self.peer} ({e}); {self.buffered} item(s) buffered, "
+                  f"retrying in {self._connect_delay:.0f} seconds...")
+            self._next_connect_at = time.monotonic() + self._connect_delay
+            self._connect_delay = min(self._connect_delay * 2, self.max_reconnect_delay)
+            return False
+
+    def _send(self, batch: Batch) -> bool:
+        """Delivers the oldest pending batch; it stays pending unless the peer acknowledges it."""
+        sequence, items = batch
+        try:
+            self._deliver(sequence, items)
+        except self.errors as e:
+            print(f"[❌] Failed to deliver batch {sequence} ({len(items)} item(s)) to {self.peer}: {e}")
+            return False
+        self._pending.popleft()
+        self._pending_items -= len(items)
+        self.batches_sent += 1
+        self.items_sent += len(items)
+        return True
@@ -0,0 +1,107 @@
+import threading
+import time
+from typing import Callable, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+Source = Union[int, str]
+
+
+class CameraStream:
+    """
+    Reads one camera on its own thread and keeps only the newest frame in a
+    single-slot buffer, so a slow camera never stalls the others and stale
+    frames never queue up. Frames overwritten before anyone read them are
+    counted as dropped, and a failing stream is reopened with backoff instead
+    of being closed for good.
+    """
+
+    def __init__(self, source: Source, api_preference: int = cv2.CAP_ANY, name: Optional[str] = None,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0,
+                 capture_factory: Optional[Callable[[Source, int], "cv2.VideoCapture"]] = None):
+        self.source = source
+        self.api_preference = api_preference
+        self.name = name or f"camera-{source}"
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._capture_factory = capture_factory or cv2.VideoCapture
+
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+
+        self._capture = None
+        self._lock = threading.Lock()
+        self._frame: Optional[np.ndarray] = None
+        self._timestamp = 0.0
+        self._sequence = 0
+        self._consumed_sequence = 0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._capture is not None
+
+    def open(self) -> bool:
+        capture = self._capture_factory(self.source, self.api_preference)
+        if capture is not None and capture.isOpened():
+            self._capture = capture
+            return True
+        if capture is not None:
+            capture.release()
+        return False
+
+    def start(self) -> "CameraStream":
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self._release()
+
+    def read(self) -> Optional[Tuple[np.ndarray, float]]:
+        """Returns the newest ``(frame, timestamp)`` not yet read, or ``None``."""
+        with self._lock:
+            if self._sequence == self._consumed_sequence:
+                return None
+            self._consumed_sequence = self._sequence
+            return self._frame, self._timestamp
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            if self._capture is None:
+                if not self.open():
+                    self._stopped.wait(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                    continue
+                delay = self.reconnect_delay
+
+            ret, frame = self._capture.read()
+            if not ret:
+                print(f"Warning: Could not read frame from {self.name}. Reconnecting.")
+                self._release()
+                self.reconnects += 1
+                self._stopped.wait(self.reconnect_delay)
+                continue
+
+            with self._lock:
+                if self._sequence != self._consumed_sequence:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._timestamp = time.time()
+                self._sequence += 1
+                self.frames_read += 1
+
+    def _release(self):
+        capture, self._capture = self._capture, None
+        if capture is not None:
+            capture.release()
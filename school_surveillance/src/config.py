@@ -1,5 +1,6 @@
 
 # school_surveillance/src/config.py
+import os
 
 DATABASE_NAME = "school_surveillance.db"
 
@@ -7,6 +8,7 @@ DATABASE_NAME = "school_surveillance.db"
 CAMERA_CONFIG_PATH = "school_surveillance/data/camera_config.json"
 SCHEDULES_PATH = "school_surveillance/data/schedules.json"
 ZONES_PATH = "school_surveillance/data/zones.json"
+TIMETABLE_PATH = "school_surveillance/data/timetable.json"
 STUDENT_IMAGES_DB_PATH = "school_surveillance/data/student_images"
 
 # SMTP Server Settings for Email Notifications
@@ -16,3 +18,69 @@ SMTP_USERNAME = "your_smtp_username"
 SMTP_PASSWORD = "your_smtp_password"
 SMTP_SENDER_EMAIL = "your_sender_email@example.com"
 ALERT_RECIPIENT_EMAIL = "recipient@example.com"
+SMTP_USE_TLS = True
+
+# Background alert dispatcher: alerts raised within this window are sent as one
+# digest, and alerts that cannot be delivered are spooled to this file.
+NOTIFICATION_DIGEST_SECONDS = 10
+NOTIFICATION_SPOOL_PATH = "school_surveillance/data/notification_spool.jsonl"
+
+# Number of face recognition worker processes (0 runs recognition in the main process)
+RECOGNITION_WORKERS = 0
+
+# Motion gating before face detection. Cameras may override these in
+# camera_config.json with "target_fps" and "motion_threshold".
+DEFAULT_TARGET_FPS = 5
+MOTION_THRESHOLD = 0.002  # Fraction of pixels that must change for a frame to count as motion
+
+# How often the main loop reloads schedules from the database, in seconds
+SCHEDULE_RELOAD_SECONDS = 60
+
+# Live annotated video sent from main.py to the web viewer
+STREAM_ENABLED = True
+STREAM_FPS = 10
+STREAM_JPEG_QUALITY = 70
+STREAM_MAX_WIDTH = 640
+
+# Annotated frames are drawn on a copy downscaled to this width
+RENDER_MAX_WIDTH = 640
+
+# Approximate nearest-neighbour matching for large galleries: None for an
+# exhaustive scan, or "ivf" to use an inverted-file index once the gallery
+# holds at least ANN_MIN_GALLERY_SIZE embeddings.
+ANN_BACKEND = None
+ANN_MIN_GALLERY_SIZE = 5000
+ANN_NPROBE = 8
+
+# Match faces against the students scheduled in a camera's zone first, and
+# only fall back to the whole gallery when none of them matches.
+ZONE_CANDIDATE_MATCHING = True
+
+# Load shedding: under overload, cameras get a share of the recognition
+# capacity weighted by recent faces and rule relevance; the rest is skipped.
+SCHEDULER_ENABLED = True
+SCHEDULER_TARGET_UTILIZATION = 0.9
+SCHEDULER_MIN_FPS = 0.5
+SCHEDULER_REPORT_SECONDS = 60
+
+# How often main.py sends a metrics snapshot to the web viewer's /metrics route
+METRICS_PUSH_SECONDS = 5
+
+# Event channel from main.py to the web viewer: events are sent in batches
+# every EVENT_BATCH_SECONDS, and up to EVENT_BUFFER_LIMIT events are kept for
+# replay while the viewer is unreachable.
+VIEWER_URL = 'http://localhost:5000'
+EVENT_BATCH_SECONDS = 0.25
+EVENT_BUFFER_LIMIT = 10000
+
+# RuleEngine.last_seen_location entries older than this are evicted
+LAST_SEEN_TTL_MINUTES = 120
+
+# Multi-node mode: recorder nodes started with --aggregator send their
+# detections to one rule aggregator (python -m school_surveillance.src.aggregator)
+# listening on this address. The shared key is read from the AGGREGATOR_AUTHKEY
+# environment variable; the aggregator refuses to listen beyond loopback
+# while the built-in default is in use.
+AGGREGATOR_ADDRESS = ('127.0.0.1', 6000)
+DEFAULT_AGGREGATOR_AUTHKEY = b'change-this-aggregator-key'
+AGGREGATOR_AUTHKEY = os.environ.get('AGGREGATOR_AUTHKEY', '').encode() or DEFAULT_AGGREGATOR_AUTHKEY
@@ -1,6 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Dict
-from datetime import datetime
+from datetime import datetime, time
+
+# Label used for faces that match no enrolled student
+UNKNOWN_IDENTITY = "Unknown"
 
 @dataclass
 class Student:
@@ -21,10 +24,22 @@ class Zone:
     name: str
     allowed_periods: List[int]
 
+@dataclass
+class Period:
+    period: int
+    start: time
+    end: time
+
 @dataclass
 class Violation:
     student_id: str
     zone_id: str
     timestamp: datetime
     grace_period_expired: bool = False
-    alert_sent: bool = False
\ No newline at end of file
+    alert_sent: bool = False
+
+@dataclass
+class DetectionResult:
+    created: List[Violation] = field(default_factory=list)
+    confirmed: List[Violation] = field(default_factory=list)
+    revoked: List[Violation] = field(default_factory=list)
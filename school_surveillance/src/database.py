@@ -1,12 +1,39 @@
 import sqlite3
 import json
-from typing import List, Dict, Tuple
-from datetime import datetime
+import queue
+import threading
+import time
+from typing import Callable, List, Dict, Optional, Tuple
+from datetime import date, datetime
 from .config import DATABASE_NAME
 from .data_models import Student, Schedule, Zone, Violation
 
+_local = threading.local()
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Returns this thread's long-lived connection to DATABASE_NAME, opening it
+    in WAL mode on first use so readers never block the writer.
+    """
+    connections: Optional[Dict[str, sqlite3.Connection]] = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(DATABASE_NAME)
+    if conn is None:
+        conn = sqlite3.connect(DATABASE_NAME, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        connections[DATABASE_NAME] = conn
+    return conn
+
+def close_connection():
+    connections: Dict[str, sqlite3.Connection] = getattr(_local, "connections", {})
+    conn = connections.pop(DATABASE_NAME, None)
+    if conn is not None:
+        conn.close()
+
 def init_db():
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = get_connection()
     c = conn.cursor()
 
     c.execute("""
@@ -47,77 +74,350 @@ def init_db():
         )
     """)
 
+    # The primary key already serves per-student history; these cover the
+    # school-wide and per-zone history queries in query_violations().
+    c.execute("CREATE INDEX IF NOT EXISTS idx_violations_timestamp ON violations (timestamp, student_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_violations_zone_timestamp ON violations (zone_id, timestamp, student_id)")
+
+    # RuleEngine checkpoint: the grace periods currently open, one per student.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS active_violations (
+            student_id TEXT PRIMARY KEY,
+            zone_id TEXT,
+            timestamp TEXT,
+            grace_period_expired INTEGER,
+            alert_sent INTEGER
+        )
+    """)
+
+    # Confirmed-violation counts, kept up to date in the same transaction that
+    # writes each violation, so reports never scan the violations table.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS violation_totals_by_student (
+            student_id TEXT PRIMARY KEY,
+            violations INTEGER NOT NULL,
+            last_violation TEXT
+        )
+    """)
+    c.execute("CREATE TABLE IF NOT EXISTS violation_totals_by_day (day TEXT PRIMARY KEY, violations INTEGER NOT NULL)")
+    c.execute("CREATE TABLE IF NOT EXISTS violation_totals_by_zone (zone_id TEXT PRIMARY KEY, violations INTEGER NOT NULL)")
+
     conn.commit()
-    conn.close()
+
+    # Databases created before the totals existed are backfilled once.
+    if not c.execute("SELECT 1 FROM violation_totals_by_student LIMIT 1").fetchone():
+        rebuild_violation_totals()
 
 def save_students(students: List[Student]):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM students")
-    for student in students:
-        c.execute("INSERT INTO students (id, name, image_path) VALUES (?, ?, ?)",
-                  (student.id, student.name, student.image_path))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM students")
+        conn.executemany("INSERT INTO students (id, name, image_path) VALUES (?, ?, ?)",
+                         [(student.id, student.name, student.image_path) for student in students])
 
 def load_students() -> List[Student]:
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT id, name, image_path FROM students")
+    c = get_connection().execute("SELECT id, name, image_path FROM students")
     students_data = c.fetchall()
-    conn.close()
     return [Student(id=s[0], name=s[1], image_path=s[2]) for s in students_data]
 
 def save_schedules(schedules: List[Schedule]):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM schedules")
-    for schedule in schedules:
-        c.execute("INSERT INTO schedules (student_id, period, classroom_id) VALUES (?, ?, ?)",
-                  (schedule.student_id, schedule.period, schedule.classroom_id))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM schedules")
+        conn.executemany("INSERT INTO schedules (student_id, period, classroom_id) VALUES (?, ?, ?)",
+                         [(schedule.student_id, schedule.period, schedule.classroom_id) for schedule in schedules])
 
 def load_schedules() -> List[Schedule]:
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT student_id, period, classroom_id FROM schedules")
+    c = get_connection().execute("SELECT student_id, period, classroom_id FROM schedules")
     schedules_data = c.fetchall()
-    conn.close()
     return [Schedule(student_id=s[0], period=s[1], classroom_id=s[2]) for s in schedules_data]
 
 def save_zones(zones: List[Zone]):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM zones")
-    for zone in zones:
-        c.execute("INSERT INTO zones (id, name, allowed_periods) VALUES (?, ?, ?)",
-                  (zone.id, zone.name, json.dumps(zone.allowed_periods)))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM zones")
+        conn.executemany("INSERT INTO zones (id, name, allowed_periods) VALUES (?, ?, ?)",
+                         [(zone.id, zone.name, json.dumps(zone.allowed_periods)) for zone in zones])
 
 def load_zones() -> List[Zone]:
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT id, name, allowed_periods FROM zones")
+    c = get_connection().execute("SELECT id, name, allowed_periods FROM zones")
     zones_data = c.fetchall()
-    conn.close()
     return [Zone(id=z[0], name=z[1], allowed_periods=json.loads(z[2])) for z in zones_data]
 
+def _violation_row(violation: Violation) -> Tuple:
+    return (violation.student_id, violation.zone_id, violation.timestamp.isoformat(),
+            int(violation.grace_period_expired), int(violation.alert_sent))
+
+def _count_violation(conn: sqlite3.Connection, student_id: str, zone_id: str, timestamp: str):
+    conn.execute("INSERT INTO violation_totals_by_student (student_id, violations, last_violation) VALUES (?, 1, ?) "
+                 "ON CONFLICT(student_id) DO UPDATE SET violations = violations + 1, "
+                 "last_violation = MAX(COALESCE(last_violation, ''), excluded.last_violation)", (student_id, timestamp))
+    conn.execute("INSERT INTO violation_totals_by_day (day, violations) VALUES (?, 1) "
+                 "ON CONFLICT(day) DO UPDATE SET violations = violations + 1", (timestamp[:10],))
+    conn.execute("INSERT INTO violation_totals_by_zone (zone_id, violations) VALUES (?, 1) "
+                 "ON CONFLICT(zone_id) DO UPDATE SET violations = violations + 1", (zone_id,))
+
+def _write_violation_row(conn: sqlite3.Connection, row: Tuple):
+    """Upserts one violation row, counting it in the totals the first time it is saved as confirmed."""
+    student_id, zone_id, timestamp, grace_period_expired, _ = row
+    previous = conn.execute("SELECT grace_period_expired FROM violations WHERE student_id = ? AND timestamp = ?",
+                            (student_id, timestamp)).fetchone()
+    conn.execute("INSERT OR REPLACE INTO violations (student_id, zone_id, timestamp, grace_period_expired, alert_sent) "
+                 "VALUES (?, ?, ?, ?, ?)", row)
+    if grace_period_expired and not (previous and previous[0]):
+        _count_violation(conn, student_id, zone_id, timestamp)
+
+def _write(operations: List[Tuple[str, Tuple]]):
+    """
+    Applies queued writes in order in one transaction: ("violation", row),
+    ("active", row) to checkpoint an open grace period, or ("clear", (student_id,)).
+    """
+    conn = get_connection()
+    with conn:
+        for kind, row in operations:
+            if kind == "violation":
+                _write_violation_row(conn, row)
+            elif kind == "active":
+                conn.execute("INSERT OR REPLACE INTO active_violations "
+                             "(student_id, zone_id, timestamp, grace_period_expired, alert_sent) VALUES (?, ?, ?, ?, ?)", row)
+            elif kind == "clear":
+                conn.execute("DELETE FROM active_violations WHERE student_id = ?", row)
+            else:
+                raise ValueError(f"Unknown write {kind!r}")
+
+def save_violations(violations: List[Violation]):
+    """Upserts on (student_id, timestamp): saving a violation again, e.g. once confirmed, replaces its row."""
+    _write([("violation", _violation_row(v)) for v in violations])
+
 def save_violation(violation: Violation):
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("INSERT INTO violations (student_id, zone_id, timestamp, grace_period_expired, alert_sent) VALUES (?, ?, ?, ?, ?)",
-              (violation.student_id, violation.zone_id, violation.timestamp.isoformat(),
-               int(violation.grace_period_expired), int(violation.alert_sent)))
-    conn.commit()
-    conn.close()
+    save_violations([violation])
 
 def load_violations() -> List[Violation]:
-    conn = sqlite3.connect(DATABASE_NAME)
-    c = conn.cursor()
-    c.execute("SELECT student_id, zone_id, timestamp, grace_period_expired, alert_sent FROM violations")
+    c = get_connection().execute("SELECT student_id, zone_id, timestamp, grace_period_expired, alert_sent FROM violations")
     violations_data = c.fetchall()
-    conn.close()
     return [Violation(student_id=v[0], zone_id=v[1], timestamp=datetime.fromisoformat(v[2]),
-                      grace_period_expired=bool(v[3]), alert_sent=bool(v[4])) for v in violations_data]
\ No newline at end of file
+                      grace_period_expired=bool(v[3]), alert_sent=bool(v[4])) for v in violations_data]
+
+def save_active_violation(violation: Violation):
+    _write([("active", _violation_row(violation))])
+
+def clear_active_violation(student_id: str):
+    _write([("clear", (student_id,))])
+
+def load_active_violations() -> Dict[str, Violation]:
+    c = get_connection().execute(
+        "SELECT student_id, zone_id, timestamp, grace_period_expired, alert_sent FROM active_violations")
+    return {v[0]: Violation(student_id=v[0], zone_id=v[1], timestamp=datetime.fromisoformat(v[2]),
+                            grace_period_expired=bool(v[3]), alert_sent=bool(v[4])) for v in c.fetchall()}
+
+def rebuild_violation_totals():
+    """Recomputes the violation_totals_* tables from the violations table."""
+    conn = get_connection()
+    with conn:
+        for table in ("violation_totals_by_student", "violation_totals_by_day", "violation_totals_by_zone"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("INSERT INTO violation_totals_by_student (student_id, violations, last_violation) "
+                     "SELECT student_id, COUNT(*), MAX(timestamp) FROM violations WHERE grace_period_expired "
+                     "GROUP BY student_id")
+        conn.execute("INSERT INTO violation_totals_by_day (day, violations) "
+                     "SELECT substr(timestamp, 1, 10), COUNT(*) FROM violations WHERE grace_period_expired "
+                     "GROUP BY substr(timestamp, 1, 10)")
+        conn.execute("INSERT INTO violation_totals_by_zone (zone_id, violations) "
+                     "SELECT zone_id, COUNT(*) FROM violations WHERE grace_period_expired GROUP BY zone_id")
+
+def load_bunking_scores() -> Dict[str, int]:
+    """Confirmed violations per student, i.e. the RuleEngine's bunking scores."""
+    c = get_connection().execute("SELECT student_id, violations FROM violation_totals_by_student")
+    return dict(c.fetchall())
+
+def student_violation_total(student_id: str) -> int:
+    row = get_connection().execute("SELECT violations FROM violation_totals_by_student WHERE student_id = ?",
+                                   (student_id,)).fetchone()
+    return row[0] if row else 0
+
+def violation_totals_by_zone() -> Dict[str, int]:
+    c = get_connection().execute("SELECT zone_id, violations FROM violation_totals_by_zone")
+    return dict(c.fetchall())
+
+def violation_totals_by_day(since: Optional[date] = None, until: Optional[date] = None) -> Dict[date, int]:
+    """Confirmed violations per day, for days in [since, until)."""
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("day >= ?")
+        params.append(since.isoformat())
+    if until is not None:
+        clauses.append("day < ?")
+        params.append(until.isoformat())
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    c = get_connection().execute(f"SELECT day, violations FROM violation_totals_by_day {where} ORDER BY day", params)
+    return {date.fromisoformat(day): violations for day, violations in c.fetchall()}
+
+def query_violations(student_id: Optional[str] = None, zone_id: Optional[str] = None,
+                     since: Optional[datetime] = None, until: Optional[datetime] = None, limit: int = 50,
+                     before: Optional[Tuple[str, str]] = None) -> Tuple[List[Violation], Optional[Tuple[str, str]]]:
+    """
+    Returns the newest violations matching the filters, plus the keyset
+    cursor ``(timestamp, student_id)`` of the last row when more pages exist.
+    Pass that cursor back as ``before`` to fetch the next page.
+    """
+    clauses, params = [], []
+    if student_id is not None:
+        clauses.append("student_id = ?")
+        params.append(student_id)
+    if zone_id is not None:
+        clauses.append("zone_id = ?")
+        params.append(zone_id)
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(since.isoformat())
+    if until is not None:
+        clauses.append("timestamp < ?")
+        params.append(until.isoformat())
+    if before is not None:
+        clauses.append("(timestamp, student_id) < (?, ?)")
+        params.extend(before)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    c = get_connection().execute(
+        f"SELECT student_id, zone_id, timestamp, grace_period_expired, alert_sent FROM violations {where} "
+        "ORDER BY timestamp DESC, student_id DESC LIMIT ?", params + [limit + 1])
+    rows = c.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1][2], rows[-1][0])
+    return [Violation(student_id=v[0], zone_id=v[1], timestamp=datetime.fromisoformat(v[2]),
+                      grace_period_expired=bool(v[3]), alert_sent=bool(v[4])) for v in rows], next_cursor
+
+
+class ViolationWriter:
+    """
+    Write-behind queue for violations: save() only snapshots the row and
+    returns, and a background thread commits the queued rows in batches, so
+    a slow disk never stalls the video loop. It also checkpoints the
+    RuleEngine's open grace periods (save_active/clear_active), in the same
+    order and batches as the violations. A failed batch is retried with
+    backoff until it commits. Like save_violations(), a violation saved
+    again (same student and timestamp) replaces its earlier row.
+    """
+
+    def __init__(self, flush_interval: float = 1.0, max_batch: int = 500,
+                 on_write: Optional[Callable[[int, float], None]] = None,
+                 retry_delay: float = 0.5, max_retry_delay: float = 30.0):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.on_write = on_write  # Called with (rows, seconds) after each committed batch.
+        self.rows_written = 0
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue()
+        # Rows taken from the queue but not committed yet, oldest first.
+        self._pending: List[Tuple] = []
+        self._stopping = threading.Event()
+        self._stop_deadline = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() + len(self._pending)
+
+    def start(self) -> "ViolationWriter":
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="violation-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def save(self, violation: Violation):
+        self._queue.put(("violation", _violation_row(violation)))
+
+    def save_active(self, violation: Violation):
+        self._queue.put(("active", _violation_row(violation)))
+
+    def clear_active(self, student_id: str):
+        self._queue.put(("clear", (student_id,)))
+
+    def flush(self):
+        """Blocks until everything queued so far has been committed."""
+        self._queue.join()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Writes what is still queued. If the database keeps rejecting writes,
+        the rows still unwritten after ``timeout`` seconds are dropped.
+        """
+        if self._thread is not None:
+            self._stop_deadline = time.monotonic() + timeout
+            self._stopping.set()
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _take(self, rows: List[Tuple], block: bool) -> bool:
+        """Moves queued rows into ``rows``, up to max_batch; returns False once stop() was requested."""
+        try:
+            while len(rows) < self.max_batch:
+                item = self._queue.get(timeout=self.flush_interval) if block else self._queue.get_nowait()
+                block = False
+                if item is None:
+                    self._queue.task_done()
+                    return False
+                rows.append(item)
+        except queue.Empty:
+            pass
+        return True
+
+    def _discard(self, pending: List[Tuple]) -> int:
+        """Drops the pending rows and everything still queued; returns how many rows were lost."""
+        dropped = len(pending)
+        for _ in pending:
+            self._queue.task_done()
+        pending.clear()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return dropped
+            self._queue.task_done()
+            if item is not None:
+                dropped += 1
+
+    def _run(self):
+        # A failed batch stays at the front of the pending rows, so a locked
+        # or unavailable database neither loses nor reorders them.
+        pending = self._pending
+        running = True
+        retry_delay = self.retry_delay
+        while running or pending:
+            if running:
+                running = self._take(pending, block=not pending)
+            if not pending:
+                continue
+
+            batch = pending[:self.max_batch]
+            try:
+                started = time.perf_counter()
+                _write(batch)
+            except sqlite3.Error as e:
+                close_connection()  # Reopen on the next attempt
+                if self._stopping.is_set():
+                    remaining = self._stop_deadline - time.monotonic()
+                    if remaining <= 0:
+                        print(f"[❌] Giving up on {self._discard(pending)} unwritten row(s) at shutdown: {e}")
+                        break
+                    time.sleep(min(retry_delay, remaining))
+                else:
+                    print(f"[❌] Failed to write {len(batch)} row(s) to the database: {e}; "
+                          f"retrying in {retry_delay:.1f} seconds...")
+                    self._stopping.wait(retry_delay)  # stop() cuts the wait short
+                retry_delay = min(retry_delay * 2, self.max_retry_delay)
+                continue
+
+            del pending[:len(batch)]
+            retry_delay = self.retry_delay
+            self.rows_written += len(batch)
+            if self.on_write:
+                self.on_write(len(batch), time.perf_counter() - started)
+            for _ in batch:
+                self._queue.task_done()
+        close_connection()
@@ -0,0 +1,202 @@
+import argparse
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import STUDENT_IMAGES_DB_PATH
+from .gallery import list_images
+
+STORE_DIRNAME = "embeddings"
+INDEX_FILENAME = "index.json"
+FORMAT_VERSION = 2
+
+
+def default_store_path(db_path: str) -> str:
+    return os.path.join(db_path, STORE_DIRNAME)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class EnrollmentReport:
+    added: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+
+
+class GalleryStore:
+    """
+    On-disk gallery: one ``embeddings-<version>.npy`` matrix, opened
+    memory-mapped, plus an ``index.json`` sidecar mapping each row to its
+    image and content hash. Every save writes a new matrix file and then
+    atomically replaces the index, so a reader always sees a matching pair.
+    Rows are stored L2-normalised, with each row's original norm in its
+    index entry, so a cosine gallery matches straight from the mapping.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = os.path.join(path, INDEX_FILENAME)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.index_path)
+
+    def version_token(self) -> Optional[int]:
+        """Cheap change marker for the store (mtime of the index), or None if it does not exist."""
+        try:
+            return os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load_index(self) -> Dict:
+        if not self.exists():
+            return {"format": FORMAT_VERSION, "version": 0, "model_name": None, "entries": [], "embeddings": None}
+        with open(self.index_path, "r") as f:
+            return json.load(f)
+
+    def load(self) -> Tuple[Dict, np.ndarray]:
+        index = self.load_index()
+        if not index["entries"]:
+            return index, np.empty((0, index.get("dimension") or 0), dtype=np.float32)
+        embeddings = np.load(os.path.join(self.path, index["embeddings"]), mmap_mode="r")
+        return index, embeddings
+
+    def load_raw(self) -> Tuple[Dict, np.ndarray]:
+        """Like load(), but with the rows at their original norms, copied into memory."""
+        index, embeddings = self.load()
+        if not index.get("normalized"):
+            return index, np.array(embeddings, dtype=np.float32)  # Written before rows were normalised
+        norms = np.array([entry["norm"] for entry in index["entries"]], dtype=np.float32)
+        return index, embeddings * norms[:, np.newaxis]
+
+    def save(self, model_name: str, entries: List[Dict], embeddings: np.ndarray) -> Dict:
+        os.makedirs(self.path, exist_ok=True)
+        previous = self.load_index()
+        version = previous["version"] + 1
+        matrix_name = f"embeddings-{version}.npy"
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1) if embeddings.size else np.zeros(len(entries), dtype=np.float32)
+        np.save(os.path.join(self.path, matrix_name),
+                np.ascontiguousarray(embeddings / np.maximum(norms, 1e-10)[:, np.newaxis]))
+        index = {"format": FORMAT_VERSION, "version": version, "model_name": model_name,
+                 "dimension": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+                 "embeddings": matrix_name, "normalized": True,
+                 "entries": [dict(entry, norm=float(norm)) for entry, norm in zip(entries, norms)]}
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+        for name in os.listdir(self.path):
+            if name.startswith("embeddings-") and name.endswith(".npy") and name != matrix_name:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass  # Still mapped by a running recognizer; removed on a later save.
+        return index
+
+
+def _embed_images(image_paths: List[str], recognizer) -> List[Optional[np.ndarray]]:
+    import cv2
+
+    crops, owners = [], []
+    for i, image_path in enumerate(image_paths):
+        image = cv2.imread(image_path)
+        if image is None:
+            continue
+        detections = recognizer.detector.detect(image)
+        if detections:
+            # Enrollment photos show one student; keep the largest face.
+            best = max(detections, key=lambda d: (d.box[1] - d.box[3]) * (d.box[2] - d.box[0]))
+            crops.append(best.crop)
+        else:
+            crops.append(image[:, :, ::-1] / 255.0)
+        owners.append(i)
+
+    embeddings: List[Optional[np.ndarray]] = [None] * len(image_paths)
+    if crops:
+        for i, embedding in zip(owners, recognizer.embedder.embed(crops)):
+            embeddings[i] = embedding
+    return embeddings
+
+
+def enroll(db_path: str, recognizer, store_path: Optional[str] = None) -> EnrollmentReport:
+    """
+    Brings the gallery store in line with the images in ``db_path``. Only
+    images whose content hash is new or changed are embedded; rows of
+    unchanged images are reused, and rows of deleted images are dropped.
+    """
+    store = GalleryStore(store_path or default_store_path(db_path))
+    index, stored_embeddings = store.load_raw()
+    if index["model_name"] not in (None, recognizer.model_name):
+        # Embeddings from another model are not comparable; start over.
+        index, stored_embeddings = {"entries": []}, stored_embeddings[:0]
+    previous = {entry["image"]: (row, entry) for row, entry in enumerate(index["entries"])}
+
+    report = EnrollmentReport()
+    entries: List[Dict] = []
+    rows: List[np.ndarray] = []
+    to_embed: List[Tuple[str, str, str, Optional[Tuple[int, Dict]]]] = []
+
+    for image_path in sorted(list_images(db_path)):
+        image = os.path.basename(image_path)
+        sha256 = file_sha256(image_path)
+        known = previous.pop(image, None)
+        if known and known[1]["sha256"] == sha256:
+            entries.append(known[1])
+            rows.append(np.asarray(stored_embeddings[known[0]]))
+            report.unchanged.append(image)
+        else:
+            to_embed.append((image_path, image, sha256, known))
+
+    new_embeddings = _embed_images([path for path, _, _, _ in to_embed], recognizer) if to_embed else []
+    for (image_path, image, sha256, known), embedding in zip(to_embed, new_embeddings):
+        if embedding is None:
+            report.failed.append(image)
+            if known:
+                # Keep serving the previous embedding until the new image can be processed.
+                entries.append(known[1])
+                rows.append(np.asarray(stored_embeddings[known[0]]))
+            continue
+        entries.append({"image": image, "sha256": sha256})
+        rows.append(np.asarray(embedding, dtype=np.float32))
+        (report.updated if known else report.added).append(image)
+
+    report.removed = sorted(previous)
+    if report.added or report.updated or report.removed or not store.exists():
+        matrix = np.stack(rows).astype(np.float32) if rows else np.empty((0, 0), dtype=np.float32)
+        store.save(recognizer.model_name, entries, matrix)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enroll new or changed student images into the face gallery.")
+    parser.add_argument("--images", default=STUDENT_IMAGES_DB_PATH, help="Directory of <student_id>.jpg images.")
+    parser.add_argument("--store", default=None, help="Gallery store directory (default: <images>/embeddings).")
+    parser.add_argument("--model", default="VGG-Face", help="DeepFace model used for the embeddings.")
+    args = parser.parse_args(argv)
+
+    from .face_recognition import FaceRecognizer
+
+    report = enroll(args.images, FaceRecognizer(model_name=args.model), args.store)
+    print(f"Enrollment finished: {len(report.added)} added, {len(report.updated)} updated, "
+          f"{len(report.removed)} removed, {len(report.unchanged)} unchanged, {len(report.failed)} failed.")
+    for image in report.failed:
+        print(f"Warning: Could not compute an embedding for {image}.")
+
+
+if __name__ == "__main__":
+    main()
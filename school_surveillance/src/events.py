@@ -0,0 +1,81 @@
+from typing import Callable, Dict, Hashable, List, Optional
+
+import socketio
+
+from .batching import BatchedChannel
+from .config import VIEWER_URL, EVENT_BATCH_SECONDS, EVENT_BUFFER_LIMIT
+
+
+def violation_event(violation) -> Dict:
+    """The 'violation' event payload for a confirmed Violation."""
+    return {
+        'student_id': violation.student_id,
+        'zone_id': violation.zone_id,
+        'timestamp': violation.timestamp.isoformat(),
+        'grace_period_expired': violation.grace_period_expired,
+        'alert_sent': violation.alert_sent
+    }
+
+
+class EventPublisher(BatchedChannel):
+    """
+    Non-blocking channel from the processing loop to the web viewer.
+    publish() only queues the event; a background thread collects the
+    events of each ``batch_window`` into one batch, keeping only the newest
+    event per key, and sends it with a single acknowledged 'event_batch'
+    call. While the viewer is unreachable, batches are buffered (oldest
+    dropped beyond ``buffer_limit`` events) and replayed in order once the
+    connection is back, so startup and viewer outages never stall the loop.
+    """
+
+    peer = "web viewer"
+    errors = (socketio.exceptions.SocketIOError, ValueError, OSError)
+
+    def __init__(self, url: str = VIEWER_URL, batch_window: float = EVENT_BATCH_SECONDS,
+                 buffer_limit: int = EVENT_BUFFER_LIMIT, reconnect_delay: float = 1.0,
+                 max_reconnect_delay: float = 30.0, ack_timeout: float = 5.0,
+                 client_factory: Optional[Callable[[], "socketio.Client"]] = None):
+        super().__init__(batch_window, buffer_limit, reconnect_delay, max_reconnect_delay)
+        self.url = url
+        self.ack_timeout = ack_timeout
+        self.sio = (client_factory or socketio.Client)()
+
+    @property
+    def connected(self) -> bool:
+        return self.sio.connected
+
+    @property
+    def buffered_events(self) -> int:
+        """Events queued or batched but not yet acknowledged by the viewer."""
+        return self.buffered
+
+    @property
+    def events_sent(self) -> int:
+        return self.items_sent
+
+    @property
+    def events_dropped(self) -> int:
+        return self.items_dropped
+
+    def publish(self, event_type: str, data: Dict, key: Optional[Hashable] = None):
+        """
+        Queues an event; returns immediately. Events of the same type and
+        ``key`` within one batch window are coalesced into the newest one.
+        """
+        self._put({"type": event_type, "data": data, "key": (event_type, key) if key is not None else None})
+
+    def _coalesce(self, events: List[Dict]) -> List[Dict]:
+        coalesced: Dict[Hashable, Dict] = {}
+        for i, event in enumerate(events):
+            coalesced[event["key"] if event["key"] is not None else i] = event
+        return [{"type": e["type"], "data": e["data"]} for e in coalesced.values()]
+
+    def _connect(self):
+        self.sio.connect(self.url)
+
+    def _deliver(self, sequence: int, events: List[Dict]):
+        self.sio.call('event_batch', {"sequence": sequence, "events": events}, timeout=self.ack_timeout)
+
+    def _disconnect(self):
+        if self.connected:
+            self.sio.disconnect()
@@ -1,39 +1,275 @@
-from deepface import DeepFace
-import cv2
-import pandas as pd
-from typing import List, Tuple
+import numpy as np
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+from .gallery import FaceGallery
+from .enrollment import GalleryStore, default_store_path
+from .config import ANN_BACKEND, ANN_MIN_GALLERY_SIZE, ANN_NPROBE
+from .metrics import RECOGNITION_ERRORS, RECOGNITION_SECONDS
+from .tracker import Box, FaceTracker, Track
+
+
+@dataclass
+class FaceDetection:
+    box: Box
+    crop: np.ndarray  # RGB face crop scaled to [0, 1]
+    confidence: float
+
+
+class FaceDetector:
+    """Detection stage: finds and aligns faces in a frame, without embedding them."""
+
+    def __init__(self, detector_backend: str = "opencv", align: bool = True):
+        self.detector_backend = detector_backend
+        self.align = align
+
+    def detect(self, frame) -> List[FaceDetection]:
+        from deepface import DeepFace
+
+        faces = DeepFace.extract_faces(img_path=frame, detector_backend=self.detector_backend,
+                                       enforce_detection=False, align=self.align)
+        detections = []
+        for face in faces:
+            # With enforce_detection disabled DeepFace returns the whole frame with
+            # zero confidence when it finds nothing.
+            if face.get("confidence", 0) <= 0:
+                continue
+            area = face["facial_area"]
+            x, y, w, h = int(area["x"]), int(area["y"]), int(area["w"]), int(area["h"])
+            detections.append(FaceDetection((y, x + w, y + h, x), face["face"], float(face["confidence"])))
+        return detections
+
+
+class FaceEmbedder:
+    """Embedding stage: runs one model forward pass over a batch of face crops."""
+
+    def __init__(self, model_name: str = "VGG-Face"):
+        self.model_name = model_name
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            # DeepFace pulls in TensorFlow; import it only when a model is actually needed.
+            from deepface import DeepFace
+
+            self._model = DeepFace.build_model(self.model_name)
+        return self._model
+
+    @property
+    def input_size(self) -> Tuple[int, int]:
+        height, width = self.model.input_shape
+        return height, width
+
+    def embed(self, crops: Sequence[np.ndarray]) -> np.ndarray:
+        if not crops:
+            return np.empty((0, 0), dtype=np.float32)
+
+        batch = np.stack([self._preprocess(crop) for crop in crops])
+        embeddings = np.asarray(self.model.model(batch, training=False), dtype=np.float32)
+        embeddings = embeddings.reshape(len(crops), -1)
+        if self.model_name == "VGG-Face":
+            # DeepFace l2-normalises VGG-Face descriptors outside the network.
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-10)
+        return embeddings
+
+    def _preprocess(self, crop: np.ndarray) -> np.ndarray:
+        """Letterboxes an RGB crop into the model input, as DeepFace.represent does."""
+        import cv2
+
+        target_height, target_width = self.input_size
+        img = np.asarray(crop, dtype=np.float32)
+        if img.max() > 1:
+            img = img / 255.0
+        img = img[:, :, ::-1]  # RGB -> BGR, the order the models were trained on
+
+        factor = min(target_height / img.shape[0], target_width / img.shape[1])
+        resized_size = (max(1, int(img.shape[1] * factor)), max(1, int(img.shape[0] * factor)))
+        img = cv2.resize(img, resized_size)
+
+        pad_height = target_height - img.shape[0]
+        pad_width = target_width - img.shape[1]
+        return np.pad(img, ((pad_height // 2, pad_height - pad_height // 2),
+                            (pad_width // 2, pad_width - pad_width // 2), (0, 0)))
+
 
 class FaceRecognizer:
-    def __init__(self, model_name: str = "VGG-Face", distance_threshold: float = 0.4):
+    def __init__(self, model_name: str = "VGG-Face", distance_threshold: float = 0.4, distance_metric: str = "cosine",
+                 detector_backend: str = "opencv", gallery_refresh_interval: float = 30.0,
+                 ann_backend: Optional[str] = ANN_BACKEND, ann_min_gallery_size: int = ANN_MIN_GALLERY_SIZE):
         self.model_name = model_name
         self.distance_threshold = distance_threshold
+        self.distance_metric = distance_metric
+        self.detector = FaceDetector(detector_backend)
+        self.embedder = FaceEmbedder(model_name)
+        self.gallery_refresh_interval = gallery_refresh_interval
+        self.ann_backend = ann_backend
+        self.ann_min_gallery_size = ann_min_gallery_size
+        self._galleries: Dict[str, FaceGallery] = {}
+        self._gallery_versions: Dict[str, Optional[int]] = {}
+        self._gallery_checked_at: Dict[str, float] = {}
+        self._gallery_builds: Dict[str, threading.Thread] = {}
+        # Seconds spent in each stage by the last recognize_batch() call; stages it skipped are absent.
+        self.last_timings: Dict[str, float] = {}
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._warm_up_thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        """False while a background warm-up started by start_warm_up() is still running."""
+        return self._warm_up_thread is None or not self._warm_up_thread.is_alive()
+
+    def warm_up(self, db_path: str):
+        """
+        Loads the gallery, the detector and the model, and runs one dummy
+        batch through them so the first real frame does not pay for it.
+        """
+        started = time.monotonic()
+        self.load_gallery(db_path)
+        self.detector.detect(np.zeros((64, 64, 3), dtype=np.uint8))
+        height, width = self.embedder.input_size
+        self.embedder.embed([np.zeros((height, width, 3), dtype=np.float32)])
+        print(f"Face recognition ready in {time.monotonic() - started:.1f}s.")
+
+    def start_warm_up(self, db_path: str) -> threading.Thread:
+        """Runs warm_up() on a background thread; check ``ready`` before recognizing."""
+        def run():
+            try:
+                self.warm_up(db_path)
+            except Exception as e:
+                print(f"Warning: Face recognition warm-up failed ({e}); models load on first use.")
+
+        self._warm_up_thread = threading.Thread(target=run, name="recognizer-warm-up", daemon=True)
+        self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def load_gallery(self, db_path: str) -> FaceGallery:
+        """
+        Loads the embeddings for ``db_path`` once and keeps them in memory.
+        The enrollment store is polled every ``gallery_refresh_interval``
+        seconds. When enrollment has changed it, the new gallery (and its
+        index) is built on a background thread while the current one keeps
+        serving, and swapped in once ready.
+        """
+        gallery = self._galleries.get(db_path)
+        now = time.monotonic()
+        if gallery is None:
+            self._gallery_checked_at[db_path] = now
+            return self._build_gallery(db_path, GalleryStore(default_store_path(db_path)).version_token())
+        if now - self._gallery_checked_at[db_path] < self.gallery_refresh_interval:
+            return gallery
+
+        self._gallery_checked_at[db_path] = now
+        build = self._gallery_builds.get(db_path)
+        if build is not None and build.is_alive():
+            return gallery
+        version = GalleryStore(default_store_path(db_path)).version_token()
+        if version != self._gallery_versions.get(db_path):
+            def run():
+                try:
+                    self._build_gallery(db_path, version)
+                except Exception as e:
+                    # The current gallery keeps serving; the build is retried at the next poll.
+                    print(f"Warning: Could not reload the face gallery for {db_path} ({e}).")
+
+            build = self._gallery_builds[db_path] = threading.Thread(target=run, name="gallery-reload", daemon=True)
+            build.start()
+        return gallery
+
+    def _build_gallery(self, db_path: str, version: Optional[int]) -> FaceGallery:
+        gallery = FaceGallery.from_db_path(db_path, self.model_name, self.distance_metric)
+        if self.ann_backend == "ivf" and len(gallery) >= self.ann_min_gallery_size:
+            gallery.build_ann_index(nprobe=ANN_NPROBE)
+        self._galleries[db_path] = gallery
+        self._gallery_versions[db_path] = version
+        return gallery
 
-    def recognize_faces(self, frame, db_path: str) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+    def recognize_batch(self, frames: Dict[Hashable, np.ndarray], db_path: str,
+                        trackers: Optional[Dict[Hashable, FaceTracker]] = None,
+                        candidates: Optional[Dict[Hashable, Optional[FrozenSet[str]]]] = None
+                        ) -> Dict[Hashable, List[Tuple[str, Box]]]:
+        """
+        Recognizes the faces of several frames (e.g. one per camera) together:
+        every frame goes through the detector, then the crops of all frames
+        are embedded in a single forward pass and matched in one operation.
+
+        When a tracker is given for a frame's key, faces that keep a confident
+        identity from earlier frames reuse it and skip the embedding stage.
+
+        ``candidates`` optionally maps a frame's key to the students expected
+        in front of that camera; its faces are matched against those first
+        and only fall back to the whole gallery when none of them matches.
+        """
+        recognized_faces: Dict[Hashable, List[Tuple[str, Box]]] = {key: [] for key in frames}
+        timings: Dict[str, float] = {}
+        self.last_timings = timings
+        self.last_error = None
+        batch_started = time.perf_counter()
         try:
-            dfs = DeepFace.find(img_path=frame, db_path=db_path, model_name=self.model_name, enforce_detection=False, silent=True)
-            
-            recognized_faces = []
-            for df in dfs:
-                if not df.empty:
-                    best_match = df.iloc[0]
-                    identity = best_match['identity']
-                    distance = best_match['distance']
-                    
-                    if distance < self.distance_threshold:
-                        student_id = identity.split('/')[-1].split('.')[0]
-                        x = int(best_match['source_x'])
-                        y = int(best_match['source_y'])
-                        w = int(best_match['source_w'])
-                        h = int(best_match['source_h'])
-                        recognized_faces.append((student_id, (y, x + w, y + h, x)))
+            gallery = self.load_gallery(db_path)
+            now = time.monotonic()
+
+            started = time.perf_counter()
+            frame_tracks: Dict[Hashable, List[Track]] = {}
+            pending: List[Tuple[Optional[Track], Hashable, FaceDetection]] = []
+            for key, frame in frames.items():
+                detections = self.detector.detect(frame)
+                tracker = trackers.get(key) if trackers else None
+                if tracker is None:
+                    pending.extend((None, key, d) for d in detections)
+                    continue
+                tracks = tracker.update([d.box for d in detections])
+                frame_tracks[key] = tracks
+                pending.extend((track, key, d) for track, d in zip(tracks, detections)
+                               if tracker.needs_recognition(track, now))
+
+            timings["detection"] = time.perf_counter() - started
+
+            if pending:
+                started = time.perf_counter()
+                embeddings = self.embedder.embed([d.crop for _, _, d in pending])
+                timings["embedding"] = time.perf_counter() - started
+                started = time.perf_counter()
+                matches = self._match_pending(gallery, embeddings, [key for _, key, _ in pending], candidates)
+                timings["matching"] = time.perf_counter() - started
+
+                for (track, key, detection), (student_id, distance) in zip(pending, matches):
+                    if track is None:
+                        recognized_faces[key].append((student_id, detection.box))
                     else:
-                        x = int(best_match['source_x'])
-                        y = int(best_match['source_y'])
-                        w = int(best_match['source_w'])
-                        h = int(best_match['source_h'])
-                        recognized_faces.append(("Unknown", (y, x + w, y + h, x)))
+                        trackers[key].assign(track, student_id, distance, now)
+
+            for key, tracks in frame_tracks.items():
+                recognized_faces[key] = [(track.identity, track.box) for track in tracks]
 
+            for stage, seconds in timings.items():
+                RECOGNITION_SECONDS.observe(seconds, stage=stage)
+            RECOGNITION_SECONDS.observe(time.perf_counter() - batch_started, stage="total")
             return recognized_faces
         except Exception as e:
-            # print(f"Error in face recognition: {e}")
-            return []
\ No newline at end of file
+            # A bad frame must not stop the loop, but the failure is counted and kept for inspection.
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            RECOGNITION_ERRORS.inc()
+            return {key: [] for key in frames}
+
+    def _match_pending(self, gallery: FaceGallery, embeddings: np.ndarray, keys: List[Hashable],
+                       candidates: Optional[Dict[Hashable, Optional[FrozenSet[str]]]]) -> List[Tuple[str, float]]:
+        if not candidates:
+            return gallery.match(embeddings, self.distance_threshold)
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        groups: Dict[Optional[FrozenSet[str]], List[int]] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(candidates.get(key), []).append(i)
+        matches: List[Tuple[str, float]] = [None] * len(keys)
+        for candidate_set, indices in groups.items():
+            for i, match in zip(indices, gallery.match(embeddings[indices], self.distance_threshold, candidate_set)):
+                matches[i] = match
+        return matches
+
+    def recognize_faces(self, frame, db_path: str) -> List[Tuple[str, Box]]:
+        return self.recognize_batch({0: frame}, db_path)[0]
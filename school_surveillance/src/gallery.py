@@ -0,0 +1,247 @@
+import glob
+import os
+import pickle
+import re
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ann_index import IVFIndex
+from .data_models import UNKNOWN_IDENTITY
+
+DISTANCE_METRICS = ("cosine", "euclidean", "euclidean_l2")
+CANDIDATE_CACHE_SIZE = 256
+
+
+def student_id_from_identity(identity: str) -> str:
+    """Maps a gallery image path (with either path separator) to its student ID."""
+    filename = re.split(r"[\\/]", identity)[-1]
+    return os.path.splitext(filename)[0]
+
+
+class FaceGallery:
+    """
+    Holds every enrolled embedding in a single contiguous matrix so that all
+    faces of a frame can be matched against the whole gallery in one
+    matrix product, instead of re-reading the representations on every frame.
+
+    ``normalized`` rows (e.g. a memory-mapped enrollment store) are used as
+    given for the cosine metrics, without a copy in memory.
+    """
+
+    def __init__(self, identities: Sequence[str], embeddings: np.ndarray, distance_metric: str = "cosine",
+                 normalized: bool = False):
+        if distance_metric not in DISTANCE_METRICS:
+            raise ValueError(f"Unsupported distance metric: {distance_metric}")
+
+        embeddings = np.asanyarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(identities):
+            raise ValueError("Embeddings must be a 2-D matrix with one row per identity.")
+
+        self.identities: List[str] = list(identities)
+        self.student_ids: List[str] = [student_id_from_identity(i) for i in self.identities]
+        self.distance_metric = distance_metric
+
+        if distance_metric == "euclidean":
+            self.embeddings = np.ascontiguousarray(embeddings)
+        elif normalized:
+            self.embeddings = embeddings
+        else:
+            self.embeddings = np.ascontiguousarray(_l2_normalize(embeddings))
+        self._squared_norms = np.einsum("ij,ij->i", self.embeddings, self.embeddings)
+        self.ann_index: Optional[IVFIndex] = None
+        self.ann_candidates = 10
+        self._rows_by_student: Dict[str, List[int]] = {}
+        for row, student_id in enumerate(self.student_ids):
+            self._rows_by_student.setdefault(student_id, []).append(row)
+        self._candidate_cache: Dict[FrozenSet[str], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.identities)
+
+    @property
+    def dimension(self) -> int:
+        return self.embeddings.shape[1]
+
+    @classmethod
+    def from_representations(cls, pkl_path: str, distance_metric: str = "cosine") -> "FaceGallery":
+        """Loads a DeepFace representations pickle (``ds_model_*.pkl``) once."""
+        with open(pkl_path, "rb") as f:
+            representations = pickle.load(f)
+
+        identities = [r["identity"] for r in representations]
+        if not representations:
+            return cls(identities, np.empty((0, 0), dtype=np.float32), distance_metric)
+        embeddings = np.array([r["embedding"] for r in representations], dtype=np.float32)
+        return cls(identities, embeddings, distance_metric)
+
+    @classmethod
+    def from_store(cls, store_path: str, distance_metric: str = "cosine") -> "FaceGallery":
+        """Loads a gallery written by ``enrollment.GalleryStore``, matching from its memory mapping where possible."""
+        from .enrollment import GalleryStore
+
+        store = GalleryStore(store_path)
+        if distance_metric == "euclidean":
+            index, embeddings = store.load_raw()
+        else:
+            index, embeddings = store.load()
+        return cls([entry["image"] for entry in index["entries"]], embeddings, distance_metric,
+                   normalized=distance_metric != "euclidean" and bool(index.get("normalized")))
+
+    @classmethod
+    def from_db_path(cls, db_path: str, model_name: str = "VGG-Face",
+                     distance_metric: str = "cosine") -> "FaceGallery":
+        """
+        Loads the gallery for ``db_path``, preferring the enrollment store and
+        then the representations pickle DeepFace already keeps there. Falls
+        back to computing the embeddings of every image in the directory.
+        """
+        from .enrollment import GalleryStore, default_store_path
+
+        store = GalleryStore(default_store_path(db_path))
+        if store.exists() and store.load_index()["model_name"] == model_name:
+            return cls.from_store(store.path, distance_metric)
+
+        pkl_path = find_representations_file(db_path, model_name)
+        if pkl_path:
+            return cls.from_representations(pkl_path, distance_metric)
+
+        from deepface import DeepFace
+
+        identities, embeddings = [], []
+        for image_path in sorted(list_images(db_path)):
+            faces = DeepFace.represent(img_path=image_path, model_name=model_name, enforce_detection=False)
+            if faces:
+                identities.append(image_path)
+                embeddings.append(faces[0]["embedding"])
+        matrix = np.array(embeddings, dtype=np.float32).reshape(len(identities), -1)
+        return cls(identities, matrix, distance_metric)
+
+    def distances(self, queries: np.ndarray) -> np.ndarray:
+        """Returns the (queries x gallery) distance matrix in one batched operation."""
+        return self._distances_to(queries, self.embeddings, self._squared_norms)
+
+    def _distances_to(self, queries: np.ndarray, embeddings: np.ndarray, squared_norms: np.ndarray) -> np.ndarray:
+        queries = np.asarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+
+        if self.distance_metric == "euclidean":
+            query_norms = np.einsum("ij,ij->i", queries, queries)
+            squared = query_norms[:, np.newaxis] + squared_norms[np.newaxis, :] - 2.0 * (queries @ embeddings.T)
+            return np.sqrt(np.maximum(squared, 0.0))
+
+        similarities = _l2_normalize(queries) @ embeddings.T
+        if self.distance_metric == "cosine":
+            return 1.0 - similarities
+        return np.sqrt(np.maximum(2.0 - 2.0 * similarities, 0.0))
+
+    def build_ann_index(self, nlist: Optional[int] = None, nprobe: int = 8, candidates: int = 10) -> IVFIndex:
+        """
+        Switches match() from an exhaustive scan to an IVF index: each query
+        fetches its ``candidates`` nearest rows from the probed lists, and
+        those are re-ranked exactly before applying the threshold.
+        """
+        self.ann_index = IVFIndex(self.embeddings, nlist=nlist, nprobe=nprobe)
+        self.ann_candidates = candidates
+        return self.ann_index
+
+    def candidate_distances(self, queries: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Exact distances from each query i to the gallery rows ``rows[i]``; -1 rows come back as inf."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        valid = rows >= 0
+        safe_rows = np.where(valid, rows, 0)
+        candidates = self.embeddings[safe_rows]
+
+        if self.distance_metric == "euclidean":
+            query_norms = np.einsum("md,md->m", queries, queries)
+            squared = (query_norms[:, np.newaxis] + self._squared_norms[safe_rows]
+                       - 2.0 * np.einsum("md,mkd->mk", queries, candidates))
+            distances = np.sqrt(np.maximum(squared, 0.0))
+        else:
+            similarities = np.einsum("md,mkd->mk", _l2_normalize(queries), candidates)
+            if self.distance_metric == "cosine":
+                distances = 1.0 - similarities
+            else:
+                distances = np.sqrt(np.maximum(2.0 - 2.0 * similarities, 0.0))
+        return np.where(valid, distances, np.inf)
+
+    def nearest(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the best gallery row and its distance for each query."""
+        if self.ann_index is None:
+            distances = self.distances(queries)
+            best = np.argmin(distances, axis=1)
+            return best, distances[np.arange(len(best)), best]
+
+        search_queries = queries if self.distance_metric == "euclidean" else _l2_normalize(queries)
+        rows, _ = self.ann_index.search(search_queries, k=self.ann_candidates)
+        distances = self.candidate_distances(queries, rows)
+        best_columns = np.argmin(distances, axis=1)
+        picked = np.arange(len(rows))
+        return rows[picked, best_columns], distances[picked, best_columns]
+
+    def _candidate_rows(self, student_ids: FrozenSet[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Gallery rows of ``student_ids`` with their embeddings and norms, cached per candidate set."""
+        cached = self._candidate_cache.get(student_ids)
+        if cached is None:
+            rows = np.array(sorted(row for student_id in student_ids
+                                   for row in self._rows_by_student.get(student_id, ())), dtype=np.int64)
+            if len(self._candidate_cache) >= CANDIDATE_CACHE_SIZE:
+                self._candidate_cache.clear()
+            cached = (rows, np.ascontiguousarray(self.embeddings[rows]), self._squared_norms[rows])
+            self._candidate_cache[student_ids] = cached
+        return cached
+
+    def match(self, queries: np.ndarray, distance_threshold: float,
+              candidates: Optional[FrozenSet[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Matches every query embedding against the gallery at once and returns
+        ``(student_id, distance)`` per query, using ``"Unknown"`` when the best
+        match is not within ``distance_threshold``.
+
+        With ``candidates``, queries are first matched against only those
+        students' embeddings; queries none of them matches fall back to the
+        full gallery.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if queries.size == 0:
+            return []
+        if len(self) == 0:
+            return [(UNKNOWN_IDENTITY, float("inf"))] * len(queries)
+
+        rows = self._candidate_rows(candidates) if candidates else None
+        if rows is not None and len(rows[0]):
+            rows, embeddings, squared_norms = rows
+            distances = self._distances_to(queries, embeddings, squared_norms)
+            best_columns = np.argmin(distances, axis=1)
+            best = rows[best_columns]
+            best_distances = distances[np.arange(len(best)), best_columns]
+
+            misses = best_distances >= distance_threshold
+            if misses.any():
+                best[misses], best_distances[misses] = self.nearest(queries[misses])
+        else:
+            best, best_distances = self.nearest(queries)
+
+        return [
+            (self.student_ids[index] if distance < distance_threshold else UNKNOWN_IDENTITY, float(distance))
+            for index, distance in zip(best, best_distances)
+        ]
+
+
+def find_representations_file(db_path: str, model_name: str) -> Optional[str]:
+    model_tag = model_name.lower().replace("-", "")
+    candidates = sorted(glob.glob(os.path.join(db_path, f"ds_model_{model_tag}_*.pkl")))
+    if not candidates:
+        candidates = sorted(glob.glob(os.path.join(db_path, "*.pkl")))
+    return candidates[0] if candidates else None
+
+
+def list_images(db_path: str) -> List[str]:
+    extensions = (".jpg", ".jpeg", ".png")
+    return [os.path.join(db_path, name) for name in os.listdir(db_path) if name.lower().endswith(extensions)]
+
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-10)
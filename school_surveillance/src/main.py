@@ -1,14 +1,36 @@
+import argparse
 import json
+import socket
+import zlib
 import cv2
-from typing import Dict
-import socketio
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple, Union
 import time
+from datetime import datetime
 
-from .data_models import Student, Schedule, Zone
-from .rule_engine import RuleEngine
+from .data_models import Period
+from .rule_engine import RuleEngine, load_timetable
 from .face_recognition import FaceRecognizer
-from .database import init_db, load_students, load_schedules, load_zones, save_violation
-from .config import CAMERA_CONFIG_PATH, STUDENT_IMAGES_DB_PATH
+from .tracker import FaceTracker
+from .capture import CameraStream
+from .motion import MotionGate
+from .scheduler import CameraScheduler
+from .workers import RecognitionWorkerPool
+from .notifications import NotificationDispatcher
+from .streaming import FrameStreamer
+from .events import EventPublisher, violation_event
+from .aggregator import DetectionForwarder, parse_address
+from .render import annotate_frame
+from .database import (init_db, load_students, load_schedules, load_zones, load_active_violations,
+                       load_bunking_scores, ViolationWriter)
+from .data_models import UNKNOWN_IDENTITY
+from .metrics import (REGISTRY, FRAMES_PROCESSED, FRAMES_DROPPED, FRAMES_SHED, CAMERA_FPS, RECOGNITION_SECONDS,
+                      RECOGNITION_ERRORS, FACES_RECOGNIZED, RULES_SECONDS, record_db_write,
+                      DB_QUEUE_DEPTH, NOTIFICATION_QUEUE_DEPTH, EVENT_BUFFER_DEPTH, EVENTS_DROPPED)
+from .config import (CAMERA_CONFIG_PATH, STUDENT_IMAGES_DB_PATH, RECOGNITION_WORKERS, DEFAULT_TARGET_FPS,
+                     MOTION_THRESHOLD, SCHEDULE_RELOAD_SECONDS, STREAM_ENABLED, STREAM_FPS,
+                     STREAM_JPEG_QUALITY, STREAM_MAX_WIDTH, RENDER_MAX_WIDTH, ZONE_CANDIDATE_MATCHING,
+                     SCHEDULER_ENABLED, SCHEDULER_TARGET_UTILIZATION, SCHEDULER_MIN_FPS, SCHEDULER_REPORT_SECONDS,
+                     METRICS_PUSH_SECONDS)
 
 
 def load_camera_config():
@@ -17,111 +39,394 @@ def load_camera_config():
     return camera_config
 
 
-def main():
+def camera_source(camera_id: str, camera: Dict) -> Union[int, str]:
+    """
+    What to open for a camera: its "source" entry (a device index or a
+    stream URL), or else the device index in its id, e.g. 2 for "camera_2".
+    """
+    if 'source' in camera:
+        return camera['source']
+    index = camera_id.rsplit('_', 1)[-1]
+    if not index.isdigit():
+        raise ValueError(f"Camera {camera_id} needs a 'source' entry in {CAMERA_CONFIG_PATH}")
+    return int(index)
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """Parses "K/N" (the K-th of N shards, counting from 1)."""
+    index, _, count = shard.partition('/')
+    if not (index.isdigit() and count.isdigit() and 1 <= int(index) <= int(count)):
+        raise argparse.ArgumentTypeError(f"Expected K/N with 1 <= K <= N, got {shard!r}")
+    return int(index), int(count)
+
+
+def select_cameras(camera_config: Dict[str, Dict], node: Optional[str] = None,
+                   shard: Optional[Tuple[int, int]] = None) -> Dict[str, Dict]:
+    """
+    The cameras this process runs: with ``node``, those whose "node" entry
+    names it; with ``shard``, those whose id hashes into it, so adding a
+    camera never moves the others to another node. Without either, all.
+    """
+    selected = {}
+    for camera_id, camera in camera_config.items():
+        if node is not None and camera.get('node') != node:
+            continue
+        if shard is not None and zlib.crc32(camera_id.encode()) % shard[1] != shard[0] - 1:
+            continue
+        selected[camera_id] = camera
+    return selected
+
+
+def record_metrics(camera_streams, scheduler, notifier, violation_writer, events,
+                   previous: Dict[str, Dict[str, int]], elapsed: float):
+    """
+    Brings the counters kept by the streams, the scheduler and the queues into
+    the metrics registry; ``previous`` holds the totals seen at the last call.
+    """
+    skipped = scheduler.skip_counts() if scheduler else {}
+    for camera, stream in camera_streams.items():
+        processed = int(FRAMES_PROCESSED.value(camera=camera))
+        CAMERA_FPS.set((processed - previous['processed'].get(camera, 0)) / max(elapsed, 1e-6), camera=camera)
+        FRAMES_DROPPED.inc(stream.frames_dropped - previous['dropped'].get(camera, 0), camera=camera)
+        FRAMES_SHED.inc(skipped.get(camera, 0) - previous['shed'].get(camera, 0), camera=camera)
+        previous['processed'][camera] = processed
+        previous['dropped'][camera] = stream.frames_dropped
+        previous['shed'][camera] = skipped.get(camera, 0)
+    if notifier:
+        NOTIFICATION_QUEUE_DEPTH.set(notifier.queue_depth)
+    if violation_writer:
+        DB_QUEUE_DEPTH.set(violation_writer.queue_depth)
+    EVENT_BUFFER_DEPTH.set(events.buffered_events)
+    EVENTS_DROPPED.inc(events.events_dropped - previous['events'].get('dropped', 0))
+    previous['events']['dropped'] = events.events_dropped
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="School surveillance processing loop.")
+    parser.add_argument('--headless', action='store_true',
+                        help="Run without any OpenCV windows; annotated frames are only rendered for streaming.")
+    parser.add_argument('--node', help="Only run the cameras whose \"node\" entry in camera_config.json is NODE.")
+    parser.add_argument('--shard', type=parse_shard, metavar='K/N',
+                        help="Only run the K-th of N hash shards of the configured cameras.")
+    parser.add_argument('--aggregator', type=parse_address, metavar='HOST:PORT',
+                        help="Send detections to a rule aggregator instead of applying the rules locally.")
+    return parser.parse_args(argv)
+
+
+def open_cameras(camera_config: Dict[str, Dict], capture_factory=None) -> Tuple[Dict[str, CameraStream], Dict[str, str]]:
+    """Opens and starts a CameraStream per configured camera; returns the streams and each camera's zone."""
+    camera_streams: Dict[str, CameraStream] = {}
+    camera_zone_mapping: Dict[str, str] = {}
+    for camera_id, camera in camera_config.items():
+        source = camera_source(camera_id, camera)
+        stream = CameraStream(source, cv2.CAP_DSHOW if isinstance(source, int) else cv2.CAP_ANY, name=camera_id,
+                              capture_factory=capture_factory)
+        if stream.open():
+            camera_streams[camera_id] = stream.start()
+            camera_zone_mapping[camera_id] = camera['zone_id']
+            print(f"Successfully opened {camera_id} for zone {camera['zone_id']}")
+        else:
+            print(f"Warning: Could not open video stream for {camera_id} "
+                  f"(configured for zone {camera['zone_id']}). Skipping.")
+    return camera_streams, camera_zone_mapping
+
+
+class Pipeline:
+    """
+    The processing loop of one process, one step() per iteration: motion
+    gate, load shedding, recognition (in-process or in worker processes),
+    the rules or forwarding to the aggregator, rendering and streaming, plus
+    the periodic schedule reloads and metrics pushes. main() runs it on the
+    configured cameras and the pipeline benchmark on file-backed ones.
+    ``on_stage`` is called with (stage, seconds) for the capture age of
+    each frame, every recognition stage and the rules.
+    """
+
+    def __init__(self, camera_streams: Dict[str, CameraStream], camera_config: Dict[str, Dict],
+                 camera_zone_mapping: Dict[str, str], rule_engine: RuleEngine, events: EventPublisher,
+                 node_name: str, face_recognizer: Optional[FaceRecognizer] = None,
+                 worker_pool: Optional[RecognitionWorkerPool] = None, forwarder: Optional[DetectionForwarder] = None,
+                 notifier=None, violation_writer: Optional[ViolationWriter] = None, headless: bool = True,
+                 student_images_db_path: str = STUDENT_IMAGES_DB_PATH,
+                 on_stage: Optional[Callable[[str, float], None]] = None):
+        self.camera_streams = camera_streams
+        self.camera_zone_mapping = camera_zone_mapping
+        self.rule_engine = rule_engine
+        self.events = events
+        self.node_name = node_name
+        self.face_recognizer = face_recognizer
+        self.worker_pool = worker_pool
+        self.forwarder = forwarder
+        self.notifier = notifier
+        self.violation_writer = violation_writer
+        self.headless = headless
+        self.student_images_db_path = student_images_db_path
+        self.on_stage = on_stage
+        self.frames_processed = 0
+        self.quit_requested = False
+
+        self.frame_streamer = None
+        if STREAM_ENABLED:
+            self.frame_streamer = FrameStreamer(events.sio, quality=STREAM_JPEG_QUALITY, max_width=STREAM_MAX_WIDTH,
+                                                max_fps=STREAM_FPS)
+        self.face_trackers = {camera_id: FaceTracker() for camera_id in camera_streams}
+        self.motion_gates = {
+            camera_id: MotionGate(
+                target_fps=camera_config[camera_id].get('target_fps', DEFAULT_TARGET_FPS),
+                min_changed_fraction=camera_config[camera_id].get('motion_threshold', MOTION_THRESHOLD))
+            for camera_id in camera_streams
+        }
+        self.scheduler = None
+        if SCHEDULER_ENABLED:
+            self.scheduler = CameraScheduler(parallelism=max(1, worker_pool.num_workers if worker_pool else 1),
+                                             target_utilization=SCHEDULER_TARGET_UTILIZATION,
+                                             min_fps=SCHEDULER_MIN_FPS)
+        self._submitted_frames: Dict[str, cv2.Mat] = {}
+        self._submitted_at: Dict[str, float] = {}
+        self._frame_timestamps: Dict[str, float] = {}
+        self._schedules_loaded_at = self._metrics_pushed_at = self._scheduler_reported_at = time.time()
+        self._zone_state_updated_at = 0.0
+        self._metrics_previous: Dict[str, Dict[str, int]] = {'processed': {}, 'dropped': {}, 'shed': {},
+                                                             'events': {}}
+
+    def _stage(self, stage: str, seconds: float):
+        if self.on_stage:
+            self.on_stage(stage, seconds)
+
+    def _periodic(self):
+        rule_engine, scheduler = self.rule_engine, self.scheduler
+        if time.time() - self._schedules_loaded_at >= SCHEDULE_RELOAD_SECONDS:
+            rule_engine.refresh_schedules(load_schedules())
+            self._schedules_loaded_at = time.time()
+
+        if scheduler and time.time() - self._zone_state_updated_at >= scheduler.rebalance_interval:
+            # With an aggregator the grace periods are open there, not in the local engine.
+            violation_counts = (self.forwarder.active_violation_counts if self.forwarder
+                                else rule_engine.active_violation_counts())
+            for camera_id, zone_id in self.camera_zone_mapping.items():
+                scheduler.update_zone_state(camera_id, violation_counts.get(zone_id, 0),
+                                            rule_engine.zone_can_produce_violations(zone_id))
+            self._zone_state_updated_at = time.time()
+        if scheduler and time.time() - self._scheduler_reported_at >= SCHEDULER_REPORT_SECONDS:
+            skipped = {camera_id: count for camera_id, count in scheduler.skip_counts().items() if count}
+            if skipped:
+                print(f"Load shedding: skipped frames per camera {skipped} "
+                      f"(capacity {scheduler.capacity_fps:.1f} fps).")
+            self._scheduler_reported_at = time.time()
+
+        if time.time() - self._metrics_pushed_at >= METRICS_PUSH_SECONDS:
+            record_metrics(self.camera_streams, scheduler, self.notifier, self.violation_writer, self.events,
+                           self._metrics_previous, time.time() - self._metrics_pushed_at)
+            if self.events.connected:
+                self.events.sio.emit('metrics', REGISTRY.render({'node': self.node_name}))
+            self._metrics_pushed_at = time.time()
+
+    def step(self) -> int:
+        """Runs one iteration; returns the number of frames processed. Sets quit_requested on 'q'."""
+        self._periodic()
+        face_recognizer, worker_pool, scheduler = self.face_recognizer, self.worker_pool, self.scheduler
+        if face_recognizer is not None and not face_recognizer.ready:
+            time.sleep(0.05)
+            return 0
+
+        frames: Dict[str, cv2.Mat] = {}
+        candidates: Dict[str, Optional[FrozenSet[str]]] = {}
+
+        # Each camera is read on its own thread; only take the newest frame of
+        # the cameras that produced one since the last iteration.
+        for camera_id, stream in self.camera_streams.items():
+            if worker_pool and worker_pool.is_busy(camera_id):
+                continue
+            latest = stream.read()
+            if latest is None:
+                continue
+            frame, timestamp = latest
+            self._stage("capture", time.time() - timestamp)
+            if not self.motion_gates[camera_id].should_process(frame, timestamp):
+                continue
+            if scheduler and not scheduler.admit(camera_id, timestamp):
+                continue
+            self._frame_timestamps[camera_id] = timestamp
+            if ZONE_CANDIDATE_MATCHING:
+                candidates[camera_id] = self.rule_engine.expected_students(
+                    self.camera_zone_mapping[camera_id], datetime.fromtimestamp(timestamp))
+            if worker_pool:
+                worker_pool.submit(camera_id, frame, timestamp, candidates.get(camera_id))
+                self._submitted_frames[camera_id] = frame
+                self._submitted_at[camera_id] = time.monotonic()
+            else:
+                frames[camera_id] = frame
+
+        if worker_pool:
+            recognized_by_camera = {}
+            for result in worker_pool.results(timeout=0.005):
+                recognized_by_camera[result.camera_id] = result.faces
+                frames[result.camera_id] = self._submitted_frames.pop(result.camera_id)
+                latency = time.monotonic() - self._submitted_at.pop(result.camera_id)
+                RECOGNITION_SECONDS.observe(latency, stage="total")
+                # The workers' own metrics stay in their processes; stage times come back with the results.
+                if result.timings is not None:
+                    for stage, seconds in result.timings.items():
+                        RECOGNITION_SECONDS.observe(seconds, stage=stage)
+                        self._stage(stage, seconds)
+                    if result.error:
+                        RECOGNITION_ERRORS.inc()
+                if scheduler:
+                    scheduler.record_processing(1, latency)
+        elif frames:
+            # Faces from all cameras are embedded together in one batch.
+            recognition_started = time.monotonic()
+            recognized_by_camera = face_recognizer.recognize_batch(frames, self.student_images_db_path,
+                                                                   self.face_trackers, candidates)
+            for stage, seconds in face_recognizer.last_timings.items():
+                self._stage(stage, seconds)
+            if scheduler:
+                scheduler.record_processing(len(frames), time.monotonic() - recognition_started)
+
+        if not frames:
+            if self.headless:
+                time.sleep(0.005)
+            elif cv2.waitKey(5) & 0xFF == ord('q'):
+                self.quit_requested = True
+            return 0
+
+        for camera_id, frame in frames.items():
+            current_zone_id = self.camera_zone_mapping[camera_id]
+            recognized_faces = recognized_by_camera[camera_id]
+            self.motion_gates[camera_id].report_faces(len(recognized_faces))
+            if scheduler:
+                scheduler.report_detections(camera_id, len(recognized_faces))
+            FRAMES_PROCESSED.inc(camera=camera_id)
+            unknown_faces = sum(1 for name, _ in recognized_faces if name == UNKNOWN_IDENTITY)
+            if unknown_faces:
+                FACES_RECOGNIZED.inc(unknown_faces, camera=camera_id, result='unknown')
+            if len(recognized_faces) > unknown_faces:
+                FACES_RECOGNIZED.inc(len(recognized_faces) - unknown_faces, camera=camera_id, result='known')
+
+            if self.forwarder:
+                known = [name for name, _ in recognized_faces if name != UNKNOWN_IDENTITY]
+                if known:
+                    self.forwarder.forward(camera_id, current_zone_id, known, self._frame_timestamps[camera_id])
+            else:
+                # All detections of the frame are evaluated against the same period.
+                rules_started = time.perf_counter()
+                detection_result = self.rule_engine.process_detections(
+                    current_zone_id, [name for name, _ in recognized_faces],
+                    datetime.fromtimestamp(self._frame_timestamps[camera_id]))
+                rules_seconds = time.perf_counter() - rules_started
+                RULES_SECONDS.observe(rules_seconds)
+                self._stage("rules", rules_seconds)
+                for violation in detection_result.confirmed:
+                    self.events.publish('violation', violation_event(violation),
+                                        key=(violation.student_id, violation.timestamp))
+
+            # Drawing only happens for a consumer, on a downscaled copy of the frame.
+            stream_wanted = self.frame_streamer is not None and self.frame_streamer.wants_frame(camera_id)
+            if stream_wanted or not self.headless:
+                annotated = annotate_frame(frame, recognized_faces, RENDER_MAX_WIDTH)
+                if stream_wanted:
+                    self.frame_streamer.publish(camera_id, current_zone_id, annotated)
+                if not self.headless:
+                    cv2.imshow(f'{camera_id} - Zone: {current_zone_id}', annotated)
+
+        self.frames_processed += len(frames)
+        if not self.headless and cv2.waitKey(1) & 0xFF == ord('q'):
+            self.quit_requested = True
+        return len(frames)
+
+    def stop(self):
+        self.events.stop()
+        for stream in self.camera_streams.values():
+            stream.stop()
+        if self.worker_pool:
+            self.worker_pool.stop()
+        if self.forwarder:
+            self.forwarder.stop()
+        else:
+            self.notifier.stop()
+            self.violation_writer.stop()
+        if not self.headless:
+            cv2.destroyAllWindows()
+
+
+def build_pipeline(args: argparse.Namespace, camera_config: Dict[str, Dict], capture_factory=None,
+                   recognizer_factory: Optional[Callable[[], FaceRecognizer]] = None,
+                   workers: int = RECOGNITION_WORKERS, student_images_db_path: str = STUDENT_IMAGES_DB_PATH,
+                   timetable: Optional[List[Period]] = None, notifier=None,
+                   on_write: Optional[Callable[[int, float], None]] = record_db_write,
+                   on_stage: Optional[Callable[[str, float], None]] = None) -> Optional[Pipeline]:
+    """
+    Sets up everything main() runs: the database, the rule engine, recognition,
+    the viewer connection and the cameras. The keyword arguments replace parts
+    of it (e.g. file-backed cameras via ``capture_factory``) for the pipeline
+    benchmark. Returns None if no camera could be opened.
+    """
+    headless = args.headless
+    node_name = args.node or (f"shard-{args.shard[0]}of{args.shard[1]}" if args.shard else socket.gethostname())
+
     # --- Initialization ---
     init_db()
     students = load_students()
     schedules = load_schedules()
     zones = load_zones()
-    camera_config = load_camera_config()
 
-    rule_engine = RuleEngine(students, schedules, zones, grace_period_minutes=10)
-    face_recognizer = FaceRecognizer()
+    forwarder = violation_writer = None
+    if args.aggregator:
+        # The aggregator applies the rules for every node, so a student's grace period
+        # carries over between zones on different nodes; the local engine only answers
+        # schedule queries (candidate students, zone relevance) and never alerts or writes.
+        forwarder = DetectionForwarder(args.aggregator, node=node_name).start()
+        notifier = None
+    else:
+        notifier = notifier or NotificationDispatcher().start()
+        violation_writer = ViolationWriter(on_write=on_write).start()
+    rule_engine = RuleEngine(students, schedules, zones, grace_period_minutes=10,
+                             timetable=timetable or load_timetable(), notifier=notifier,
+                             violation_writer=violation_writer, state_store=violation_writer)
+    if not forwarder:
+        resumed = rule_engine.restore_state(load_active_violations(), load_bunking_scores())
+        print(f"Resumed {resumed} open grace period(s).")
+    if workers > 0:
+        # Each worker process loads its own model and gallery.
+        face_recognizer = None
+        worker_pool = RecognitionWorkerPool(workers, student_images_db_path,
+                                            recognizer_factory=recognizer_factory).start()
+    else:
+        # The model and gallery load in the background while the viewer connection and cameras come up.
+        face_recognizer = (recognizer_factory or FaceRecognizer)()
+        face_recognizer.start_warm_up(student_images_db_path)
+        worker_pool = None
 
     # --- Connect to web viewer ---
-    sio = socketio.Client()
-    connected_to_web = False
-    while not connected_to_web:
-        try:
-            sio.connect('http://localhost:5000')
-            connected_to_web = True
-            print("Connected to web viewer.")
-        except socketio.exceptions.ConnectionError:
-            print("Web viewer not available, retrying in 5 seconds...")
-            time.sleep(5)
+    # Connects in the background; events are buffered until the viewer is up.
+    events = EventPublisher().start()
 
     # --- Camera setup ---
-    video_captures: Dict[int, cv2.VideoCapture] = {}
-    camera_zone_mapping: Dict[int, str] = {}
-
-    for i in range(5):  # Check indices 0 to 4
-        if f'camera_{i}' in camera_config:
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-            if cap.isOpened():
-                video_captures[i] = cap
-                camera_zone_mapping[i] = camera_config[f'camera_{i}']['zone_id']
-                print(f"Successfully opened camera {i} for zone {camera_zone_mapping[i]}")
-            else:
-                print(f"Warning: Could not open video stream for camera {i} "
-                      f"(configured for zone {camera_config[f'camera_{i}']['zone_id']}). Skipping.")
-        else:
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-            if cap.isOpened():
-                print(f"Info: Camera {i} found but not configured in camera_config.json. Skipping.")
-                cap.release()
-
-    if not video_captures:
-        print("No configured cameras found or opened. Exiting.")
-        if sio:
-            sio.disconnect()
-        return
+    camera_streams, camera_zone_mapping = open_cameras(camera_config, capture_factory)
+    pipeline = Pipeline(camera_streams, camera_config, camera_zone_mapping, rule_engine, events, node_name,
+                        face_recognizer=face_recognizer, worker_pool=worker_pool, forwarder=forwarder,
+                        notifier=notifier, violation_writer=violation_writer, headless=headless,
+                        student_images_db_path=student_images_db_path, on_stage=on_stage)
+    if not camera_streams:
+        print(f"No configured cameras found or opened for node {node_name}. Exiting.")
+        pipeline.stop()
+        return None
+    return pipeline
 
-    student_images_db_path = STUDENT_IMAGES_DB_PATH
+
+def main(argv=None):
+    args = parse_args(argv)
+    pipeline = build_pipeline(args, select_cameras(load_camera_config(), args.node, args.shard))
+    if pipeline is None:
+        return
 
     # --- Main loop ---
-    while True:
-        frames: Dict[int, cv2.Mat] = {}
-        closed_cameras = []
-
-        for camera_index, cap in video_captures.items():
-            ret, frame = cap.read()
-            if not ret:
-                print(f"Warning: Could not read frame from camera {camera_index}. Closing camera.")
-                cap.release()
-                closed_cameras.append(camera_index)
-            else:
-                frames[camera_index] = frame
-
-        for idx in closed_cameras:
-            del video_captures[idx]
-            del camera_zone_mapping[idx]
-
-        if not video_captures:
-            print("All cameras closed. Exiting.")
-            if sio:
-                sio.disconnect()
-            break
-
-        for camera_index, frame in frames.items():
-            current_zone_id = camera_zone_mapping[camera_index]
-            recognized_faces = face_recognizer.recognize_faces(frame, student_images_db_path)
-
-            for (name, (top, right, bottom, left)) in recognized_faces:
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
-                cv2.rectangle(frame, (left, bottom - 35), (right, bottom), (0, 0, 255), cv2.FILLED)
-                font = cv2.FONT_HERSHEY_DUPLEX
-                cv2.putText(frame, name, (left + 6, bottom - 6), font, 1.0, (255, 255, 255), 1)
-
-                violation = rule_engine.process_violation(name, current_zone_id)
-                if violation and sio:
-                    sio.emit('new_violation', {
-                        'student_id': violation.student_id,
-                        'zone_id': violation.zone_id,
-                        'timestamp': violation.timestamp.isoformat(),
-                        'grace_period_expired': violation.grace_period_expired,
-                        'alert_sent': violation.alert_sent
-                    })
-
-            cv2.imshow(f'Camera {camera_index} - Zone: {current_zone_id}', frame)
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            if sio:
-                sio.disconnect()
-            break
-
-    for cap in video_captures.values():
-        cap.release()
-    cv2.destroyAllWindows()
+    try:
+        while not pipeline.quit_requested:
+            pipeline.step()
+    except KeyboardInterrupt:
+        print("Interrupted. Shutting down.")
+    pipeline.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None,
+                   const: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(const) + list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self, const: Sequence[Tuple[str, str]] = ()) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples(const))
+        return lines
+
+    def _samples(self, const: Sequence[Tuple[str, str]]) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, one series per label combination."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self, const: Sequence[Tuple[str, str]]) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key, const=const)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, e.g. a queue depth."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed cumulative buckets, plus their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # bucket counts..., sum, count
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0.0
+
+    def _samples(self, const: Sequence[Tuple[str, str]]) -> List[str]:
+        lines = []
+        for key, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)), const)
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'), const)} "
+                         f"{_format_value(series[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key, const=const)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key, const=const)} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of metrics, rendered in the Prometheus text
+    exposition format. Updates only take a per-metric lock, so the video
+    loop, the writer thread and the notifier thread can all record cheaply.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            elif type(metric) is not metric_class:
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self, const_labels: Optional[Dict[str, str]] = None) -> str:
+        """
+        Renders every metric; ``const_labels`` are added to each sample, e.g.
+        the node name when several processes report to the same viewer.
+        """
+        const = tuple((name, str(value)) for name, value in (const_labels or {}).items())
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render(const)) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+FRAMES_PROCESSED = REGISTRY.counter(
+    "surveillance_frames_processed_total", "Camera frames that went through recognition.", ["camera"])
+FRAMES_DROPPED = REGISTRY.counter(
+    "surveillance_frames_dropped_total", "Camera frames overwritten before the loop read them.", ["camera"])
+FRAMES_SHED = REGISTRY.counter(
+    "surveillance_frames_shed_total", "Camera frames skipped by the load-shedding scheduler.", ["camera"])
+CAMERA_FPS = REGISTRY.gauge(
+    "surveillance_camera_fps", "Frames per second processed per camera over the last push interval.", ["camera"])
+RECOGNITION_SECONDS = REGISTRY.histogram(
+    "surveillance_recognition_seconds", "Recognition latency per batch, by stage.", ["stage"])
+RECOGNITION_ERRORS = REGISTRY.counter(
+    "surveillance_recognition_errors_total", "Recognition batches that failed and returned no faces.")
+FACES_RECOGNIZED = REGISTRY.counter(
+    "surveillance_faces_total", "Faces seen per camera, by whether they matched a student.", ["camera", "result"])
+RULES_SECONDS = REGISTRY.histogram(
+    "surveillance_rules_seconds", "RuleEngine.process_detections latency per camera frame.")
+DB_WRITE_SECONDS = REGISTRY.histogram(
+    "surveillance_db_write_seconds", "Latency of one committed batch of violation rows.")
+DB_ROWS_WRITTEN = REGISTRY.counter(
+    "surveillance_db_rows_written_total", "Violation rows committed to the database.")
+DB_QUEUE_DEPTH = REGISTRY.gauge(
+    "surveillance_db_queue_depth", "Violation rows waiting for the write-behind writer.")
+NOTIFICATION_QUEUE_DEPTH = REGISTRY.gauge(
+    "surveillance_notification_queue_depth", "Alerts waiting to be emailed.")
+EVENT_BUFFER_DEPTH = REGISTRY.gauge(
+    "surveillance_event_buffer_depth", "Viewer events not yet acknowledged by the web viewer.")
+EVENTS_DROPPED = REGISTRY.counter(
+    "surveillance_events_dropped_total", "Viewer events dropped from a full replay buffer.")
+
+
+def record_db_write(rows: int, seconds: float):
+    """ViolationWriter on_write hook."""
+    DB_WRITE_SECONDS.observe(seconds)
+    DB_ROWS_WRITTEN.inc(rows)
@@ -0,0 +1,65 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap pre-filter that decides whether a camera frame is worth sending to
+    face detection. Frames are rate-limited to the camera's target FPS, and
+    the rest are compared against a running-average background on a small
+    grayscale copy; only frames where enough pixels changed pass. While faces
+    are in view, a frame is still let through every ``keepalive_interval``
+    seconds so people standing still keep being seen by the rule engine.
+    """
+
+    def __init__(self, target_fps: Optional[float] = None, min_changed_fraction: float = 0.002,
+                 pixel_threshold: int = 25, downscale_width: int = 160, learning_rate: float = 0.05,
+                 keepalive_interval: float = 2.0):
+        self.min_interval = 1.0 / target_fps if target_fps else 0.0
+        self.min_changed_fraction = min_changed_fraction
+        self.pixel_threshold = pixel_threshold
+        self.downscale_width = downscale_width
+        self.learning_rate = learning_rate
+        self.keepalive_interval = keepalive_interval
+
+        self.frames_seen = 0
+        self.frames_passed = 0
+        self._background: Optional[np.ndarray] = None
+        self._last_processed = float("-inf")
+        self._faces_in_view = False
+
+    def should_process(self, frame: np.ndarray, now: float) -> bool:
+        self.frames_seen += 1
+        if now - self._last_processed < self.min_interval:
+            return False
+
+        passed = self._has_motion(frame) or (
+            self._faces_in_view and now - self._last_processed >= self.keepalive_interval)
+        if passed:
+            self._last_processed = now
+            self.frames_passed += 1
+        return passed
+
+    def report_faces(self, face_count: int):
+        """Tells the gate whether the last processed frame contained any faces."""
+        self._faces_in_view = face_count > 0
+
+    def _has_motion(self, frame: np.ndarray) -> bool:
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.downscale_width / float(width))
+        small = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+
+        if self._background is None or self._background.shape != small.shape:
+            self._background = small.astype(np.float32)
+            return True
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self._background))
+        cv2.accumulateWeighted(small, self._background, self.learning_rate)
+        changed = np.count_nonzero(diff > self.pixel_threshold) / float(diff.size)
+        return changed >= self.min_changed_fraction
@@ -1,12 +1,53 @@
-
+import json
+import os
+import queue
 import smtplib
+import threading
+import time
+from datetime import datetime
 from email.mime.text import MIMEText
-from .config import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, ALERT_RECIPIENT_EMAIL
+from typing import Dict, List, Optional
+from .config import (SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, ALERT_RECIPIENT_EMAIL, SMTP_USE_TLS,
+                     NOTIFICATION_SPOOL_PATH, NOTIFICATION_DIGEST_SECONDS)
+
+def _alert_lines(alert: Dict) -> str:
+    timestamp = datetime.fromisoformat(alert["timestamp"])
+    return f"""
+    - Student ID: {alert['student_id']}
+    - Zone ID: {alert['zone_id']}
+    - Timestamp: {timestamp.strftime('%Y-%m-%d %I:%M:%S %p')}
+    - Student's Bunking Score: {alert['bunking_score']}
+"""
+
+def _build_message(sender: str, recipient: str, alerts: List[Dict]) -> MIMEText:
+    if len(alerts) == 1:
+        subject = f"Security Alert: Student Violation Detected"
+        body = f"""
+    A security violation has been confirmed.
+
+    Details:{_alert_lines(alerts[0])}
+    This is an automated notification.
+    """
+    else:
+        subject = f"Security Alert: {len(alerts)} Student Violations Detected"
+        details = "".join(_alert_lines(alert) for alert in alerts)
+        body = f"""
+    {len(alerts)} security violations have been confirmed.
+
+    Details:{details}
+    This is an automated notification.
+    """
+
+    msg = MIMEText(body)
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = recipient
+    return msg
 
 def send_email_notification(student_id: str, zone_id: str, timestamp, bunking_score: int):
     """
     Sends an email alert for a confirmed violation.
-    
+
     NOTE: This function uses placeholder credentials from config.py.
     You must update the SMTP settings in school_surveillance/src/config.py
     for this to work.
@@ -15,23 +56,9 @@ def send_email_notification(student_id: str, zone_id: str, timestamp, bunking_sc
         print("[⚠️] Email alert not sent. SMTP configuration is incomplete in config.py.")
         return
 
-    subject = f"Security Alert: Student Violation Detected"
-    body = f"""
-    A security violation has been confirmed.
-
-    Details:
-    - Student ID: {student_id}
-    - Zone ID: {zone_id}
-    - Timestamp: {timestamp.strftime('%Y-%m-%d %I:%M:%S %p')}
-    - Student's Bunking Score: {bunking_score}
-
-    This is an automated notification.
-    """
-    
-    msg = MIMEText(body)
-    msg['Subject'] = subject
-    msg['From'] = SMTP_USERNAME
-    msg['To'] = ALERT_RECIPIENT_EMAIL
+    alert = {"student_id": student_id, "zone_id": zone_id, "timestamp": timestamp.isoformat(),
+             "bunking_score": bunking_score}
+    msg = _build_message(SMTP_USERNAME, ALERT_RECIPIENT_EMAIL, [alert])
 
     try:
         with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
@@ -43,3 +70,165 @@ def send_email_notification(student_id: str, zone_id: str, timestamp, bunking_sc
         print(f"[❌] Failed to send email alert: {e}")
         print("[ℹ️] Please ensure your SMTP settings in school_surveillance/src/config.py are correct.")
 
+
+class NotificationDispatcher:
+    """
+    Sends alert emails from a background thread so a slow or unreachable
+    mail server never blocks video processing. Alerts raised within
+    ``digest_window`` seconds of each other are combined into one digest per
+    recipient and sent over a persistent SMTP connection. Failed sends are
+    retried with exponential backoff; alerts that still cannot be delivered,
+    or are queued when the dispatcher stops, are spooled to disk and resent
+    on the next start. Only the background thread sends and spools, so an
+    alert it has taken off the queue is never lost to a concurrent stop().
+    """
+
+    def __init__(self, host: str = SMTP_SERVER, port: int = SMTP_PORT, username: Optional[str] = SMTP_USERNAME,
+                 password: Optional[str] = SMTP_PASSWORD, sender: Optional[str] = None,
+                 recipient: str = ALERT_RECIPIENT_EMAIL, use_tls: bool = SMTP_USE_TLS,
+                 digest_window: float = NOTIFICATION_DIGEST_SECONDS, max_retries: int = 5,
+                 retry_backoff: float = 1.0, max_backoff: float = 60.0,
+                 spool_path: Optional[str] = NOTIFICATION_SPOOL_PATH, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.recipient = recipient
+        self.use_tls = use_tls
+        self.digest_window = digest_window
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.spool_path = spool_path
+        self.timeout = timeout
+
+        self.sent_messages = 0
+        self.failed_attempts = 0
+        self._queue: "queue.Queue[Dict]" = queue.Queue()
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> "NotificationDispatcher":
+        for alert in self._load_spool():
+            self._queue.put(alert)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Waits for the delivery attempt in progress, which ``timeout`` bounds
+        per SMTP operation; every alert not sent by then is spooled.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self._spool(self._drain())
+
+    def notify(self, student_id: str, zone_id: str, timestamp: datetime, bunking_score: int,
+               recipient: Optional[str] = None):
+        """Queues an alert; returns immediately."""
+        self._queue.put({"student_id": student_id, "zone_id": zone_id, "timestamp": timestamp.isoformat(),
+                         "bunking_score": bunking_score, "recipient": recipient or self.recipient})
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+            alerts = [first]
+            deadline = time.monotonic() + self.digest_window
+            while not self._stopped.is_set():
+                remaining = deadline - time.monotonic()
+                try:
+                    alerts.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            by_recipient: Dict[str, List[Dict]] = {}
+            for alert in alerts:
+                by_recipient.setdefault(alert["recipient"], []).append(alert)
+            for recipient, recipient_alerts in by_recipient.items():
+                if self._stopped.is_set():
+                    self._spool(recipient_alerts)
+                else:
+                    self._deliver(recipient, recipient_alerts)
+
+        self._spool(self._drain())
+        self._disconnect()
+
+    def _drain(self) -> List[Dict]:
+        drained = []
+        while True:
+            try:
+                drained.append(self._queue.get_nowait())
+            except queue.Empty:
+                return drained
+
+    def _deliver(self, recipient: str, alerts: List[Dict]):
+        msg = _build_message(self.sender, recipient, alerts)
+        delay = self.retry_backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._connection().sendmail(self.sender, [recipient], msg.as_string())
+                self.sent_messages += 1
+                print(f"[📧] Email alert with {len(alerts)} violation(s) sent successfully to {recipient}")
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                self.failed_attempts += 1
+                self._disconnect()
+                print(f"[❌] Failed to send email alert (attempt {attempt + 1}): {e}")
+            if attempt < self.max_retries and self._stopped.wait(delay):
+                break
+            delay = min(delay * 2, self.max_backoff)
+
+        print(f"[ℹ️] Spooling {len(alerts)} undelivered alert(s) to {self.spool_path}.")
+        self._spool(alerts)
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.use_tls:
+                    smtp.starttls()
+                if self.username and self.password:
+                    smtp.login(self.username, self.password)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+        return self._smtp
+
+    def _disconnect(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+
+    def _spool(self, alerts: List[Dict]):
+        if not alerts or not self.spool_path:
+            return
+        with open(self.spool_path, "a") as f:
+            for alert in alerts:
+                f.write(json.dumps(alert) + "\n")
+
+    def _load_spool(self) -> List[Dict]:
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return []
+        with open(self.spool_path, "r") as f:
+            alerts = [json.loads(line) for line in f if line.strip()]
+        os.remove(self.spool_path)
+        return alerts
@@ -0,0 +1,46 @@
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .tracker import Box
+
+BOX_COLOR = (0, 0, 255)
+TEXT_COLOR = (255, 255, 255)
+LABEL_HEIGHT = 35
+
+
+def annotate_frame(frame: np.ndarray, faces: List[Tuple[str, Box]], max_width: Optional[int] = None) -> np.ndarray:
+    """
+    Draws face boxes and names onto a copy of ``frame`` downscaled to at most
+    ``max_width`` pixels wide; the full-resolution frame is left untouched.
+    All outlines and label bars are drawn with one polyline and one polygon
+    fill call, leaving only the text per face.
+    """
+    height, width = frame.shape[:2]
+    scale = min(1.0, max_width / float(width)) if max_width else 1.0
+    if scale < 1.0:
+        canvas = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    else:
+        canvas = frame.copy()
+    if not faces:
+        return canvas
+
+    boxes = np.rint(np.array([box for _, box in faces], dtype=np.float32) * scale).astype(np.int32)
+    top, right, bottom, left = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    label_top = bottom - max(1, int(round(LABEL_HEIGHT * scale)))
+
+    outlines = np.stack([np.stack([left, top], 1), np.stack([right, top], 1),
+                         np.stack([right, bottom], 1), np.stack([left, bottom], 1)], axis=1)
+    label_bars = outlines.copy()
+    label_bars[:, 0, 1] = label_bars[:, 1, 1] = label_top
+
+    thickness = max(1, int(round(2 * scale)))
+    cv2.polylines(canvas, list(outlines), True, BOX_COLOR, thickness)
+    cv2.fillPoly(canvas, list(label_bars), BOX_COLOR)
+
+    font = cv2.FONT_HERSHEY_DUPLEX
+    text_offset = max(1, int(round(6 * scale)))
+    for (name, _), x, y in zip(faces, left, bottom):
+        cv2.putText(canvas, name, (int(x) + text_offset, int(y) - text_offset), font, scale, TEXT_COLOR, 1)
+    return canvas
@@ -1,54 +1,153 @@
-from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
-from .data_models import Student, Schedule, Zone, Violation
+import json
+import os
+from bisect import bisect_right
+from datetime import datetime, timedelta, time
+from typing import List, Dict, FrozenSet, Iterable, Optional, Tuple
+from .data_models import Student, Schedule, Zone, Violation, Period, DetectionResult, UNKNOWN_IDENTITY
 from .database import save_violation
 from .notifications import send_email_notification
-from .config import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, ALERT_RECIPIENT_EMAIL
+from .config import (SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, ALERT_RECIPIENT_EMAIL, TIMETABLE_PATH,
+                     LAST_SEEN_TTL_MINUTES)
+
+DEFAULT_TIMETABLE = [
+    Period(1, time(8), time(9)),
+    Period(2, time(9), time(10)),
+    Period(3, time(10), time(11)),
+    Period(4, time(11), time(12)),
+    Period(5, time(13), time(14)),
+    Period(6, time(14), time(15)),
+    Period(7, time(15), time(16)),
+]
+
+def load_timetable(path: str = TIMETABLE_PATH) -> Optional[List[Period]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        periods = json.load(f)
+    return [Period(period=p['period'], start=time.fromisoformat(p['start']), end=time.fromisoformat(p['end']))
+            for p in periods]
 
 class RuleEngine:
-    def __init__(self, students: List[Student], schedules: List[Schedule], zones: List[Zone], grace_period_minutes: int = 0):
+    def __init__(self, students: List[Student], schedules: List[Schedule], zones: List[Zone], grace_period_minutes: int = 0,
+                 timetable: Optional[List[Period]] = None, notifier=None, violation_writer=None, state_store=None,
+                 last_seen_ttl_minutes: int = LAST_SEEN_TTL_MINUTES):
         self.students = {s.id: s for s in students}
-        self.schedules = schedules
         self.zones = {z.id: z for z in zones}
         self.active_violations: Dict[str, Violation] = {}
         self.grace_period = timedelta(minutes=grace_period_minutes)
+        # Ordered oldest sighting first, so stale entries are evicted from the front.
         self.last_seen_location: Dict[str, Tuple[str, datetime]] = {}
+        self.last_seen_ttl = timedelta(minutes=last_seen_ttl_minutes)
         self.bunking_score: Dict[str, int] = {s.id: 0 for s in students}
+        # Anything with a notify() method, e.g. a NotificationDispatcher; alerts
+        # are sent synchronously when no notifier is given.
+        self.notifier = notifier
+        # Anything with a save() method, e.g. a database.ViolationWriter;
+        # violations are written synchronously when no writer is given.
+        self.violation_writer = violation_writer
+        # Anything with save_active()/clear_active(), e.g. a database.ViolationWriter;
+        # open grace periods are only kept in memory when none is given.
+        self.state_store = state_store
+        self.set_timetable(timetable or DEFAULT_TIMETABLE)
+        self.reload_schedules(schedules)
 
-    def get_current_period(self):
-        now = datetime.now()
-        if 8 <= now.hour < 9:
-            return 1
-        elif 9 <= now.hour < 10:
-            return 2
-        elif 10 <= now.hour < 11:
-            return 3
-        elif 11 <= now.hour < 12:
-            return 4
-        elif 13 <= now.hour < 14:
-            return 5
-        elif 14 <= now.hour < 15:
-            return 6
-        elif 15 <= now.hour < 16:
-            return 7
-        else:
+    def reload_schedules(self, schedules: List[Schedule]):
+        """Rebuilds the (student_id, period) index; safe to call while the engine is running."""
+        index = {}
+        expected: Dict[Tuple[str, int], set] = {}
+        for schedule in schedules:
+            index.setdefault((schedule.student_id, schedule.period), schedule)
+            expected.setdefault((schedule.classroom_id, schedule.period), set()).add(schedule.student_id)
+        self.schedules = schedules
+        self._schedule_index: Dict[Tuple[str, int], Schedule] = index
+        self._expected_students: Dict[Tuple[str, int], FrozenSet[str]] = {
+            key: frozenset(student_ids) for key, student_ids in expected.items()}
+
+    def refresh_schedules(self, schedules: List[Schedule]) -> bool:
+        """Reloads ``schedules`` (e.g. freshly read from the database) if they changed."""
+        if schedules == self.schedules:
+            return False
+        self.reload_schedules(schedules)
+        print(f"Reloaded {len(schedules)} schedule entries.")
+        return True
+
+    def restore_state(self, active_violations: Dict[str, Violation], bunking_scores: Dict[str, int],
+                      now: Optional[datetime] = None) -> int:
+        """
+        Resumes from a checkpoint (database.load_active_violations and
+        load_bunking_scores). Grace periods opened on an earlier day are
+        discarded. Returns the number of grace periods resumed.
+        """
+        today = (now or datetime.now()).date()
+        self.bunking_score.update(bunking_scores)
+        resumed = 0
+        for student_id, violation in active_violations.items():
+            if violation.timestamp.date() == today:
+                self.active_violations[student_id] = violation
+                resumed += 1
+            elif self.state_store:
+                self.state_store.clear_active(student_id)
+        return resumed
+
+    def set_timetable(self, timetable: List[Period]):
+        periods = sorted(timetable, key=lambda p: p.start)
+        self.timetable = periods
+        self._period_starts = [p.start for p in periods]
+
+    def get_current_period(self, now: Optional[datetime] = None) -> Optional[int]:
+        current_time = (now or datetime.now()).time()
+        i = bisect_right(self._period_starts, current_time) - 1
+        if i >= 0 and current_time < self.timetable[i].end:
+            return self.timetable[i].period
+        return None
+
+    def expected_students(self, zone_id: str, now: Optional[datetime] = None) -> Optional[FrozenSet[str]]:
+        """
+        Students scheduled in ``zone_id`` during the current period, or None
+        when nobody is scheduled there (e.g. hallways, or outside school hours).
+        """
+        current_period = self.get_current_period(now)
+        if not current_period:
             return None
+        return self._expected_students.get((zone_id, current_period))
+
+    def zone_can_produce_violations(self, zone_id: str, now: Optional[datetime] = None) -> bool:
+        """False outside school hours and in zones open to everyone during the current period."""
+        current_period = self.get_current_period(now)
+        if not current_period:
+            return False
+        zone = self.zones.get(zone_id)
+        return not (zone and current_period in zone.allowed_periods)
+
+    def active_violation_counts(self) -> Dict[str, int]:
+        """Number of grace-period violations currently open per zone."""
+        counts: Dict[str, int] = {}
+        for violation in self.active_violations.values():
+            counts[violation.zone_id] = counts.get(violation.zone_id, 0) + 1
+        return counts
 
     def is_student_allowed_in_zone(self, student_id: str, zone_id: str) -> bool:
-        current_period = self.get_current_period()
+        return self._is_allowed(student_id, zone_id, self.get_current_period())
+
+    def _is_allowed(self, student_id: str, zone_id: str, current_period: Optional[int],
+                    revoked: Optional[List[Violation]] = None) -> bool:
         if not current_period:
             return True  # Outside of school hours
 
-        student_schedule = [s for s in self.schedules if s.student_id == student_id and s.period == current_period]
+        student_schedule = self._schedule_index.get((student_id, current_period))
         if not student_schedule:
             return True
 
-        classroom_id = student_schedule[0].classroom_id
+        classroom_id = student_schedule.classroom_id
 
         if zone_id == classroom_id:
             if student_id in self.active_violations:
                 print(f"[✅] Student {student_id} returned to classroom. Violation revoked.")
-                del self.active_violations[student_id]
+                violation = self.active_violations.pop(student_id)
+                if self.state_store:
+                    self.state_store.clear_active(student_id)
+                if revoked is not None:
+                    revoked.append(violation)
             return True
 
         zone = self.zones.get(zone_id)
@@ -58,27 +157,63 @@ class RuleEngine:
         return False
 
     def process_violation(self, student_id: str, current_zone_id: str):
-        self.last_seen_location[student_id] = (current_zone_id, datetime.now())
+        now = datetime.now()
+        result = DetectionResult()
+        self._evaluate(student_id, current_zone_id, now, self.get_current_period(), result)
+        return result.confirmed[0] if result.confirmed else None
 
-        if self.is_student_allowed_in_zone(student_id, current_zone_id):
-            return None
+    def process_detections(self, zone_id: str, student_ids: Iterable[str],
+                           timestamp: Optional[datetime] = None) -> DetectionResult:
+        """
+        Evaluates every student recognized in one frame of ``zone_id``. The
+        period is resolved once for the whole frame, and unknown faces and
+        duplicate IDs are skipped.
+        """
+        now = timestamp or datetime.now()
+        current_period = self.get_current_period(now)
+        result = DetectionResult()
+        for student_id in dict.fromkeys(student_ids):
+            if student_id != UNKNOWN_IDENTITY:
+                self._evaluate(student_id, zone_id, now, current_period, result)
+        return result
+
+    def _record_location(self, student_id: str, zone_id: str, now: datetime):
+        """Updates the student's last sighting and evicts sightings older than the TTL."""
+        self.last_seen_location.pop(student_id, None)
+        self.last_seen_location[student_id] = (zone_id, now)
+        while self.last_seen_location:
+            oldest_id = next(iter(self.last_seen_location))
+            if now - self.last_seen_location[oldest_id][1] <= self.last_seen_ttl:
+                break
+            del self.last_seen_location[oldest_id]
+
+    def _evaluate(self, student_id: str, current_zone_id: str, now: datetime, current_period: Optional[int],
+                  result: DetectionResult):
+        self._record_location(student_id, current_zone_id, now)
+
+        if self._is_allowed(student_id, current_zone_id, current_period, result.revoked):
+            return
 
         if student_id not in self.active_violations:
-            self.active_violations[student_id] = Violation(student_id, current_zone_id, datetime.now())
-            print(f"[⏰] Rule Triggered: {datetime.now().strftime('%I:%M %p')} Attendance Window")
+            violation = Violation(student_id, current_zone_id, now)
+            self.active_violations[student_id] = violation
+            if self.state_store:
+                self.state_store.save_active(violation)
+            result.created.append(violation)
+            print(f"[⏰] Rule Triggered: {now.strftime('%I:%M %p')} Attendance Window")
             print(f"[👁] Student {student_id} detected outside permitted zone ({current_zone_id}). Grace period started.")
-            return None
         else:
             violation = self.active_violations[student_id]
-            if not violation.grace_period_expired and datetime.now() - violation.timestamp > self.grace_period:
+            if not violation.grace_period_expired and now - violation.timestamp > self.grace_period:
                 violation.grace_period_expired = True
                 print(f"[⚖️] Student {student_id} has not returned within the grace period. Violation confirmed.")
-                self.bunking_score[student_id] += 1
+                self.bunking_score[student_id] = self.bunking_score.get(student_id, 0) + 1
             
             if violation.grace_period_expired and not violation.alert_sent:
                 print(f"[🔔] NOTIFICATION: Student {student_id} marked absent. Bunking Score: {self.bunking_score[student_id]}")
                 
-                send_email_notification(
+                notify = self.notifier.notify if self.notifier else send_email_notification
+                notify(
                     student_id=student_id,
                     zone_id=current_zone_id,
                     timestamp=violation.timestamp,
@@ -86,7 +221,8 @@ class RuleEngine:
                 )
                 
                 violation.alert_sent = True
-                save_violation(violation) # Save to database
-                return violation
-
-        return None
\ No newline at end of file
+                save = self.violation_writer.save if self.violation_writer else save_violation
+                save(violation) # Save to database
+                if self.state_store:
+                    self.state_store.save_active(violation)
+                result.confirmed.append(violation)
@@ -0,0 +1,148 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional
+
+
+@dataclass
+class CameraLoad:
+    """Per-camera scheduling state and counters."""
+    weight: float = 1.0
+    budget_fps: float = float("inf")
+    offered_fps: float = 0.0
+    detections: float = 0.0
+    active_violations: int = 0
+    can_violate: bool = True
+    frames_offered: int = 0
+    frames_admitted: int = 0
+    frames_skipped: int = 0
+    tokens: float = 1.0
+    last_offer: Optional[float] = None
+    last_refill: Optional[float] = None
+
+
+class CameraScheduler:
+    """
+    Splits the recognition pipeline's capacity between cameras. Capacity is
+    estimated from the measured processing time per frame; each camera gets a
+    share weighted by the faces it has recently seen, the grace-period
+    violations open in its zone, and whether its zone can produce violations
+    in the current period at all. Shares are capped at the rate a camera
+    actually offers frames, and the leftover is redistributed to the others.
+
+    Frames beyond a camera's budget are skipped (and counted) at admission, so
+    under overload quiet or irrelevant cameras shed first instead of every
+    camera slowing down together. Until a processing time has been measured,
+    every frame is admitted.
+    """
+
+    def __init__(self, parallelism: int = 1, target_utilization: float = 0.9, min_fps: float = 0.5,
+                 idle_weight: float = 0.1, detection_weight: float = 1.0, violation_weight: float = 2.0,
+                 smoothing: float = 0.2, rebalance_interval: float = 1.0):
+        self.parallelism = max(1, parallelism)
+        self.target_utilization = target_utilization
+        self.min_fps = min_fps
+        self.idle_weight = idle_weight
+        self.detection_weight = detection_weight
+        self.violation_weight = violation_weight
+        self.smoothing = smoothing
+        self.rebalance_interval = rebalance_interval
+
+        self.cameras: Dict[Hashable, CameraLoad] = {}
+        self.seconds_per_frame: Optional[float] = None
+        self._rebalanced_at = float("-inf")
+
+    def _camera(self, camera_id: Hashable) -> CameraLoad:
+        load = self.cameras.get(camera_id)
+        if load is None:
+            load = self.cameras[camera_id] = CameraLoad()
+            self._rebalanced_at = float("-inf")
+        return load
+
+    @property
+    def capacity_fps(self) -> float:
+        """Frames per second the pipeline can process at the target utilization."""
+        if not self.seconds_per_frame:
+            return float("inf")
+        return self.parallelism * self.target_utilization / self.seconds_per_frame
+
+    def record_processing(self, frame_count: int, seconds: float):
+        """Feeds back how long processing ``frame_count`` frames took."""
+        if frame_count <= 0:
+            return
+        per_frame = seconds / frame_count
+        if self.seconds_per_frame is None:
+            self.seconds_per_frame = per_frame
+        else:
+            self.seconds_per_frame += self.smoothing * (per_frame - self.seconds_per_frame)
+
+    def update_zone_state(self, camera_id: Hashable, active_violations: int, can_violate: bool):
+        """Records the rule-relevance of the camera's zone (see RuleEngine.zone_can_produce_violations)."""
+        load = self._camera(camera_id)
+        load.active_violations = active_violations
+        load.can_violate = can_violate
+
+    def report_detections(self, camera_id: Hashable, face_count: int):
+        """Records the number of faces found in the camera's last processed frame."""
+        load = self._camera(camera_id)
+        load.detections += self.smoothing * (face_count - load.detections)
+
+    def admit(self, camera_id: Hashable, now: Optional[float] = None) -> bool:
+        """Whether a frame offered by ``camera_id`` now fits in its budget; skipped frames are counted."""
+        now = time.monotonic() if now is None else now
+        load = self._camera(camera_id)
+        load.frames_offered += 1
+        if load.last_offer is not None and now > load.last_offer:
+            rate = 1.0 / (now - load.last_offer)
+            load.offered_fps = rate if not load.offered_fps else load.offered_fps + self.smoothing * (rate - load.offered_fps)
+        load.last_offer = now
+
+        if now - self._rebalanced_at >= self.rebalance_interval:
+            self.rebalance()
+            self._rebalanced_at = now
+
+        if load.budget_fps == float("inf"):
+            load.tokens = 1.0
+        elif load.last_refill is not None:
+            # Up to two frames of credit, so a budget that is not a multiple of the
+            # offered rate is still used up instead of rounding down.
+            load.tokens = min(2.0, load.tokens + (now - load.last_refill) * load.budget_fps)
+        load.last_refill = now
+        if load.tokens >= 1.0:
+            load.tokens -= 1.0
+            load.frames_admitted += 1
+            return True
+        load.frames_skipped += 1
+        return False
+
+    def weight(self, load: CameraLoad) -> float:
+        if not load.can_violate and not load.active_violations:
+            return self.idle_weight
+        return 1.0 + self.detection_weight * load.detections + self.violation_weight * load.active_violations
+
+    def rebalance(self):
+        """Recomputes every camera's budget by water-filling the capacity over the weights."""
+        capacity = self.capacity_fps
+        for load in self.cameras.values():
+            load.weight = self.weight(load)
+            load.budget_fps = float("inf")
+        if capacity == float("inf"):
+            return
+
+        remaining = capacity
+        unsettled = dict(self.cameras)
+        while unsettled:
+            per_weight = remaining / sum(load.weight for load in unsettled.values())
+            capped = {camera_id: load for camera_id, load in unsettled.items()
+                      if 0.0 < load.offered_fps <= load.weight * per_weight}
+            if not capped:
+                for load in unsettled.values():
+                    load.budget_fps = max(self.min_fps, load.weight * per_weight)
+                break
+            for camera_id, load in capped.items():
+                # A little headroom so jitter in the offered rate does not cause skips.
+                load.budget_fps = max(self.min_fps, load.offered_fps * 1.1)
+                remaining = max(0.0, remaining - load.offered_fps)
+                del unsettled[camera_id]
+
+    def skip_counts(self) -> Dict[Hashable, int]:
+        return {camera_id: load.frames_skipped for camera_id, load in self.cameras.items()}
@@ -0,0 +1,92 @@
+import threading
+import time
+from typing import Dict, Hashable, Iterator, Optional, Tuple
+
+import numpy as np
+
+MJPEG_BOUNDARY = "frame"
+
+
+def encode_jpeg(frame: np.ndarray, quality: int = 70, max_width: Optional[int] = None) -> bytes:
+    """Downscales ``frame`` to at most ``max_width`` pixels wide and JPEG-encodes it."""
+    import cv2  # Not needed by the web viewer, which only relays encoded frames.
+
+    height, width = frame.shape[:2]
+    if max_width and width > max_width:
+        frame = cv2.resize(frame, (max_width, int(height * max_width / width)), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+class FrameStreamer:
+    """
+    Sends annotated camera frames from main.py to the web viewer as JPEG
+    over Socket.IO, rate-limited per camera so streaming never competes
+    with recognition for more than ``max_fps`` encodes per camera.
+    """
+
+    def __init__(self, sio, quality: int = 70, max_width: Optional[int] = 640, max_fps: float = 10.0):
+        self.sio = sio
+        self.quality = quality
+        self.max_width = max_width
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.frames_sent = 0
+        self._last_sent: Dict[Hashable, float] = {}
+
+    def wants_frame(self, camera_id: Hashable, now: Optional[float] = None) -> bool:
+        """Whether a frame published now would be sent; lets callers skip rendering otherwise."""
+        now = time.monotonic() if now is None else now
+        return self.sio.connected and now - self._last_sent.get(camera_id, float("-inf")) >= self.min_interval
+
+    def publish(self, camera_id: Hashable, zone_id: str, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if not self.wants_frame(camera_id, now):
+            return False
+
+        jpeg = encode_jpeg(frame, self.quality, self.max_width)
+        self.sio.emit('camera_frame', {'camera_id': str(camera_id), 'zone_id': zone_id, 'jpeg': jpeg})
+        self._last_sent[camera_id] = now
+        self.frames_sent += 1
+        return True
+
+
+class LatestFrameHub:
+    """
+    Viewer-side store holding only the newest JPEG per camera. Each MJPEG
+    client waits for a frame newer than the one it last sent, so a slow
+    browser simply skips frames and never builds up a backlog.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._frames: Dict[str, Tuple[int, str, bytes]] = {}
+
+    def publish(self, camera_id: str, zone_id: str, jpeg: bytes):
+        with self._condition:
+            sequence = self._frames.get(camera_id, (0, None, None))[0] + 1
+            self._frames[camera_id] = (sequence, zone_id, jpeg)
+            self._condition.notify_all()
+
+    def cameras(self) -> Dict[str, str]:
+        with self._condition:
+            return {camera_id: zone_id for camera_id, (_, zone_id, _) in self._frames.items()}
+
+    def wait_for_frame(self, camera_id: str, after_sequence: int, timeout: float = 5.0) -> Optional[Tuple[int, bytes]]:
+        with self._condition:
+            self._condition.wait_for(lambda: self._frames.get(camera_id, (0,))[0] > after_sequence, timeout)
+            entry = self._frames.get(camera_id)
+            if entry is None or entry[0] <= after_sequence:
+                return None
+            return entry[0], entry[2]
+
+    def mjpeg(self, camera_id: str, timeout: float = 5.0) -> Iterator[bytes]:
+        sequence = 0
+        while True:
+            latest = self.wait_for_frame(camera_id, sequence, timeout)
+            if latest is None:
+                continue
+            sequence, jpeg = latest
+            yield (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                   f"Content-Length: {len(jpeg)}\r\n\r\n").encode() + jpeg + b"\r\n"
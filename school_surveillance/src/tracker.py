@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from itertools import count
+from typing import List, Optional, Tuple
+
+Box = Tuple[int, int, int, int]  # (top, right, bottom, left)
+
+
+@dataclass
+class Track:
+    track_id: int
+    box: Box
+    identity: Optional[str] = None
+    distance: float = float("inf")
+    last_recognized: float = float("-inf")
+    misses: int = 0
+
+
+def iou(a: Box, b: Box) -> float:
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    if intersection == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return intersection / float(area_a + area_b - intersection)
+
+
+class FaceTracker:
+    """
+    IoU tracker for the faces of one camera. Each face box keeps a stable
+    track ID across frames together with the identity it was last recognized
+    as, so the embedding stage only has to run for new, stale or uncertain tracks.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_misses: int = 5, reverify_interval: float = 10.0,
+                 confident_distance: float = 0.3, retry_interval: float = 0.5):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.reverify_interval = reverify_interval
+        self.confident_distance = confident_distance
+        self.retry_interval = retry_interval
+        self.tracks: List[Track] = []
+        self._ids = count(1)
+
+    def update(self, boxes: List[Box]) -> List[Track]:
+        """Associates this frame's boxes with existing tracks; returns one track per box, in order."""
+        pairs = sorted(
+            ((iou(track.box, box), t, b) for t, track in enumerate(self.tracks) for b, box in enumerate(boxes)),
+            reverse=True,
+        )
+
+        assigned: List[Optional[Track]] = [None] * len(boxes)
+        matched_tracks = set()
+        for overlap, t, b in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in matched_tracks or assigned[b] is not None:
+                continue
+            track = self.tracks[t]
+            track.box = boxes[b]
+            track.misses = 0
+            assigned[b] = track
+            matched_tracks.add(t)
+
+        surviving = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            surviving.append(track)
+
+        for b, box in enumerate(boxes):
+            if assigned[b] is None:
+                assigned[b] = Track(next(self._ids), box)
+                surviving.append(assigned[b])
+
+        self.tracks = surviving
+        return assigned
+
+    def needs_recognition(self, track: Track, now: float) -> bool:
+        if track.identity is None:
+            return True
+        elapsed = now - track.last_recognized
+        if elapsed >= self.reverify_interval:
+            return True
+        return track.distance >= self.confident_distance and elapsed >= self.retry_interval
+
+    def assign(self, track: Track, identity: str, distance: float, now: float):
+        track.identity = identity
+        track.distance = distance
+        track.last_recognized = now
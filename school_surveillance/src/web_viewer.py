@@ -1,13 +1,129 @@
-from flask import Flask, render_template
+from datetime import date, datetime
+from flask import Flask, Response, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
-from .database import load_violations
+from .database import (init_db, query_violations, student_violation_total, violation_totals_by_day,
+                       violation_totals_by_zone)
+from .streaming import LatestFrameHub, MJPEG_BOUNDARY
 
 app = Flask(__name__, template_folder='templates')
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+frame_hub = LatestFrameHub()
+
+# Latest metrics snapshot (Prometheus text format) pushed by each connected pipeline process.
+pipeline_metrics = {}
+
+MAX_PAGE_SIZE = 500
+
+schema_ready = False
+
+@app.before_request
+def ensure_schema():
+    """Creates the tables before the first request, also when a server (e.g. gunicorn) only imports the app."""
+    global schema_ready
+    if not schema_ready:
+        init_db()
+        schema_ready = True
+
+def violation_to_json(violation):
+    return {
+        'student_id': violation.student_id,
+        'zone_id': violation.zone_id,
+        'timestamp': violation.timestamp.isoformat(),
+        'grace_period_expired': violation.grace_period_expired,
+        'alert_sent': violation.alert_sent
+    }
+
 @app.route('/')
 def index():
-    return render_template('index.html', violations=[])
+    violations, _ = query_violations(limit=50)
+    return render_template('index.html', violations=violations)
+
+@app.route('/api/violations')
+def violations_history():
+    """
+    Violation history, newest first. Optional filters: student_id, zone_id,
+    since, until (ISO timestamps); paginate with limit and the returned
+    next_cursor.
+    """
+    try:
+        since = request.args.get('since')
+        until = request.args.get('until')
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        before = tuple(cursor.split('|', 1)) if cursor else None
+        if before is not None and len(before) != 2:
+            raise ValueError("malformed cursor")
+
+        violations, next_cursor = query_violations(
+            student_id=request.args.get('student_id'),
+            zone_id=request.args.get('zone_id'),
+            since=datetime.fromisoformat(since) if since else None,
+            until=datetime.fromisoformat(until) if until else None,
+            limit=limit,
+            before=before)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'violations': [violation_to_json(v) for v in violations],
+        'next_cursor': '|'.join(next_cursor) if next_cursor else None
+    })
+
+@app.route('/api/violations/totals')
+def violation_totals():
+    """
+    Confirmed-violation counts, read from the maintained totals: for one
+    student_id, or per zone and per day (optional since/until ISO dates).
+    """
+    student_id = request.args.get('student_id')
+    if student_id is not None:
+        return jsonify({'student_id': student_id, 'violations': student_violation_total(student_id)})
+    try:
+        since = request.args.get('since')
+        until = request.args.get('until')
+        by_day = violation_totals_by_day(since=date.fromisoformat(since) if since else None,
+                                         until=date.fromisoformat(until) if until else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'by_zone': violation_totals_by_zone(),
+        'by_day': {day.isoformat(): violations for day, violations in by_day.items()}
+    })
+
+@app.route('/api/cameras')
+def cameras():
+    return jsonify([{'camera_id': camera_id, 'zone_id': zone_id}
+                    for camera_id, zone_id in sorted(frame_hub.cameras().items())])
+
+@app.route('/video_feed/<camera_id>')
+def video_feed(camera_id):
+    return Response(frame_hub.mjpeg(camera_id),
+                    mimetype=f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}')
+
+def merge_metrics(snapshots):
+    """
+    Combines the snapshots of several processes (recorder nodes, the rule
+    aggregator) into one exposition, with each metric family's HELP/TYPE
+    header written once and the samples of every process below it.
+    """
+    families = {}
+    for text in snapshots:
+        family = None
+        for line in text.splitlines():
+            if line.startswith('# HELP ') or line.startswith('# TYPE '):
+                family = line.split(' ', 3)[2]
+                header, _ = families.setdefault(family, ([], []))
+                if line not in header:
+                    header.append(line)
+            elif line:
+                name = family or line.split('{', 1)[0].split(' ', 1)[0]
+                families.setdefault(name, ([], []))[1].append(line)
+    return ''.join(line + '\n' for header, samples in families.values() for line in header + samples)
+
+@app.route('/metrics')
+def metrics():
+    return Response(merge_metrics(pipeline_metrics.values()), mimetype='text/plain; version=0.0.4')
 
 @socketio.on('connect')
 def test_connect():
@@ -17,11 +133,23 @@ def test_connect():
 @socketio.on('disconnect')
 def test_disconnect():
     print('Client disconnected')
+    pipeline_metrics.pop(request.sid, None)
+
+@socketio.on('event_batch')
+def handle_event_batch(batch):
+    """Relays one batch from main.py to the browsers in a single broadcast and acknowledges it."""
+    violations = [event['data'] for event in batch['events'] if event['type'] == 'violation']
+    if violations:
+        socketio.emit('violation_batch', violations)
+    return batch['sequence']
+
+@socketio.on('camera_frame')
+def handle_camera_frame(data):
+    frame_hub.publish(str(data['camera_id']), data.get('zone_id'), data['jpeg'])
 
-@socketio.on('new_violation')
-def handle_new_violation(json):
-    print('received new violation: ' + str(json))
-    socketio.emit('update_violations', json)
+@socketio.on('metrics')
+def handle_metrics(text):
+    pipeline_metrics[request.sid] = text
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True)
\ No newline at end of file
+    socketio.run(app, debug=True)
@@ -0,0 +1,204 @@
+import multiprocessing as mp
+import queue
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from .tracker import Box, FaceTracker
+
+
+@dataclass
+class RecognitionResult:
+    camera_id: Hashable
+    timestamp: float
+    faces: List[Tuple[str, Box]]
+    error: Optional[str] = None  # Set when recognition failed and ``faces`` is empty because of it.
+    # Seconds per stage of the worker's recognize_batch call. Only the first
+    # result of each batch carries them, so a batch is observed (and its
+    # error counted) once however many cameras it covered.
+    timings: Optional[Dict[str, float]] = None
+
+
+@dataclass
+class _Task:
+    camera_id: Hashable
+    timestamp: float
+    shm_name: str
+    shape: Tuple[int, ...]
+    dtype: str
+    candidates: Optional[FrozenSet[str]] = None
+
+
+class RecognitionWorkerPool:
+    """
+    Runs face recognition in separate processes. Each worker loads the model
+    and the gallery once, and owns a fixed subset of the cameras so its
+    per-camera trackers stay valid. Frames travel through one shared-memory
+    slot per camera; only a small task descriptor is pickled. A camera whose
+    previous frame is still being processed does not accept a new one, so a
+    busy worker sheds frames instead of building a backlog. A worker that
+    dies is restarted, and its cameras' frames in flight are given up.
+    """
+
+    def __init__(self, num_workers: int, db_path: str, recognizer_factory: Optional[Callable[[], object]] = None,
+                 start_method: str = "spawn"):
+        self.num_workers = max(1, num_workers)
+        self.db_path = db_path
+        self.recognizer_factory = recognizer_factory
+        self._context = mp.get_context(start_method)
+        self._task_queues = []
+        self._result_queue = None
+        self._processes = []
+        self._slots: Dict[Hashable, SharedMemory] = {}
+        self._in_flight: Dict[Hashable, bool] = {}
+        self._workers_by_camera: Dict[Hashable, int] = {}
+        self.restarts = 0
+
+    def start(self) -> "RecognitionWorkerPool":
+        self._result_queue = self._context.Queue()
+        for worker_index in range(self.num_workers):
+            task_queue, process = self._spawn(worker_index)
+            self._task_queues.append(task_queue)
+            self._processes.append(process)
+        return self
+
+    def _spawn(self, worker_index: int):
+        task_queue = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(task_queue, self._result_queue, self.db_path, self.recognizer_factory),
+            name=f"recognition-worker-{worker_index}",
+            daemon=True,
+        )
+        process.start()
+        return task_queue, process
+
+    def _check_workers(self):
+        """Restarts dead workers; their cameras' frames in flight will never return, so they are released."""
+        for worker_index, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            print(f"[❌] {process.name} exited with code {process.exitcode}; restarting it.")
+            for camera_id, index in self._workers_by_camera.items():
+                if index == worker_index:
+                    self._in_flight[camera_id] = False
+            # A fresh queue, so tasks queued for the dead worker are not processed late.
+            self._task_queues[worker_index], self._processes[worker_index] = self._spawn(worker_index)
+            self.restarts += 1
+
+    def is_busy(self, camera_id: Hashable) -> bool:
+        if not self._in_flight.get(camera_id, False):
+            return False
+        self._check_workers()
+        return self._in_flight.get(camera_id, False)
+
+    def submit(self, camera_id: Hashable, frame: np.ndarray, timestamp: float,
+               candidates: Optional[FrozenSet[str]] = None) -> bool:
+        """
+        Copies ``frame`` into the camera's shared-memory slot and queues it;
+        returns False if the camera is busy. ``candidates`` is passed on to
+        FaceRecognizer.recognize_batch for this frame.
+        """
+        if self.is_busy(camera_id):
+            return False
+
+        slot = self._slots.get(camera_id)
+        if slot is None or slot.size < frame.nbytes:
+            if slot is not None:
+                slot.close()
+                slot.unlink()
+            slot = SharedMemory(create=True, size=frame.nbytes)
+            self._slots[camera_id] = slot
+
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=slot.buf)[...] = frame
+        worker_index = self._workers_by_camera.setdefault(camera_id, len(self._workers_by_camera) % self.num_workers)
+        self._task_queues[worker_index].put(_Task(camera_id, timestamp, slot.name, frame.shape, frame.dtype.str, candidates))
+        self._in_flight[camera_id] = True
+        return True
+
+    def results(self, timeout: float = 0.0) -> List[RecognitionResult]:
+        """Returns all results available now, waiting up to ``timeout`` seconds for the first one."""
+        collected = []
+        try:
+            collected.append(self._result_queue.get(timeout=timeout) if timeout > 0 else self._result_queue.get_nowait())
+            while True:
+                collected.append(self._result_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        for result in collected:
+            self._in_flight[result.camera_id] = False
+        self._check_workers()
+        return collected
+
+    def stop(self):
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        for slot in self._slots.values():
+            slot.close()
+            slot.unlink()
+        self._slots.clear()
+        self._task_queues, self._processes = [], []
+
+
+def _worker_main(task_queue, result_queue, db_path: str, recognizer_factory):
+    if recognizer_factory is None:
+        from .face_recognition import FaceRecognizer
+        recognizer_factory = FaceRecognizer
+
+    recognizer = recognizer_factory()
+    try:
+        recognizer.warm_up(db_path)
+    except Exception as e:
+        print(f"Warning: Face recognition warm-up failed ({e}); models load on first use.")
+    trackers: Dict[Hashable, FaceTracker] = {}
+    attached: Dict[Hashable, SharedMemory] = {}  # The camera's current slot, by camera_id
+
+    running = True
+    while running:
+        tasks = [task_queue.get()]
+        # Drain everything already queued so this worker's cameras share one batch.
+        try:
+            while True:
+                tasks.append(task_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if any(task is None for task in tasks):
+            running = False
+            tasks = [t for t in tasks if t is not None]
+        if not tasks:
+            continue
+
+        latest: Dict[Hashable, _Task] = {}
+        for task in tasks:
+            latest[task.camera_id] = task
+
+        frames = {}
+        for camera_id, task in latest.items():
+            shm = attached.get(camera_id)
+            if shm is None or shm.name != task.shm_name:
+                # The pool replaced the slot (e.g. a larger frame); let go of the old mapping.
+                if shm is not None:
+                    shm.close()
+                # Workers share the pool's resource tracker, which unlinks the segment on stop().
+                shm = attached[camera_id] = SharedMemory(name=task.shm_name)
+            frames[camera_id] = np.ndarray(task.shape, dtype=np.dtype(task.dtype), buffer=shm.buf)
+            trackers.setdefault(camera_id, FaceTracker())
+
+        candidates = {camera_id: task.candidates for camera_id, task in latest.items()}
+        recognized = recognizer.recognize_batch(frames, db_path, trackers, candidates)
+        del frames
+        timings = dict(recognizer.last_timings)
+        for camera_id, task in latest.items():
+            result_queue.put(RecognitionResult(camera_id, task.timestamp, recognized.get(camera_id, []),
+                                               recognizer.last_error, timings))
+            timings = None
+
+    for shm in attached.values():
+        shm.close()
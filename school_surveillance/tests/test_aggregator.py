@@ -0,0 +1,179 @@
+import unittest
+from unittest.mock import patch
+import multiprocessing
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+import socket
+import time
+from datetime import datetime
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data_models import Student, Schedule, Zone
+from src.rule_engine import RuleEngine
+from src.aggregator import Detection, DetectionForwarder, RuleAggregator, decode_ack, encode_batch, main, parse_address
+from src.config import DEFAULT_AGGREGATOR_AUTHKEY
+
+AUTHKEY = b'test-aggregator'
+
+class RecordingNotifier:
+    def __init__(self):
+        self.alerts = []
+
+    def notify(self, **alert):
+        self.alerts.append(alert)
+
+class RecordingWriter:
+    def __init__(self):
+        self.saved = []
+
+    def save(self, violation):
+        self.saved.append(violation)
+
+def at(hour, minute):
+    """A Monday timestamp inside the default timetable's periods."""
+    return datetime(2025, 1, 6, hour, minute).timestamp()
+
+def run_node(address, node, detections):
+    """A recorder node process: forwards its detections and waits until the aggregator has them."""
+    forwarder = DetectionForwarder(address, AUTHKEY, node=node, batch_window=0.01, reconnect_delay=0.05).start()
+    for camera_id, zone_id, student_ids, timestamp in detections:
+        forwarder.forward(camera_id, zone_id, student_ids, timestamp)
+    forwarder.stop(timeout=5.0)
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestRuleAggregator(unittest.TestCase):
+
+    def setUp(self):
+        students = [Student(id="101", name="John Doe", image_path="..."),
+                    Student(id="102", name="Jane Smith", image_path="...")]
+        schedules = [Schedule(student_id="101", period=1, classroom_id="CLASS-A"),
+                     Schedule(student_id="102", period=1, classroom_id="CLASS-B")]
+        zones = [Zone(id="CLASS-A", name="Classroom A", allowed_periods=[]),
+                 Zone(id="CLASS-B", name="Classroom B", allowed_periods=[]),
+                 Zone(id="LIBRARY", name="Library", allowed_periods=[3, 4])]
+        self.notifier = RecordingNotifier()
+        self.writer = RecordingWriter()
+        self.rule_engine = RuleEngine(students, schedules, zones, grace_period_minutes=10,
+                                      notifier=self.notifier, violation_writer=self.writer)
+        self.confirmed = []
+        self.aggregator = RuleAggregator(self.rule_engine, ('127.0.0.1', 0), AUTHKEY,
+                                         on_result=lambda result: self.confirmed.extend(result.confirmed)).start()
+
+    def tearDown(self):
+        self.aggregator.stop()
+
+    def run_nodes(self, *nodes):
+        """Runs each (node, detections) in its own process, one after the other."""
+        context = multiprocessing.get_context('spawn')
+        for node, detections in nodes:
+            process = context.Process(target=run_node, args=(self.aggregator.address, node, detections))
+            process.start()
+            process.join(timeout=30)
+            self.assertEqual(process.exitcode, 0)
+
+    def test_grace_period_carries_over_between_nodes(self):
+        """A student leaving for a zone on another node is confirmed once the grace period is over."""
+        self.run_nodes(("node-a", [("camera_0", "CLASS-B", ["101"], at(8, 5))]),
+                       ("node-b", [("camera_1", "LIBRARY", ["101"], at(8, 16))]))
+
+        self.assertTrue(wait_for(lambda: len(self.confirmed) == 1))
+        violation = self.confirmed[0]
+        self.assertEqual(violation.student_id, "101")
+        self.assertEqual(violation.zone_id, "CLASS-B")
+        self.assertEqual(violation.timestamp, datetime.fromtimestamp(at(8, 5)))
+        self.assertEqual(len(self.notifier.alerts), 1)
+        self.assertEqual(self.writer.saved, [violation])
+
+    def test_return_on_another_node_revokes_and_late_batches_are_ignored(self):
+        """A classroom sighting on one node revokes the grace period; an older sighting arriving later does not reopen it."""
+        self.run_nodes(("node-a", [("camera_0", "LIBRARY", ["102"], at(8, 5))]),
+                       ("node-b", [("camera_1", "CLASS-B", ["102"], at(8, 10))]),
+                       ("node-a", [("camera_0", "LIBRARY", ["102"], at(8, 9))]))
+
+        self.assertTrue(wait_for(lambda: self.aggregator.detections_processed == 3))
+        self.assertNotIn("102", self.rule_engine.active_violations)
+        self.assertEqual(self.rule_engine.last_seen_location["102"],
+                         ("CLASS-B", datetime.fromtimestamp(at(8, 10))))
+        self.assertEqual(self.confirmed, [])
+
+    def test_sightings_of_a_node_with_a_slow_clock_are_not_dropped(self):
+        """A return to the classroom seen by a node whose clock is two minutes behind still revokes the grace period."""
+        now = time.time()
+        node_b = Client(self.aggregator.address, authkey=AUTHKEY)
+        node_b.send_bytes(encode_batch("node-b", 1, [Detection("camera_1", "LIBRARY", at(8, 5), ("102",))], now))
+        node_b.recv_bytes()
+        node_a = Client(self.aggregator.address, authkey=AUTHKEY)
+        node_a.send_bytes(encode_batch("node-a", 1, [Detection("camera_0", "CLASS-B", at(8, 4), ("102",))], now - 120))
+        node_a.recv_bytes()
+        node_a.close()
+        node_b.close()
+
+        self.assertTrue(wait_for(lambda: self.aggregator.detections_processed == 2))
+        self.assertNotIn("102", self.rule_engine.active_violations)
+        self.assertEqual(self.rule_engine.last_seen_location["102"][0], "CLASS-B")
+
+    def test_rejected_peers_do_not_stop_the_aggregator(self):
+        """A wrong key or a non-JSON message is refused, and nodes can still connect afterwards."""
+        with self.assertRaises(AuthenticationError):
+            Client(self.aggregator.address, authkey=b'wrong-key')
+        intruder = Client(self.aggregator.address, authkey=AUTHKEY)
+        intruder.send(("node-x", 1, []))  # A pickle, not an encoded batch
+        with self.assertRaises(EOFError):
+            intruder.recv_bytes()
+        intruder.close()
+
+        node = Client(self.aggregator.address, authkey=AUTHKEY)
+        node.send_bytes(encode_batch("node-a", 7, []))
+        self.assertEqual(decode_ack(node.recv_bytes()), (7, {}))
+        node.close()
+
+    @patch('src.aggregator.AGGREGATOR_AUTHKEY', DEFAULT_AGGREGATOR_AUTHKEY)
+    def test_default_key_is_refused_beyond_loopback(self):
+        with self.assertRaises(SystemExit):
+            main(["--listen", "0.0.0.0:6000"])
+
+class TestDetectionForwarder(unittest.TestCase):
+
+    def test_buffers_until_the_aggregator_is_up(self):
+        """Detections forwarded before the aggregator starts are delivered once it is reachable."""
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            address = probe.getsockname()
+        forwarder = DetectionForwarder(address, AUTHKEY, node="node-a", batch_window=0.01,
+                                       reconnect_delay=0.05, max_reconnect_delay=0.05).start()
+        forwarder.forward("camera_0", "CLASS-B", ["101"], at(8, 5))
+        self.assertTrue(wait_for(lambda: forwarder.buffered_detections == 1))
+        self.assertFalse(forwarder.connected)
+
+        rule_engine = RuleEngine([Student(id="101", name="John Doe", image_path="...")],
+                                 [Schedule(student_id="101", period=1, classroom_id="CLASS-A")],
+                                 [Zone(id="CLASS-B", name="Classroom B", allowed_periods=[])],
+                                 grace_period_minutes=10)
+        aggregator = RuleAggregator(rule_engine, address, AUTHKEY).start()
+        try:
+            self.assertTrue(wait_for(lambda: aggregator.detections_processed == 1))
+            self.assertEqual(forwarder.buffered_detections, 0)
+            self.assertEqual(forwarder.detections_sent, 1)
+            self.assertIn("101", rule_engine.active_violations)
+
+            # Acknowledgements report the open grace periods per zone back to the node.
+            forwarder.forward("camera_0", "CLASS-B", ["101"], at(8, 6))
+            self.assertTrue(wait_for(lambda: forwarder.active_violation_counts == {"CLASS-B": 1}))
+        finally:
+            forwarder.stop()
+            aggregator.stop()
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("127.0.0.1:6000"), ("127.0.0.1", 6000))
+        with self.assertRaises(ValueError):
+            parse_address("localhost")
+
+if __name__ == '__main__':
+    unittest.main()
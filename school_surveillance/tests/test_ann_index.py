@@ -0,0 +1,40 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.ann_index import IVFIndex
+from src.gallery import FaceGallery
+
+class TestIVFIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.centers = rng.normal(size=(200, 32)).astype(np.float32)
+        self.embeddings = self.centers + 0.1 * rng.normal(size=self.centers.shape).astype(np.float32)
+        self.queries = self.centers[:50] + 0.1 * rng.normal(size=(50, 32)).astype(np.float32)
+
+    def test_probing_every_list_is_exact(self):
+        """Test that searching all lists returns the brute-force top-k."""
+        index = IVFIndex(self.embeddings, nlist=10, nprobe=10)
+        rows, distances = index.search(self.queries, k=3)
+
+        exact = ((self.queries[:, None, :] - self.embeddings[None, :, :]) ** 2).sum(-1)
+        np.testing.assert_array_equal(rows, np.argsort(exact, axis=1)[:, :3])
+        np.testing.assert_allclose(distances, np.sort(exact, axis=1)[:, :3], rtol=1e-3, atol=1e-3)
+
+    def test_gallery_match_with_ann_reranks_exactly(self):
+        """Test that ANN matching agrees with the exhaustive scan and reports exact distances."""
+        gallery = FaceGallery([f"{i}.jpg" for i in range(200)], self.embeddings)
+        expected = gallery.match(self.queries, distance_threshold=0.4)
+
+        gallery.build_ann_index(nlist=14, nprobe=4, candidates=5)
+        matches = gallery.match(self.queries, distance_threshold=0.4)
+
+        self.assertEqual([m[0] for m in matches], [e[0] for e in expected])
+        np.testing.assert_allclose([m[1] for m in matches], [e[1] for e in expected], rtol=1e-4, atol=1e-5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import time
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.capture import CameraStream
+
+class FlakyCapture:
+    """A capture that yields a fixed number of frames and then fails."""
+
+    def __init__(self, frames: int):
+        self.remaining = frames
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.remaining <= 0:
+            return False, None
+        self.remaining -= 1
+        time.sleep(0.001)
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        pass
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestCameraStream(unittest.TestCase):
+
+    def test_keeps_only_latest_frame_and_counts_drops(self):
+        """Test that unread frames are overwritten and counted as dropped."""
+        stream = CameraStream(0, capture_factory=lambda source, api: FlakyCapture(20), reconnect_delay=10.0).start()
+        try:
+            self.assertTrue(wait_for(lambda: stream.reconnects >= 1))
+            self.assertEqual(stream.frames_read, 20)
+            self.assertEqual(stream.frames_dropped, 19)
+            self.assertIsNotNone(stream.read())
+            self.assertIsNone(stream.read())
+        finally:
+            stream.stop()
+
+    def test_reconnects_after_stream_failure(self):
+        """Test that a failing stream is reopened instead of being closed for good."""
+        opened = []
+
+        def factory(source, api):
+            opened.append(source)
+            return FlakyCapture(2)
+
+        stream = CameraStream(3, capture_factory=factory, reconnect_delay=0.01).start()
+        try:
+            self.assertTrue(wait_for(lambda: stream.reconnects >= 3))
+            self.assertGreaterEqual(len(opened), 3)
+            self.assertEqual(set(opened), {3})
+        finally:
+            stream.stop()
+
+if __name__ == '__main__':
+    unittest.main()
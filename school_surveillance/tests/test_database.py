@@ -0,0 +1,149 @@
+import unittest
+from unittest.mock import patch
+from datetime import date, datetime, timedelta
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import database
+from src.data_models import Student, Schedule, Violation
+
+class DatabaseTestCase(unittest.TestCase):
+    """Points the database module at a fresh temporary file for each test."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch('src.database.DATABASE_NAME', os.path.join(self.tmp.name, 'test.db'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        database.init_db()
+
+    def tearDown(self):
+        database.close_connection()
+        self.tmp.cleanup()
+
+class TestDatabase(DatabaseTestCase):
+
+    def test_connection_is_reused_and_in_wal_mode(self):
+        """Test that calls share one long-lived WAL connection per thread."""
+        conn = database.get_connection()
+        self.assertIs(database.get_connection(), conn)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_bulk_save_and_load(self):
+        """Test that students and schedules round-trip through bulk inserts."""
+        students = [Student(id=str(i), name=f"Student {i}", image_path=f"{i}.jpg") for i in range(100)]
+        database.save_students(students)
+        database.save_schedules([Schedule(student_id="1", period=1, classroom_id="room_101")])
+
+        self.assertEqual(len(database.load_students()), 100)
+        self.assertEqual(database.load_schedules(), [Schedule(student_id="1", period=1, classroom_id="room_101")])
+
+    def test_violation_writer_flushes_in_batches(self):
+        """Test that queued violations are written by the background writer."""
+        batches = []
+        writer = database.ViolationWriter(flush_interval=0.05, on_write=lambda rows, seconds: batches.append(rows)).start()
+        start = datetime(2024, 1, 8, 9, 0)
+        for i in range(25):
+            writer.save(Violation(student_id=str(i), zone_id="library", timestamp=start + timedelta(seconds=i),
+                                  grace_period_expired=True, alert_sent=True))
+        writer.flush()
+        writer.stop()
+
+        violations = database.load_violations()
+        self.assertEqual(len(violations), 25)
+        self.assertEqual(writer.rows_written, 25)
+        self.assertEqual(sum(batches), 25)
+        self.assertTrue(all(v.alert_sent for v in violations))
+
+    def test_violation_writer_retries_failed_batches(self):
+        """Test that rows of a batch the database rejects stay queued, in order, until they commit."""
+        write = database._write
+        attempts = []
+
+        def flaky_write(operations):
+            attempts.append(len(operations))
+            if len(attempts) <= 2:
+                raise sqlite3.OperationalError("database is locked")
+            write(operations)
+
+        writer = database.ViolationWriter(flush_interval=0.05, retry_delay=0.01)
+        opened = Violation(student_id="101", zone_id="library", timestamp=datetime(2024, 1, 8, 9, 0))
+        writer.save_active(opened)
+        writer.save(Violation(student_id="101", zone_id="library", timestamp=opened.timestamp,
+                              grace_period_expired=True, alert_sent=True))
+        writer.clear_active("101")
+        with patch('src.database._write', flaky_write):
+            writer.start()
+            writer.flush()
+            writer.stop()
+
+        self.assertEqual(attempts, [3, 3, 3])
+        self.assertEqual(writer.rows_written, 3)
+        self.assertEqual(writer.queue_depth, 0)
+        self.assertEqual(database.load_active_violations(), {})
+        self.assertEqual(database.student_violation_total("101"), 1)
+
+    def test_stop_gives_up_after_its_timeout(self):
+        """Test that stop() does not wait out the whole backoff when the database stays unavailable."""
+        def failing_write(operations):
+            raise sqlite3.OperationalError("unable to open database file")
+
+        writer = database.ViolationWriter(flush_interval=0.05, retry_delay=0.05, max_retry_delay=30.0)
+        with patch('src.database._write', failing_write):
+            writer.start()
+            writer.save(Violation(student_id="101", zone_id="library", timestamp=datetime(2024, 1, 8, 9, 0)))
+            time.sleep(0.5)  # Let the backoff grow past the timeout
+            started = time.monotonic()
+            writer.stop(timeout=0.3)
+        self.assertLess(time.monotonic() - started, 2.0)
+        self.assertEqual(writer.queue_depth, 0)
+        self.assertEqual(writer.rows_written, 0)
+
+    def test_totals_are_updated_once_per_confirmed_violation(self):
+        """Test that saving a confirmed violation updates the per-student, per-day and per-zone totals once."""
+        confirmed = Violation(student_id="101", zone_id="library", timestamp=datetime(2024, 1, 8, 9, 0),
+                              grace_period_expired=True, alert_sent=True)
+        database.save_violations([
+            confirmed,
+            Violation(student_id="101", zone_id="main_gate", timestamp=datetime(2024, 1, 9, 8, 0),
+                      grace_period_expired=True, alert_sent=True),
+            Violation(student_id="102", zone_id="library", timestamp=datetime(2024, 1, 9, 8, 30)),
+        ])
+        database.save_violation(confirmed)  # Saving again must not count it twice
+
+        self.assertEqual(database.student_violation_total("101"), 2)
+        self.assertEqual(database.student_violation_total("102"), 0)
+        self.assertEqual(database.load_bunking_scores(), {"101": 2})
+        self.assertEqual(database.violation_totals_by_zone(), {"library": 1, "main_gate": 1})
+        self.assertEqual(database.violation_totals_by_day(since=date(2024, 1, 9)), {date(2024, 1, 9): 1})
+
+    def test_totals_are_backfilled_for_existing_violations(self):
+        """Test that init_db rebuilds the totals of a database that has violations but no totals yet."""
+        database.save_violation(Violation(student_id="101", zone_id="library", timestamp=datetime(2024, 1, 8, 9, 0),
+                                          grace_period_expired=True, alert_sent=True))
+        database.get_connection().execute("DELETE FROM violation_totals_by_student")
+        database.get_connection().commit()
+
+        database.init_db()
+
+        self.assertEqual(database.student_violation_total("101"), 1)
+
+    def test_writer_checkpoints_open_grace_periods(self):
+        """Test that save_active/clear_active are applied in order by the background writer."""
+        writer = database.ViolationWriter(flush_interval=0.05).start()
+        opened = Violation(student_id="101", zone_id="library", timestamp=datetime(2024, 1, 8, 9, 0))
+        writer.save_active(opened)
+        writer.save_active(Violation(student_id="102", zone_id="library", timestamp=datetime(2024, 1, 8, 9, 1)))
+        writer.clear_active("102")
+        writer.flush()
+        writer.stop()
+
+        self.assertEqual(database.load_active_violations(), {"101": opened})
+        self.assertEqual(database.load_violations(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import numpy as np
+
+from src.enrollment import GalleryStore, default_store_path, enroll
+from src.gallery import FaceGallery
+
+class ColorEmbedder:
+    """Stand-in embedding stage: a crop's embedding is its mean colour."""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed(self, crops):
+        self.embedded += len(crops)
+        return np.array([np.asarray(crop, dtype=np.float32).reshape(-1, 3).mean(axis=0) for crop in crops])
+
+class NoFaceDetector:
+    def detect(self, frame):
+        return []
+
+class StubRecognizer:
+    model_name = "stub"
+
+    def __init__(self):
+        self.detector = NoFaceDetector()
+        self.embedder = ColorEmbedder()
+
+class TestEnrollment(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.images = self.tmp.name
+        self.recognizer = StubRecognizer()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_image(self, student_id, color):
+        cv2.imwrite(os.path.join(self.images, f"{student_id}.png"), np.full((16, 16, 3), color, dtype=np.uint8))
+
+    def test_only_new_or_changed_images_are_embedded(self):
+        """Test that re-running enrollment embeds only new or changed images and drops deleted ones."""
+        self.write_image("101", (255, 0, 0))
+        self.write_image("102", (0, 255, 0))
+        report = enroll(self.images, self.recognizer)
+        self.assertEqual(report.added, ["101.png", "102.png"])
+        self.assertEqual(self.recognizer.embedder.embedded, 2)
+
+        report = enroll(self.images, self.recognizer)
+        self.assertEqual(report.unchanged, ["101.png", "102.png"])
+        self.assertEqual(self.recognizer.embedder.embedded, 2)
+
+        self.write_image("102", (0, 0, 255))
+        self.write_image("103", (255, 255, 255))
+        os.remove(os.path.join(self.images, "101.png"))
+        report = enroll(self.images, self.recognizer)
+        self.assertEqual((report.added, report.updated, report.removed), (["103.png"], ["102.png"], ["101.png"]))
+        self.assertEqual(self.recognizer.embedder.embedded, 4)
+
+    def test_store_is_versioned_and_memory_mapped(self):
+        """Test the on-disk format and loading it back as a gallery."""
+        self.write_image("101", (255, 0, 0))
+        self.write_image("102", (0, 255, 0))
+        enroll(self.images, self.recognizer)
+
+        store = GalleryStore(default_store_path(self.images))
+        index, embeddings = store.load()
+        self.assertEqual(index["version"], 1)
+        self.assertIsInstance(embeddings, np.memmap)
+        self.assertEqual(embeddings.shape, (2, 3))
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-6)
+        np.testing.assert_allclose(store.load_raw()[1], [[0, 0, 1], [0, 1, 0]], atol=1e-6)  # BGR means
+
+        self.write_image("103", (255, 255, 255))
+        enroll(self.images, self.recognizer)
+        index = store.load_index()
+        self.assertEqual(index["version"], 2)
+        self.assertEqual(sorted(n for n in os.listdir(store.path) if n.endswith(".npy")), ["embeddings-2.npy"])
+
+        gallery = FaceGallery.from_db_path(self.images, model_name="stub")
+        queries = np.array([[0, 0, 1], [1, 1, 1]], dtype=np.float32)  # BGR mean of 101.png, 103.png
+        self.assertEqual([student_id for student_id, _ in gallery.match(queries, 0.01)], ["101", "103"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import time
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import socketio
+
+from src.events import EventPublisher
+
+class FakeViewerClient:
+    """Stand-in Socket.IO client whose viewer can be taken down and brought back."""
+
+    def __init__(self):
+        self.available = False
+        self.connected = False
+        self.batches = []
+
+    def connect(self, url):
+        if not self.available:
+            raise socketio.exceptions.ConnectionError("connection refused")
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def call(self, event, data, timeout=60):
+        if not self.available:
+            self.connected = False
+            raise socketio.exceptions.BadNamespaceError("/ is not a connected namespace.")
+        self.batches.append(data)
+        return data["sequence"]
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestEventPublisher(unittest.TestCase):
+
+    def setUp(self):
+        self.publisher = EventPublisher(batch_window=0.05, reconnect_delay=0.01, max_reconnect_delay=0.01,
+                                        client_factory=FakeViewerClient)
+        self.viewer = self.publisher.sio
+
+    def tearDown(self):
+        self.publisher.stop(timeout=0.1)
+
+    def test_connects_without_pending_events(self):
+        """Test that the viewer connection comes up before any event is published."""
+        self.viewer.available = True
+        self.publisher.start()
+        self.assertTrue(wait_for(lambda: self.publisher.connected, timeout=1.0))
+
+    def test_burst_is_coalesced_into_one_batch(self):
+        """Test that events within a batch window go out together, newest per key."""
+        self.viewer.available = True
+        self.publisher.start()
+        for i in range(50):
+            self.publisher.publish('violation', {'student_id': str(i % 10), 'n': i}, key=str(i % 10))
+
+        self.assertTrue(wait_for(lambda: self.publisher.events_sent == 10))
+        self.assertEqual(len(self.viewer.batches), 1)
+        self.assertEqual(sorted(e['data']['n'] for e in self.viewer.batches[0]['events']), list(range(40, 50)))
+
+    def test_publish_never_blocks_and_replays_after_outage(self):
+        """Test that events published while the viewer is down are delivered in order once it is back."""
+        self.publisher.start()
+        started = time.monotonic()
+        for i in range(3):
+            self.publisher.publish('violation', {'n': i})
+            time.sleep(0.08)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertTrue(wait_for(lambda: len(self.publisher._pending) >= 2))
+        self.assertEqual(self.viewer.batches, [])
+
+        self.viewer.available = True
+        self.assertTrue(wait_for(lambda: self.publisher.buffered_events == 0))
+        self.assertEqual([e['data']['n'] for b in self.viewer.batches for e in b['events']], [0, 1, 2])
+        sequences = [b['sequence'] for b in self.viewer.batches]
+        self.assertEqual(sequences, sorted(sequences))
+
+    def test_buffer_limit_drops_oldest_batches(self):
+        """Test that a long outage keeps only the newest events."""
+        publisher = EventPublisher(batch_window=0.01, buffer_limit=5, client_factory=FakeViewerClient)
+        for i in range(12):
+            publisher.publish('violation', {'n': i})
+            publisher._collect(block=False)
+        self.assertEqual(publisher.buffered_events, 5)
+        self.assertEqual(publisher.events_dropped, 7)
+
+if __name__ == '__main__':
+    unittest.main()
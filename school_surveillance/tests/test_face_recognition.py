@@ -0,0 +1,100 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.enrollment import GalleryStore, default_store_path
+from src.face_recognition import FaceDetection, FaceRecognizer
+from src.gallery import FaceGallery
+from src.tracker import FaceTracker
+
+class OneFaceDetector:
+    """Stand-in detection stage: one face per frame, whose crop is the whole frame."""
+
+    def detect(self, frame):
+        return [FaceDetection((0, 4, 4, 0), frame, 1.0)]
+
+class ColorEmbedder:
+    """Stand-in embedding stage: a crop's embedding is its first pixel."""
+
+    input_size = (4, 4)
+
+    def __init__(self):
+        self.embedded = 0
+
+    def embed(self, crops):
+        self.embedded += len(crops)
+        return np.array([np.asarray(crop, dtype=np.float32)[0, 0] for crop in crops])
+
+class TestFaceRecognizer(unittest.TestCase):
+
+    def setUp(self):
+        self.recognizer = FaceRecognizer(model_name="stub")
+        self.recognizer.detector = OneFaceDetector()
+        self.recognizer.embedder = ColorEmbedder()
+        self.recognizer.load_gallery = lambda db_path: FaceGallery(["101.jpg", "102.jpg"], np.eye(2, 3))
+
+    def frame(self, color):
+        return np.full((4, 4, 3), color, dtype=np.float32)
+
+    def test_faces_of_all_frames_are_embedded_in_one_batch(self):
+        """Test that every camera's faces are recognized from a single embedding call."""
+        recognized = self.recognizer.recognize_batch({0: self.frame((1, 0, 0)), 1: self.frame((0, 1, 0))}, "db")
+
+        self.assertEqual({key: [name for name, _ in faces] for key, faces in recognized.items()},
+                         {0: ["101"], 1: ["102"]})
+        self.assertEqual(set(self.recognizer.last_timings), {"detection", "embedding", "matching"})
+
+    def test_tracked_faces_skip_the_embedding_stage(self):
+        """Test that a confidently identified track is not embedded again on the next frame."""
+        trackers = {0: FaceTracker()}
+        for _ in range(3):
+            recognized = self.recognizer.recognize_batch({0: self.frame((1, 0, 0))}, "db", trackers)
+        self.assertEqual([name for name, _ in recognized[0]], ["101"])
+        self.assertEqual(self.recognizer.embedder.embedded, 1)
+        self.assertEqual(set(self.recognizer.last_timings), {"detection"})
+
+    def test_errors_are_counted_not_raised(self):
+        """Test that a failing stage yields no faces and is recorded instead of raised."""
+        self.recognizer.detector.detect = lambda frame: 1 / 0
+
+        recognized = self.recognizer.recognize_batch({0: self.frame((1, 0, 0))}, "db")
+
+        self.assertEqual(recognized, {0: []})
+        self.assertEqual(self.recognizer.errors, 1)
+        self.assertIn("ZeroDivisionError", self.recognizer.last_error)
+
+    def test_background_warm_up(self):
+        """Test that warm-up runs off the calling thread and reports readiness."""
+        self.recognizer.start_warm_up("db").join(timeout=5.0)
+        self.assertTrue(self.recognizer.ready)
+        self.assertEqual(self.recognizer.embedder.embedded, 1)
+
+class TestGalleryReload(unittest.TestCase):
+
+    def test_changed_store_is_built_in_the_background_and_swapped_in(self):
+        """Test that a re-enrolled gallery is built off the recognition path while the old one keeps serving."""
+        with tempfile.TemporaryDirectory() as images:
+            store = GalleryStore(default_store_path(images))
+            store.save("stub", [{"image": "101.jpg", "sha256": ""}], np.array([[3.0, 0.0, 0.0]]))
+            recognizer = FaceRecognizer(model_name="stub", gallery_refresh_interval=0.0)
+            first = recognizer.load_gallery(images)
+            self.assertIsInstance(first.embeddings, np.memmap)  # Matched straight from the store
+            self.assertEqual(first.match(np.array([[1.0, 0.0, 0.0]]), 0.01)[0][0], "101")
+
+            store.save("stub", [{"image": "101.jpg", "sha256": ""}, {"image": "102.jpg", "sha256": ""}],
+                       np.array([[3.0, 0.0, 0.0], [0.0, 2.0, 0.0]]))
+            os.utime(store.index_path, ns=(1, 1))
+            self.assertIs(recognizer.load_gallery(images), first)
+
+            deadline = time.time() + 5
+            while len(recognizer.load_gallery(images)) != 2 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(recognizer.load_gallery(images).student_ids, ["101", "102"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import pickle
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.gallery import FaceGallery, student_id_from_identity
+
+class TestFaceGallery(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a small gallery of orthogonal embeddings."""
+        self.identities = [
+            "school_surveillance/data/student_images/101.jpg",
+            "school_surveillance/data/student_images\\102.jpg",
+            "school_surveillance/data/student_images/103.png",
+        ]
+        self.embeddings = np.eye(3, 8, dtype=np.float32)
+        self.gallery = FaceGallery(self.identities, self.embeddings)
+
+    def test_student_id_from_identity_handles_both_separators(self):
+        """Test that Windows and POSIX gallery paths map to the same student ID."""
+        self.assertEqual(student_id_from_identity("a/b\\102.jpg"), "102")
+        self.assertEqual(student_id_from_identity("a/b/101.jpg"), "101")
+
+    def test_match_batch_of_faces(self):
+        """Test that all faces of a frame are matched in one call."""
+        queries = np.array([self.embeddings[1] * 3.0, self.embeddings[0] + 0.01, np.ones(8)], dtype=np.float32)
+
+        matches = self.gallery.match(queries, distance_threshold=0.4)
+
+        self.assertEqual([student_id for student_id, _ in matches], ["102", "101", "Unknown"])
+        self.assertAlmostEqual(matches[0][1], 0.0, places=5)
+
+    def test_euclidean_distances_match_brute_force(self):
+        """Test that the batched euclidean distances agree with a per-pair computation."""
+        rng = np.random.default_rng(0)
+        embeddings = rng.normal(size=(5, 16)).astype(np.float32)
+        queries = rng.normal(size=(4, 16)).astype(np.float32)
+        gallery = FaceGallery([f"{i}.jpg" for i in range(5)], embeddings, distance_metric="euclidean")
+
+        expected = np.linalg.norm(queries[:, None, :] - embeddings[None, :, :], axis=-1)
+        np.testing.assert_allclose(gallery.distances(queries), expected, rtol=1e-4, atol=1e-4)
+
+    def test_candidates_are_matched_first_with_fallback(self):
+        """Test that expected students are matched first and other faces fall back to the full gallery."""
+        queries = np.array([self.embeddings[0], self.embeddings[2], np.ones(8)], dtype=np.float32)
+
+        matches = self.gallery.match(queries, distance_threshold=0.4, candidates=frozenset({"101", "999"}))
+
+        self.assertEqual([student_id for student_id, _ in matches], ["101", "103", "Unknown"])
+        self.assertEqual(len(self.gallery._candidate_cache), 1)
+
+    def test_empty_gallery_returns_unknown(self):
+        """Test that matching against an empty gallery never raises."""
+        gallery = FaceGallery([], np.empty((0, 8), dtype=np.float32))
+        matches = gallery.match(np.ones((2, 8), dtype=np.float32), distance_threshold=0.4)
+        self.assertEqual([student_id for student_id, _ in matches], ["Unknown", "Unknown"])
+
+    def test_from_representations(self):
+        """Test loading a DeepFace representations pickle."""
+        representations = [{"identity": identity, "embedding": list(embedding)}
+                           for identity, embedding in zip(self.identities, self.embeddings)]
+        with tempfile.TemporaryDirectory() as tmp:
+            pkl_path = os.path.join(tmp, "ds_model_vggface_test.pkl")
+            with open(pkl_path, "wb") as f:
+                pickle.dump(representations, f)
+            gallery = FaceGallery.from_representations(pkl_path)
+
+        self.assertEqual(gallery.student_ids, ["101", "102", "103"])
+        self.assertTrue(gallery.embeddings.flags["C_CONTIGUOUS"])
+
+if __name__ == '__main__':
+    unittest.main()
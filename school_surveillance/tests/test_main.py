@@ -0,0 +1,65 @@
+import argparse
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.main import camera_source, parse_shard, record_metrics, select_cameras
+from src.metrics import EVENTS_DROPPED
+
+CAMERA_CONFIG = {
+    "camera_0": {"zone_id": "main_gate", "node": "gate-pc"},
+    "camera_1": {"zone_id": "library", "node": "library-pc"},
+    "camera_7": {"zone_id": "hallway", "node": "library-pc"},
+    "hallway_ip": {"zone_id": "hallway", "source": "rtsp://10.0.0.5/stream"},
+}
+
+class TestCameraSelection(unittest.TestCase):
+
+    def test_without_node_or_shard_all_cameras_run(self):
+        self.assertEqual(select_cameras(CAMERA_CONFIG), CAMERA_CONFIG)
+
+    def test_node_selects_its_cameras(self):
+        self.assertEqual(list(select_cameras(CAMERA_CONFIG, node="library-pc")), ["camera_1", "camera_7"])
+
+    def test_shards_partition_the_cameras(self):
+        shards = [select_cameras(CAMERA_CONFIG, shard=(k, 3)) for k in (1, 2, 3)]
+        selected = [camera_id for shard in shards for camera_id in shard]
+        self.assertCountEqual(selected, CAMERA_CONFIG)
+
+    def test_adding_a_camera_does_not_move_the_others(self):
+        grown = dict(CAMERA_CONFIG, camera_9={"zone_id": "canteen"})
+        for k in (1, 2, 3):
+            before = select_cameras(CAMERA_CONFIG, shard=(k, 3))
+            after = select_cameras(grown, shard=(k, 3))
+            self.assertEqual(set(after) - {"camera_9"}, set(before))
+
+    def test_camera_source(self):
+        self.assertEqual(camera_source("camera_7", CAMERA_CONFIG["camera_7"]), 7)
+        self.assertEqual(camera_source("hallway_ip", CAMERA_CONFIG["hallway_ip"]), "rtsp://10.0.0.5/stream")
+        with self.assertRaises(ValueError):
+            camera_source("hallway", {"zone_id": "hallway"})
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/3"), (2, 3))
+        for invalid in ("0/3", "4/3", "2"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(invalid)
+
+class StubPublisher:
+    buffered_events = 0
+    events_dropped = 0
+
+class TestRecordMetrics(unittest.TestCase):
+
+    def test_dropped_events_are_counted_by_their_increase(self):
+        events = StubPublisher()
+        previous = {'processed': {}, 'dropped': {}, 'shed': {}, 'events': {}}
+        start = EVENTS_DROPPED.value()
+        for dropped in (3, 3, 5):
+            events.events_dropped = dropped
+            record_metrics({}, None, None, None, events, previous, elapsed=1.0)
+        self.assertEqual(EVENTS_DROPPED.value() - start, 5)
+
+if __name__ == '__main__':
+    unittest.main()
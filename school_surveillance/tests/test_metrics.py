@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.metrics import MetricsRegistry
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge_exposition(self):
+        """Test the Prometheus text format of labelled counters and gauges."""
+        frames = self.registry.counter("frames_total", "Frames processed.", ["camera"])
+        depth = self.registry.gauge("queue_depth", "Queued alerts.")
+        frames.inc(camera="0")
+        frames.inc(2, camera="0")
+        frames.inc(camera='gate "A"')
+        depth.set(4)
+
+        text = self.registry.render()
+
+        self.assertIn("# TYPE frames_total counter", text)
+        self.assertIn('frames_total{camera="0"} 3.0', text)
+        self.assertIn('frames_total{camera="gate \\"A\\""} 1.0', text)
+        self.assertIn("# TYPE queue_depth gauge\nqueue_depth 4.0", text)
+        self.assertEqual(frames.value(camera="0"), 3.0)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that histogram buckets count every observation at or below their bound."""
+        latency = self.registry.histogram("latency_seconds", "Latency.", ["stage"], buckets=(0.01, 0.1))
+        for value in (0.005, 0.05, 0.05, 3.0):
+            latency.observe(value, stage="detection")
+
+        lines = self.registry.render().splitlines()
+
+        self.assertIn('latency_seconds_bucket{stage="detection",le="0.01"} 1.0', lines)
+        self.assertIn('latency_seconds_bucket{stage="detection",le="0.1"} 3.0', lines)
+        self.assertIn('latency_seconds_bucket{stage="detection",le="+Inf"} 4.0', lines)
+        self.assertIn('latency_seconds_count{stage="detection"} 4.0', lines)
+        self.assertIn('latency_seconds_sum{stage="detection"} 3.105', lines)
+
+    def test_const_labels_are_added_to_every_sample(self):
+        """Test that render() labels every sample with the given node."""
+        self.registry.counter("frames_total", "Frames processed.", ["camera"]).inc(camera="camera_0")
+        self.registry.histogram("latency_seconds", "Latency.", buckets=(0.1,)).observe(0.05)
+
+        lines = self.registry.render({"node": "gate-pc"}).splitlines()
+
+        self.assertIn('frames_total{node="gate-pc",camera="camera_0"} 1.0', lines)
+        self.assertIn('latency_seconds_bucket{node="gate-pc",le="0.1"} 1.0', lines)
+        self.assertIn('latency_seconds_count{node="gate-pc"} 1.0', lines)
+
+    def test_registration_is_idempotent_and_labels_are_checked(self):
+        """Test that re-registering returns the same metric and wrong labels are rejected."""
+        counter = self.registry.counter("errors_total", "Errors.")
+        self.assertIs(self.registry.counter("errors_total", "Errors."), counter)
+        with self.assertRaises(ValueError):
+            self.registry.gauge("errors_total", "Errors.")
+        with self.assertRaises(ValueError):
+            counter.inc(camera="0")
+
+if __name__ == '__main__':
+    unittest.main()
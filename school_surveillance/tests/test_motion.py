@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.motion import MotionGate
+
+class TestMotionGate(unittest.TestCase):
+
+    def setUp(self):
+        self.empty = np.full((240, 320, 3), 40, dtype=np.uint8)
+        self.person = self.empty.copy()
+        self.person[60:180, 120:200] = 220
+
+    def test_static_scene_is_filtered(self):
+        """Test that an unchanging scene stops reaching face detection after the first frame."""
+        gate = MotionGate(keepalive_interval=100.0)
+        self.assertTrue(gate.should_process(self.empty, now=0.0))
+        self.assertFalse(gate.should_process(self.empty, now=1.0))
+        self.assertFalse(gate.should_process(self.empty, now=2.0))
+
+    def test_motion_passes(self):
+        """Test that a frame with a new object in view passes the gate."""
+        gate = MotionGate()
+        gate.should_process(self.empty, now=0.0)
+        self.assertTrue(gate.should_process(self.person, now=1.0))
+
+    def test_target_fps_limits_processing(self):
+        """Test that frames arriving faster than the target FPS are skipped."""
+        gate = MotionGate(target_fps=2)
+        self.assertTrue(gate.should_process(self.empty, now=0.0))
+        self.assertFalse(gate.should_process(self.person, now=0.2))
+        self.assertTrue(gate.should_process(self.person, now=0.6))
+
+    def test_keepalive_while_faces_in_view(self):
+        """Test that a still face is re-checked periodically even without motion."""
+        gate = MotionGate(keepalive_interval=2.0)
+        gate.should_process(self.person, now=0.0)
+        gate.report_faces(1)
+        self.assertFalse(gate.should_process(self.person, now=1.0))
+        self.assertTrue(gate.should_process(self.person, now=2.5))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.notifications import NotificationDispatcher
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # pragma: no cover - optional test dependency
+    Controller = None
+
+class CollectingHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, envelope.content.decode("utf8", errors="replace")))
+        return "250 OK"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+@unittest.skipIf(Controller is None, "aiosmtpd is not installed")
+class TestNotificationDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = CollectingHandler()
+        self.port = free_port()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=self.port)
+        self.controller.start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool_path = os.path.join(self.tmp.name, "spool.jsonl")
+        self.timestamp = datetime(2024, 1, 8, 9, 30)
+
+    def tearDown(self):
+        self.controller.stop()
+        self.tmp.cleanup()
+
+    def make_dispatcher(self, port, **kwargs):
+        options = dict(host="127.0.0.1", port=port, username=None, password=None, sender="alerts@example.com",
+                       recipient="office@example.com", use_tls=False, spool_path=self.spool_path, timeout=2.0)
+        options.update(kwargs)
+        return NotificationDispatcher(**options)
+
+    def test_alerts_within_window_are_sent_as_one_digest(self):
+        """Test that a burst of alerts becomes one email per recipient."""
+        dispatcher = self.make_dispatcher(self.port, digest_window=0.3).start()
+        try:
+            start = time.monotonic()
+            for student_id in ("101", "102", "103"):
+                dispatcher.notify(student_id, "library", self.timestamp, 1)
+            self.assertLess(time.monotonic() - start, 0.1)
+
+            self.assertTrue(wait_for(lambda: len(self.handler.messages) == 1))
+        finally:
+            dispatcher.stop()
+
+        recipients, content = self.handler.messages[0]
+        self.assertEqual(recipients, ["office@example.com"])
+        self.assertIn("3 Student Violations", content)
+        for student_id in ("101", "102", "103"):
+            self.assertIn(f"Student ID: {student_id}", content)
+
+    def test_connection_is_reused(self):
+        """Test that consecutive digests go over the same SMTP connection."""
+        dispatcher = self.make_dispatcher(self.port, digest_window=0.0).start()
+        try:
+            dispatcher.notify("101", "library", self.timestamp, 1)
+            self.assertTrue(wait_for(lambda: len(self.handler.messages) == 1))
+            connection = dispatcher._smtp
+            dispatcher.notify("102", "library", self.timestamp, 1)
+            self.assertTrue(wait_for(lambda: len(self.handler.messages) == 2))
+            self.assertIs(dispatcher._smtp, connection)
+        finally:
+            dispatcher.stop()
+
+    def test_undeliverable_alerts_are_spooled_and_resent(self):
+        """Test retry with backoff, spooling to disk and delivery on the next start."""
+        unreachable = self.make_dispatcher(free_port(), digest_window=0.0, max_retries=2, retry_backoff=0.01).start()
+        try:
+            unreachable.notify("101", "library", self.timestamp, 2)
+            self.assertTrue(wait_for(lambda: os.path.exists(self.spool_path)))
+        finally:
+            unreachable.stop()
+        self.assertEqual(unreachable.failed_attempts, 3)
+        with open(self.spool_path) as f:
+            self.assertEqual(json.loads(f.readline())["student_id"], "101")
+
+        dispatcher = self.make_dispatcher(self.port, digest_window=0.0).start()
+        try:
+            self.assertTrue(wait_for(lambda: len(self.handler.messages) == 1))
+        finally:
+            dispatcher.stop()
+        self.assertIn("Student ID: 101", self.handler.messages[0][1])
+        self.assertFalse(os.path.exists(self.spool_path))
+
+    def test_alert_in_flight_is_spooled_by_stop(self):
+        """Test that stop() waits for the delivery attempt in progress and spools its alert."""
+        with socket.socket() as silent:  # Accepts connections but never greets
+            silent.bind(("127.0.0.1", 0))
+            silent.listen(1)
+            dispatcher = self.make_dispatcher(silent.getsockname()[1], digest_window=0.0, max_retries=0,
+                                              timeout=0.5).start()
+            dispatcher.notify("101", "library", self.timestamp, 1)
+            self.assertTrue(wait_for(lambda: dispatcher.queue_depth == 0))
+            dispatcher.stop()
+
+        with open(self.spool_path) as f:
+            self.assertEqual([json.loads(line)["student_id"] for line in f], ["101"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.render import annotate_frame
+
+class TestAnnotateFrame(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        self.faces = [("101", (100, 400, 400, 100)), ("Unknown", (200, 1000, 600, 700))]
+
+    def test_draws_on_downscaled_copy(self):
+        """Test that annotations go onto a downscaled copy and the source frame is untouched."""
+        annotated = annotate_frame(self.frame, self.faces, max_width=640)
+
+        self.assertEqual(annotated.shape, (360, 640, 3))
+        self.assertFalse(self.frame.any())
+        # Box outline of the first face, scaled by one half.
+        self.assertTrue(annotated[50, 100:200, 2].all())
+        # Filled label bar at the bottom of the second face.
+        self.assertTrue(annotated[295, 360:490, 2].any())
+
+    def test_no_faces_and_no_downscale(self):
+        """Test that a frame without faces is copied unchanged."""
+        annotated = annotate_frame(self.frame, [], max_width=None)
+        self.assertEqual(annotated.shape, self.frame.shape)
+        self.assertIsNot(annotated, self.frame)
+
+if __name__ == '__main__':
+    unittest.main()
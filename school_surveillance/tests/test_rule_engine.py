@@ -1,7 +1,7 @@
 
 import unittest
-from unittest.mock import patch
-from datetime import datetime
+from unittest.mock import Mock, patch
+from datetime import datetime, time
 
 # Adjust the import path to match the project structure
 # We are in tests, so we need to go up one level to school_surveillance and then into src
@@ -9,7 +9,7 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.data_models import Student, Schedule, Zone
+from src.data_models import Student, Schedule, Zone, Period, Violation
 from src.rule_engine import RuleEngine
 
 class TestRuleEngine(unittest.TestCase):
@@ -88,5 +88,135 @@ class TestRuleEngine(unittest.TestCase):
         is_allowed = self.rule_engine.is_student_allowed_in_zone(student_id, zone_id)
         self.assertTrue(is_allowed, "All students should be allowed in any zone outside of school hours.")
 
+    def test_get_current_period_uses_timetable(self):
+        """Test period lookup against the default and a configured timetable."""
+        self.assertEqual(self.rule_engine.get_current_period(datetime(2024, 1, 8, 8, 0)), 1)
+        self.assertEqual(self.rule_engine.get_current_period(datetime(2024, 1, 8, 15, 59)), 7)
+        self.assertIsNone(self.rule_engine.get_current_period(datetime(2024, 1, 8, 12, 30)))
+        self.assertIsNone(self.rule_engine.get_current_period(datetime(2024, 1, 8, 7, 59)))
+
+        timetable = [Period(2, time(9, 15), time(10, 0)), Period(1, time(8, 30), time(9, 10))]
+        rule_engine = RuleEngine(self.students, self.schedules, self.zones, timetable=timetable)
+        self.assertEqual(rule_engine.get_current_period(datetime(2024, 1, 8, 8, 45)), 1)
+        self.assertIsNone(rule_engine.get_current_period(datetime(2024, 1, 8, 9, 12)))
+        self.assertEqual(rule_engine.get_current_period(datetime(2024, 1, 8, 9, 15)), 2)
+
+    @patch('src.rule_engine.RuleEngine.get_current_period')
+    def test_reload_schedules(self, mock_get_current_period):
+        """Test that reloaded schedules take effect without recreating the engine."""
+        mock_get_current_period.return_value = 1
+        self.assertFalse(self.rule_engine.is_student_allowed_in_zone("101", "CLASS-B"))
+
+        self.rule_engine.reload_schedules([Schedule(student_id="101", period=1, classroom_id="CLASS-B")])
+        self.assertTrue(self.rule_engine.is_student_allowed_in_zone("101", "CLASS-B"))
+        self.assertFalse(self.rule_engine.is_student_allowed_in_zone("101", "CLASS-A"))
+
+    @patch('src.rule_engine.RuleEngine.get_current_period')
+    def test_expected_students(self, mock_get_current_period):
+        """Test the students expected in a zone for the current period."""
+        mock_get_current_period.return_value = 1
+        self.assertEqual(self.rule_engine.expected_students("CLASS-A"), frozenset({"101"}))
+        self.assertIsNone(self.rule_engine.expected_students("HALLWAY-1"))
+
+        mock_get_current_period.return_value = None
+        self.assertIsNone(self.rule_engine.expected_students("CLASS-A"))
+
+    @patch('src.rule_engine.RuleEngine.get_current_period')
+    def test_zone_can_produce_violations(self, mock_get_current_period):
+        """Test which zones can produce violations in the current period."""
+        mock_get_current_period.return_value = 3
+        self.assertTrue(self.rule_engine.zone_can_produce_violations("CLASS-A"))
+        self.assertTrue(self.rule_engine.zone_can_produce_violations("RESTRICTED-AREA"))
+        self.assertFalse(self.rule_engine.zone_can_produce_violations("LIBRARY"))
+
+        mock_get_current_period.return_value = None
+        self.assertFalse(self.rule_engine.zone_can_produce_violations("RESTRICTED-AREA"))
+
+    @patch('src.rule_engine.save_violation')
+    @patch('src.rule_engine.send_email_notification')
+    @patch('src.rule_engine.RuleEngine.get_current_period')
+    def test_process_detections_for_a_frame(self, mock_get_current_period, mock_send_email, mock_save_violation):
+        """Test that a whole frame's detections are evaluated in one call."""
+        mock_get_current_period.return_value = 1
+        start = datetime(2024, 1, 8, 8, 10)
+
+        result = self.rule_engine.process_detections("CLASS-B", ["101", "102", "101", "Unknown"], start)
+        self.assertEqual([v.student_id for v in result.created], ["101"])
+        self.assertEqual(result.confirmed, [])
+        mock_get_current_period.assert_called_once_with(start)
+
+        result = self.rule_engine.process_detections("CLASS-B", ["101"], start.replace(minute=11))
+        self.assertEqual([v.student_id for v in result.confirmed], ["101"])
+        self.assertTrue(result.confirmed[0].alert_sent)
+        self.assertEqual(self.rule_engine.bunking_score["101"], 1)
+        mock_send_email.assert_called_once()
+        mock_save_violation.assert_called_once()
+
+        result = self.rule_engine.process_detections("CLASS-A", ["101"], start.replace(minute=12))
+        self.assertEqual([v.student_id for v in result.revoked], ["101"])
+        self.assertNotIn("101", self.rule_engine.active_violations)
+
+    @patch('src.rule_engine.RuleEngine.get_current_period')
+    def test_grace_period_resumes_after_restart(self, mock_get_current_period):
+        """Test that a restarted engine confirms a grace period checkpointed by the previous one."""
+        mock_get_current_period.return_value = 1
+        store = RecordingStateStore()
+        start = datetime(2024, 1, 8, 8, 10)
+        engine = RuleEngine(self.students, self.schedules, self.zones, grace_period_minutes=10,
+                            notifier=Mock(), violation_writer=Mock(), state_store=store)
+        engine.process_detections("CLASS-B", ["101", "102"], start)
+        engine.process_detections("CLASS-B", ["102"], start.replace(minute=12))  # 102 is back in class
+        self.assertEqual(set(store.active), {"101"})
+
+        restarted = RuleEngine(self.students, self.schedules, self.zones, grace_period_minutes=10,
+                               notifier=Mock(), violation_writer=Mock(), state_store=store)
+        resumed = restarted.restore_state(dict(store.active), {"101": 2}, now=start.replace(minute=15))
+        self.assertEqual(resumed, 1)
+
+        result = restarted.process_detections("LIBRARY", ["101"], start.replace(minute=21))
+        self.assertEqual([v.timestamp for v in result.confirmed], [start])
+        self.assertEqual(restarted.bunking_score["101"], 3)
+        self.assertTrue(store.active["101"].alert_sent)
+
+    def test_restore_discards_grace_periods_of_earlier_days(self):
+        """Test that a grace period left open yesterday is not resumed."""
+        store = RecordingStateStore()
+        store.active["101"] = Violation("101", "CLASS-B", datetime(2024, 1, 8, 8, 10))
+
+        resumed = RuleEngine(self.students, self.schedules, self.zones, state_store=store).restore_state(
+            dict(store.active), {}, now=datetime(2024, 1, 9, 8, 0))
+
+        self.assertEqual(resumed, 0)
+        self.assertEqual(store.active, {})
+
+    def test_refresh_schedules_only_reloads_changes(self):
+        """Test that refresh_schedules() rebuilds the index only when the schedules changed."""
+        self.assertFalse(self.rule_engine.refresh_schedules(list(self.schedules)))
+        moved = [Schedule(student_id="101", period=1, classroom_id="CLASS-B")]
+        self.assertTrue(self.rule_engine.refresh_schedules(moved))
+        self.assertEqual(self.rule_engine.expected_students("CLASS-B", datetime(2024, 1, 8, 8, 30)), {"101"})
+
+    def test_stale_locations_are_evicted(self):
+        """Test that last_seen_location only keeps sightings within the TTL."""
+        engine = RuleEngine(self.students, self.schedules, self.zones, last_seen_ttl_minutes=30)
+        engine.process_detections("HALLWAY-1", ["101"], datetime(2024, 1, 8, 12, 30))
+        engine.process_detections("HALLWAY-1", ["102"], datetime(2024, 1, 8, 12, 50))
+        self.assertEqual(set(engine.last_seen_location), {"101", "102"})
+
+        engine.process_detections("HALLWAY-1", ["102"], datetime(2024, 1, 8, 13, 10))
+        self.assertEqual(set(engine.last_seen_location), {"102"})
+
+class RecordingStateStore:
+    """Stand-in checkpoint store keeping the open grace periods in a dict."""
+
+    def __init__(self):
+        self.active = {}
+
+    def save_active(self, violation):
+        self.active[violation.student_id] = Violation(**vars(violation))
+
+    def clear_active(self, student_id):
+        self.active.pop(student_id, None)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.scheduler import CameraScheduler
+
+class TestCameraScheduler(unittest.TestCase):
+
+    def simulate(self, scheduler, offered_fps, seconds=20.0):
+        """Offers frames from each camera at its rate and returns the admitted count per camera."""
+        admitted = {camera_id: 0 for camera_id in offered_fps}
+        offers = sorted((i / fps, camera_id) for camera_id, fps in offered_fps.items()
+                        for i in range(int(seconds * fps)))
+        for now, camera_id in offers:
+            if scheduler.admit(camera_id, now):
+                admitted[camera_id] += 1
+        return admitted
+
+    def test_everything_admitted_until_capacity_is_known(self):
+        """Test that no frames are shed before a processing time has been measured."""
+        scheduler = CameraScheduler()
+        admitted = self.simulate(scheduler, {"gate": 10, "library": 10}, seconds=5.0)
+        self.assertEqual(admitted, {"gate": 50, "library": 50})
+        self.assertEqual(scheduler.skip_counts(), {"gate": 0, "library": 0})
+
+    def test_overload_sheds_quiet_and_irrelevant_cameras_first(self):
+        """Test that busy, rule-relevant cameras keep most of the capacity under overload."""
+        scheduler = CameraScheduler(target_utilization=1.0)
+        scheduler.record_processing(10, 1.0)  # 10 frames per second in total
+        for _ in range(20):
+            scheduler.report_detections("gate", 3)
+        scheduler.update_zone_state("gate", active_violations=0, can_violate=True)
+        scheduler.update_zone_state("hallway", active_violations=0, can_violate=True)
+        scheduler.update_zone_state("library", active_violations=0, can_violate=False)
+
+        admitted = self.simulate(scheduler, {"gate": 10, "hallway": 10, "library": 10})
+
+        self.assertGreater(admitted["gate"], admitted["hallway"])
+        self.assertGreater(admitted["hallway"], admitted["library"])
+        self.assertLessEqual(sum(admitted.values()), 10 * 20 + 6)
+        self.assertGreater(scheduler.skip_counts()["library"], 150)
+
+    def test_unused_share_is_redistributed(self):
+        """Test that a camera offering few frames leaves its share to the others."""
+        scheduler = CameraScheduler(target_utilization=1.0)
+        scheduler.record_processing(10, 1.0)
+
+        admitted = self.simulate(scheduler, {"gate": 10, "library": 1})
+
+        self.assertEqual(admitted["library"], 20)
+        self.assertGreater(admitted["gate"], 150)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import threading
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import numpy as np
+
+from src.streaming import FrameStreamer, LatestFrameHub, encode_jpeg
+
+class RecordingClient:
+    connected = True
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, data):
+        self.events.append((event, data))
+
+class TestStreaming(unittest.TestCase):
+
+    def test_encode_jpeg_downscales(self):
+        """Test that frames are downscaled to the configured width before encoding."""
+        frame = np.zeros((480, 1280, 3), dtype=np.uint8)
+        decoded = cv2.imdecode(np.frombuffer(encode_jpeg(frame, quality=50, max_width=640), np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(decoded.shape, (240, 640, 3))
+
+    def test_streamer_rate_limits_per_camera(self):
+        """Test that each camera is encoded at most max_fps times per second."""
+        client = RecordingClient()
+        streamer = FrameStreamer(client, max_fps=2)
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+
+        self.assertTrue(streamer.publish(0, "main_gate", frame, now=0.0))
+        self.assertFalse(streamer.publish(0, "main_gate", frame, now=0.1))
+        self.assertTrue(streamer.publish(1, "library", frame, now=0.1))
+        self.assertTrue(streamer.publish(0, "main_gate", frame, now=0.6))
+        self.assertEqual([data['camera_id'] for _, data in client.events], ["0", "1", "0"])
+
+    def test_slow_client_only_sees_latest_frame(self):
+        """Test that a client that falls behind skips straight to the newest frame."""
+        hub = LatestFrameHub()
+        for i in range(5):
+            hub.publish("0", "main_gate", bytes([i]))
+
+        self.assertEqual(hub.wait_for_frame("0", after_sequence=0, timeout=0.1), (5, bytes([4])))
+        self.assertIsNone(hub.wait_for_frame("0", after_sequence=5, timeout=0.05))
+        self.assertEqual(hub.cameras(), {"0": "main_gate"})
+
+    def test_waiting_client_is_woken_by_new_frame(self):
+        """Test that a waiting MJPEG client receives a frame published later."""
+        hub = LatestFrameHub()
+        stream = hub.mjpeg("2", timeout=1.0)
+        threading.Timer(0.05, hub.publish, args=("2", "library", b"jpeg-bytes")).start()
+        chunk = next(stream)
+        self.assertTrue(chunk.startswith(b"--frame\r\nContent-Type: image/jpeg"))
+        self.assertTrue(chunk.endswith(b"jpeg-bytes\r\n"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tracker import FaceTracker, iou
+
+class TestFaceTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = FaceTracker(iou_threshold=0.3, max_misses=1, reverify_interval=10.0,
+                                   confident_distance=0.3, retry_interval=0.5)
+
+    def test_iou(self):
+        """Test IoU on (top, right, bottom, left) boxes."""
+        self.assertAlmostEqual(iou((0, 10, 10, 0), (0, 10, 10, 0)), 1.0)
+        self.assertAlmostEqual(iou((0, 10, 10, 0), (0, 15, 10, 5)), 50 / 150)
+        self.assertEqual(iou((0, 10, 10, 0), (20, 30, 30, 20)), 0.0)
+
+    def test_track_id_is_stable_for_moving_face(self):
+        """Test that a slowly moving face keeps its track ID."""
+        first = self.tracker.update([(0, 100, 100, 0)])[0]
+        second = self.tracker.update([(5, 105, 105, 5)])[0]
+        self.assertEqual(first.track_id, second.track_id)
+
+    def test_new_face_gets_new_track(self):
+        """Test that a face far from every existing track starts a new one."""
+        first = self.tracker.update([(0, 100, 100, 0)])[0]
+        tracks = self.tracker.update([(0, 100, 100, 0), (300, 400, 400, 300)])
+        self.assertEqual(tracks[0].track_id, first.track_id)
+        self.assertNotEqual(tracks[1].track_id, first.track_id)
+
+    def test_lost_tracks_are_dropped(self):
+        """Test that tracks unseen for more than max_misses frames are forgotten."""
+        self.tracker.update([(0, 100, 100, 0)])
+        self.tracker.update([])
+        self.assertEqual(len(self.tracker.tracks), 1)
+        self.tracker.update([])
+        self.assertEqual(self.tracker.tracks, [])
+
+    def test_recognition_only_for_new_stale_or_uncertain_tracks(self):
+        """Test when a track needs to go back through the embedding stage."""
+        track = self.tracker.update([(0, 100, 100, 0)])[0]
+        self.assertTrue(self.tracker.needs_recognition(track, now=0.0))
+
+        self.tracker.assign(track, "101", 0.1, now=0.0)
+        self.assertFalse(self.tracker.needs_recognition(track, now=5.0))
+        self.assertTrue(self.tracker.needs_recognition(track, now=10.0))
+
+        self.tracker.assign(track, "Unknown", 0.6, now=20.0)
+        self.assertFalse(self.tracker.needs_recognition(track, now=20.1))
+        self.assertTrue(self.tracker.needs_recognition(track, now=20.5))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import database
+from src.data_models import Violation
+from src.web_viewer import app, socketio
+from test_database import DatabaseTestCase
+
+def setUpModule():
+    # Any request creates the schema; keep tests that do not set up their own database off the real one.
+    tmp = tempfile.TemporaryDirectory()
+    patcher = patch('src.database.DATABASE_NAME', os.path.join(tmp.name, 'viewer.db'))
+    patcher.start()
+    unittest.addModuleCleanup(tmp.cleanup)
+    unittest.addModuleCleanup(patcher.stop)
+    unittest.addModuleCleanup(database.close_connection)
+
+class TestViolationHistory(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        start = datetime(2024, 1, 8, 8, 0)
+        database.save_violations([
+            Violation(student_id=str(100 + i % 3), zone_id="library" if i % 2 else "main_gate",
+                      timestamp=start + timedelta(minutes=i), grace_period_expired=True, alert_sent=True)
+            for i in range(10)
+        ])
+        self.client = app.test_client()
+
+    def test_query_uses_indexes(self):
+        """Test that zone history queries are served by an index, not a table scan."""
+        plan = database.get_connection().execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM violations WHERE zone_id = ? "
+            "ORDER BY timestamp DESC, student_id DESC LIMIT 10", ("library",)).fetchall()
+        self.assertIn("idx_violations_zone_timestamp", " ".join(str(row) for row in plan))
+
+    def test_keyset_pagination(self):
+        """Test that following next_cursor walks the whole history without gaps or repeats."""
+        seen, cursor = [], None
+        while True:
+            url = "/api/violations?limit=3" + (f"&cursor={cursor}" if cursor else "")
+            body = self.client.get(url).get_json()
+            seen.extend(v["timestamp"] for v in body["violations"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_filters(self):
+        """Test filtering by student, zone and time range."""
+        body = self.client.get("/api/violations?zone_id=library&student_id=101").get_json()
+        self.assertTrue(body["violations"])
+        self.assertTrue(all(v["zone_id"] == "library" and v["student_id"] == "101" for v in body["violations"]))
+
+        body = self.client.get("/api/violations?since=2024-01-08T08:02:00&until=2024-01-08T08:05:00").get_json()
+        self.assertEqual(len(body["violations"]), 3)
+
+    def test_bad_request(self):
+        """Test that malformed parameters are rejected."""
+        self.assertEqual(self.client.get("/api/violations?since=yesterday").status_code, 400)
+
+    def test_totals_come_from_the_rollups(self):
+        """Test that the totals endpoint reports per-student, per-zone and per-day counts."""
+        self.assertEqual(self.client.get("/api/violations/totals?student_id=100").get_json(),
+                         {"student_id": "100", "violations": 4})
+        body = self.client.get("/api/violations/totals?since=2024-01-08").get_json()
+        self.assertEqual(body["by_zone"], {"library": 5, "main_gate": 5})
+        self.assertEqual(body["by_day"], {"2024-01-08": 10})
+        self.assertEqual(self.client.get("/api/violations/totals?since=monday").status_code, 400)
+
+    def test_index_renders_recent_history(self):
+        """Test that the dashboard is pre-filled with recent violations."""
+        page = self.client.get("/").get_data(as_text=True)
+        self.assertIn("2024-01-08 08:09:00", page)
+
+class TestAppCreation(unittest.TestCase):
+
+    def test_first_request_creates_the_schema(self):
+        """Test that a server importing the app (e.g. gunicorn, which never runs __main__) finds the tables."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch('src.database.DATABASE_NAME', os.path.join(tmp, 'viewer.db')), \
+                    patch('src.web_viewer.schema_ready', False):
+                self.assertEqual(app.test_client().get('/api/violations').status_code, 200)
+                tables = {name for name, in database.get_connection().execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'")}
+                database.close_connection()
+        self.assertTrue({'students', 'violations', 'violation_totals_by_student'} <= tables)
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def test_serves_snapshot_pushed_by_pipeline(self):
+        """Test that /metrics serves the latest snapshot sent over Socket.IO until the sender disconnects."""
+        pipeline = socketio.test_client(app)
+        pipeline.emit('metrics', 'surveillance_recognition_errors_total 0.0\n')
+        pipeline.emit('metrics', 'surveillance_recognition_errors_total 2.0\n')
+
+        response = app.test_client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(as_text=True), 'surveillance_recognition_errors_total 2.0\n')
+
+        pipeline.disconnect()
+        self.assertEqual(app.test_client().get('/metrics').get_data(as_text=True), '')
+
+    def test_snapshots_of_several_nodes_are_merged(self):
+        """Test that each metric family is declared once with the samples of every connected node."""
+        header = '# HELP surveillance_faces_total Faces.\n# TYPE surveillance_faces_total counter\n'
+        nodes = [socketio.test_client(app) for _ in range(2)]
+        nodes[0].emit('metrics', header + 'surveillance_faces_total{node="gate-pc"} 3.0\n')
+        nodes[1].emit('metrics', header + 'surveillance_faces_total{node="library-pc"} 5.0\n')
+
+        text = app.test_client().get('/metrics').get_data(as_text=True)
+
+        self.assertEqual(text, header + 'surveillance_faces_total{node="gate-pc"} 3.0\n'
+                                        'surveillance_faces_total{node="library-pc"} 5.0\n')
+        for node in nodes:
+            node.disconnect()
+
+class TestEventBatches(unittest.TestCase):
+
+    def test_batch_is_broadcast_once_and_acknowledged(self):
+        """Test that a batch from main.py reaches browsers as one broadcast and is acknowledged."""
+        browser = socketio.test_client(app)
+        pipeline = socketio.test_client(app)
+        browser.get_received()
+        batch = {'sequence': 7, 'events': [
+            {'type': 'violation', 'data': {'student_id': '101', 'zone_id': 'library'}},
+            {'type': 'violation', 'data': {'student_id': '102', 'zone_id': 'library'}},
+        ]}
+
+        self.assertEqual(pipeline.emit('event_batch', batch, callback=True), 7)
+
+        received = [event for event in browser.get_received() if event['name'] == 'violation_batch']
+        self.assertEqual(len(received), 1)
+        self.assertEqual([v['student_id'] for v in received[0]['args'][0]], ['101', '102'])
+        browser.disconnect()
+        pipeline.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
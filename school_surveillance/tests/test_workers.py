@@ -0,0 +1,122 @@
+import unittest
+import time
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from src.workers import RecognitionWorkerPool
+
+class MeanBrightnessRecognizer:
+    """Stand-in recognizer that 'recognizes' a frame by its mean pixel value."""
+
+    last_error = None
+    last_timings = {}
+
+    def warm_up(self, db_path):
+        pass
+
+    def recognize_batch(self, frames, db_path, trackers=None, candidates=None):
+        self.last_timings = {"detection": 0.25 * len(frames)}
+        return {camera_id: [(str(int(frame.mean())), (0, 1, 1, 0))] for camera_id, frame in frames.items()}
+
+class FailingWarmUpRecognizer(MeanBrightnessRecognizer):
+    """Stand-in recognizer whose models fail to load up front."""
+
+    def warm_up(self, db_path):
+        raise RuntimeError("model download failed")
+
+class CrashingRecognizer(MeanBrightnessRecognizer):
+    """Stand-in recognizer that takes its worker process down on the first frame."""
+
+    def recognize_batch(self, frames, db_path, trackers=None, candidates=None):
+        os._exit(1)
+
+class TestRecognitionWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = RecognitionWorkerPool(2, db_path="unused", recognizer_factory=MeanBrightnessRecognizer,
+                                          start_method="spawn").start()
+
+    def tearDown(self):
+        self.pool.stop()
+
+    def collect(self, expected, timeout=30.0):
+        results = []
+        deadline = time.time() + timeout
+        while len(results) < expected and time.time() < deadline:
+            results.extend(self.pool.results(timeout=0.1))
+        return results
+
+    def test_frames_round_trip_through_shared_memory(self):
+        """Test that results come back tagged with camera ID and frame timestamp."""
+        for camera_id in range(3):
+            frame = np.full((48, 64, 3), camera_id * 10, dtype=np.uint8)
+            self.assertTrue(self.pool.submit(camera_id, frame, timestamp=100.0 + camera_id))
+
+        results = sorted(self.collect(3), key=lambda r: r.camera_id)
+
+        self.assertEqual([r.camera_id for r in results], [0, 1, 2])
+        self.assertEqual([r.timestamp for r in results], [100.0, 101.0, 102.0])
+        self.assertEqual([r.faces[0][0] for r in results], ["0", "10", "20"])
+        # Each batch reports its stage timings once, on one of its results.
+        timed = [r.timings for r in results if r.timings is not None]
+        self.assertEqual(sum(t["detection"] for t in timed), 0.25 * 3)
+
+    def test_busy_camera_sheds_frames(self):
+        """Test that a camera with a frame in flight does not accept another one."""
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        self.assertTrue(self.pool.submit("gate", frame, timestamp=1.0))
+        self.assertFalse(self.pool.submit("gate", frame, timestamp=2.0))
+
+        self.collect(1)
+        self.assertTrue(self.pool.submit("gate", frame, timestamp=3.0))
+        self.assertEqual(self.collect(1)[0].timestamp, 3.0)
+
+    @unittest.skipUnless(os.path.exists("/proc/self/maps"), "needs /proc to inspect the worker's mappings")
+    def test_worker_unmaps_a_replaced_slot(self):
+        """Test that a camera's old shared-memory slot is released once a larger frame replaces it."""
+        self.assertTrue(self.pool.submit("gate", np.full((8, 8, 3), 1, dtype=np.uint8), timestamp=1.0))
+        self.collect(1)
+        old_slot = self.pool._slots["gate"].name
+        self.assertTrue(self.pool.submit("gate", np.full((16, 16, 3), 2, dtype=np.uint8), timestamp=2.0))
+        self.assertEqual(self.collect(1)[0].faces[0][0], "2")
+
+        worker = self.pool._processes[self.pool._workers_by_camera["gate"]]
+        with open(f"/proc/{worker.pid}/maps") as f:
+            self.assertNotIn(old_slot, f.read())
+
+class TestWorkerFailures(unittest.TestCase):
+
+    def test_failed_warm_up_keeps_the_worker_running(self):
+        """Test that a worker whose warm-up fails still processes frames."""
+        pool = RecognitionWorkerPool(1, db_path="unused", recognizer_factory=FailingWarmUpRecognizer).start()
+        try:
+            self.assertTrue(pool.submit("gate", np.full((8, 8, 3), 7, dtype=np.uint8), timestamp=1.0))
+            results = []
+            deadline = time.time() + 30
+            while not results and time.time() < deadline:
+                results = pool.results(timeout=0.1)
+            self.assertEqual(results[0].faces[0][0], "7")
+            self.assertEqual(pool.restarts, 0)
+        finally:
+            pool.stop()
+
+    def test_dead_worker_releases_its_cameras_and_is_restarted(self):
+        """Test that a camera does not stay busy forever when its worker dies."""
+        pool = RecognitionWorkerPool(1, db_path="unused", recognizer_factory=CrashingRecognizer).start()
+        try:
+            frame = np.zeros((8, 8, 3), dtype=np.uint8)
+            self.assertTrue(pool.submit("gate", frame, timestamp=1.0))
+            deadline = time.time() + 30
+            while pool.is_busy("gate") and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertFalse(pool.is_busy("gate"))
+            self.assertEqual(pool.restarts, 1)
+            self.assertTrue(pool.submit("gate", frame, timestamp=2.0))
+        finally:
+            pool.stop()
+
+if __name__ == '__main__':
+    unittest.main()